@@ -1,79 +1,280 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
-from influxdb_client import InfluxDBClient, Point, WritePrecision
-from influxdb_client.client.write_api import WriteApi, SYNCHRONOUS
-from influxdb_client.client.query_api import QueryApi
 import os
 from dotenv import load_dotenv
 import json
-import cloudinary
-import cloudinary.uploader
 import base64
 from io import BytesIO, StringIO
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import dateutil.parser
 from zoneinfo import ZoneInfo
 import traceback
-import requests
-from apscheduler.schedulers.background import BackgroundScheduler
+from image_processing import ImageHashIndex, hash_stream, make_image_variants
+from upload_jobs import UploadJobQueue
+from read_model import TaskReadModel
+from line_protocol import EPOCH, BatchEncoder, decode_value, encode_line, parse_line_protocol, tag_prefix, to_timestamp_ns
+from data_versions import DataVersions
+from idempotency import IdempotencyStore
+from question_registry import QuestionRegistry
+from leader_lock import LeaderLock
+from metrics import (HTTP_REQUEST_BYTES, HTTP_REQUEST_SECONDS, HTTP_RESPONSE_BYTES, RECORDS_PARSED,
+                     UPSTREAM_BYTES, UPSTREAM_ERRORS, render_metrics, track_upstream)
+from flux_queries import TASK_COMPANION_TYPES, build_task_query, build_debug_query, task_type_tag
 import csv
+import gzip
+import hashlib
+import importlib.util
 import re
+import sys
 import logging
-import statistics
+import threading
+import queue
+import heapq
+import tempfile
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+def lazy_import(name):
+    """Import a module on first attribute access; None if it is not installed.
+
+    Keeps heavy optional dependencies out of cold-start time for requests that never use them.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        return None
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+# Optional: columnar analytics fall back to the row-based path
+np = lazy_import('numpy')
+
+try:
+    import brotli
+except ImportError:  # Optional: responses are gzip-compressed only
+    brotli = None
 
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 
 # Enable CORS for all routes
 CORS(app)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] - %(message)s",
-    handlers=[logging.StreamHandler()]
-)
-logger = logging.getLogger(__name__)
-
 # Load environment variables
 load_dotenv()
 
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per log line, for log pipelines that index fields"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+# Configure logging; per-record debug output is only formatted when LOG_LEVEL=DEBUG
+log_handler = logging.StreamHandler()
+if os.getenv('LOG_FORMAT', 'text').lower() == 'json':
+    log_handler.setFormatter(JsonLogFormatter())
+else:
+    log_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] - %(message)s"))
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), handlers=[log_handler])
+logger = logging.getLogger(__name__)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Per-route latency and payload size; registered first so it runs after compression"""
+    started = g.pop('request_started', None)
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route, request.method, response.status_code)
+    if request.content_length:
+        HTTP_REQUEST_BYTES.observe(request.content_length, route)
+    if not response.is_streamed and response.content_length is not None:
+        HTTP_RESPONSE_BYTES.observe(response.content_length, route)
+    return response
+
 # InfluxDB configuration
 INFLUXDB_URL = os.getenv('INFLUXDB_URL', 'https://us-east-1-1.aws.cloud2.influxdata.com')
 INFLUXDB_TOKEN = os.getenv('INFLUXDB_TOKEN', 'nZ49M1MTGbHtRCrc2OJhx-kVIBWuwvereT-o1mcq2COz3urUNuUuIIMjysObK8oOEHn8352w7LKFyrX8PQpdsA==')
 INFLUXDB_ORG = os.getenv('INFLUXDB_ORG', 'Agri')
 INFLUXDB_BUCKET = os.getenv('INFLUXDB_BUCKET', 'smart_agri')
 
-# Cloudinary configuration
-cloudinary.config(
-    cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME', 'dnjlsegrq'),
-    api_key=os.getenv('CLOUDINARY_API_KEY', '315166364872797'),
-    api_secret=os.getenv('CLOUDINARY_API_SECRET', 'xIrcgfB7euQCW-FKi0kd6nWur24'),
-    secure=True
-)
+# Cloudinary configuration (applied when the SDK is first used, see get_cloudinary)
+CLOUDINARY_CLOUD_NAME = os.getenv('CLOUDINARY_CLOUD_NAME', 'dnjlsegrq')
+CLOUDINARY_API_KEY = os.getenv('CLOUDINARY_API_KEY', '315166364872797')
+CLOUDINARY_API_SECRET = os.getenv('CLOUDINARY_API_SECRET', 'xIrcgfB7euQCW-FKi0kd6nWur24')
 CLOUDINARY_UPLOAD_PRESET = os.getenv('CLOUDINARY_UPLOAD_PRESET', 'smart_agri_preset')
 
-# Initialize InfluxDB client
-influx_client = InfluxDBClient(url=INFLUXDB_URL, token=INFLUXDB_TOKEN, org=INFLUXDB_ORG)
-write_api = influx_client.write_api(write_options=SYNCHRONOUS)
-query_api = influx_client.query_api()
-
-# Get the Render app URL
-RENDER_APP_URL = os.getenv('RENDER_EXTERNAL_URL', 'https://vimal-farm.onrender.com')
-
-# APScheduler setup for keep-alive pings
-def ping_self():
+# Directory for local state that must survive restarts (write spool etc.)
+LOCAL_STATE_DIR = os.getenv('LOCAL_STATE_DIR', tempfile.gettempdir())
+
+# Serverless deploys (Vercel) freeze the process between requests: no scheduler, spool or background jobs
+SERVERLESS = os.getenv('SERVERLESS', 'true' if os.getenv('VERCEL') else 'false').lower() in ('1', 'true', 'yes')
+
+# Upstream SDK clients are built on first use so cold starts only pay for what a request needs
+_lazy_init_lock = threading.RLock()
+_influx_client = None
+_write_api = None
+_query_api = None
+_cloudinary = None
+
+def get_influx_client():
+    global _influx_client
+    if _influx_client is None:
+        with _lazy_init_lock:
+            if _influx_client is None:
+                from influxdb_client import InfluxDBClient
+                _influx_client = InfluxDBClient(url=INFLUXDB_URL, token=INFLUXDB_TOKEN, org=INFLUXDB_ORG)
+    return _influx_client
+
+def get_write_api():
+    global _write_api
+    if _write_api is None:
+        with _lazy_init_lock:
+            if _write_api is None:
+                from influxdb_client.client.write_api import SYNCHRONOUS
+                _write_api = get_influx_client().write_api(write_options=SYNCHRONOUS)
+    return _write_api
+
+def get_query_api():
+    global _query_api
+    if _query_api is None:
+        with _lazy_init_lock:
+            if _query_api is None:
+                _query_api = get_influx_client().query_api()
+    return _query_api
+
+def get_cloudinary():
+    """The Cloudinary SDK, imported and configured on first use"""
+    global _cloudinary
+    if _cloudinary is None:
+        with _lazy_init_lock:
+            if _cloudinary is None:
+                import cloudinary
+                import cloudinary.uploader
+                cloudinary.config(
+                    cloud_name=CLOUDINARY_CLOUD_NAME,
+                    api_key=CLOUDINARY_API_KEY,
+                    api_secret=CLOUDINARY_API_SECRET,
+                    secure=True
+                )
+                _cloudinary = cloudinary
+    return _cloudinary
+
+# Pooled keep-alive HTTP session for raw InfluxDB HTTP calls (Flux queries, batched writes)
+INFLUXDB_HTTP_POOL_SIZE = int(os.getenv('INFLUXDB_HTTP_POOL_SIZE', '10'))
+INFLUXDB_HTTP_CONNECT_TIMEOUT = float(os.getenv('INFLUXDB_HTTP_CONNECT_TIMEOUT', '5'))
+INFLUXDB_HTTP_READ_TIMEOUT = float(os.getenv('INFLUXDB_HTTP_READ_TIMEOUT', '30'))
+INFLUXDB_HTTP_RETRIES = int(os.getenv('INFLUXDB_HTTP_RETRIES', '3'))
+INFLUXDB_HTTP_BACKOFF = float(os.getenv('INFLUXDB_HTTP_BACKOFF', '0.5'))
+
+def create_influx_session():
+    """Build a requests session with connection pooling, retry with backoff and gzip responses"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=INFLUXDB_HTTP_RETRIES,
+        backoff_factor=INFLUXDB_HTTP_BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'POST']),  # Flux queries are read-only, so POST is safe to retry
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=INFLUXDB_HTTP_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        "Authorization": f"Token {INFLUXDB_TOKEN}",
+        "Accept-Encoding": "gzip",
+    })
+    return session
+
+_influx_session = None
+
+def get_influx_session():
+    global _influx_session
+    if _influx_session is None:
+        with _lazy_init_lock:
+            if _influx_session is None:
+                _influx_session = create_influx_session()
+    return _influx_session
+
+@contextmanager
+def influx_flux_query(query, stream=False):
+    """POST a Flux query over the pooled session, yielding the CSV response and logging its latency"""
+    url = f"{INFLUXDB_URL}/api/v2/query?org={INFLUXDB_ORG}"
+    started = time.perf_counter()
+    with track_upstream('influxdb', 'query'):
+        response = get_influx_session().post(
+            url,
+            headers={
+                "Content-Type": "application/vnd.flux",
+                "Accept": "application/csv",
+            },
+            data=query,
+            stream=stream,
+            timeout=(INFLUXDB_HTTP_CONNECT_TIMEOUT, INFLUXDB_HTTP_READ_TIMEOUT),
+        )
+    if not response.ok:
+        UPSTREAM_ERRORS.inc('influxdb', 'query')
     try:
-        response = requests.get(f"{RENDER_APP_URL}/healthz", timeout=5)
-        if response.status_code == 200:
-            print(f"Self-ping successful at {datetime.now().isoformat()}: {response.json()}")
-        else:
-            print(f"Self-ping failed at {datetime.now().isoformat()}: Status {response.status_code}")
-    except Exception as e:
-        print(f"Self-ping error at {datetime.now().isoformat()}: {str(e)}")
+        yield response
+    finally:
+        response.close()
+        logger.info(
+            f"InfluxDB query: status {response.status_code}, "
+            f"{response.elapsed.total_seconds() * 1000:.0f} ms to headers, "
+            f"{(time.perf_counter() - started) * 1000:.0f} ms total"
+        )
 
-scheduler = BackgroundScheduler()
-scheduler.add_job(ping_self, 'interval', minutes=5)
-scheduler.start()
+def influx_query(query):
+    """query_api.query with upstream latency/error metrics"""
+    with track_upstream('influxdb', 'query'):
+        return get_query_api().query(query, org=INFLUXDB_ORG)
+
+def influx_query_stream(query):
+    """query_api.query_stream with upstream metrics covering the whole iteration"""
+    with track_upstream('influxdb', 'query_stream'):
+        yield from get_query_api().query_stream(query, org=INFLUXDB_ORG)
+
+def influx_write(lines):
+    """Synchronous write_api.write of line protocol with upstream metrics"""
+    UPSTREAM_BYTES.observe(sum(len(line) + 1 for line in lines), 'influxdb', 'write')
+    with track_upstream('influxdb', 'write'):
+        get_write_api().write(bucket=INFLUXDB_BUCKET, org=INFLUXDB_ORG, record=lines)
+
+def cloudinary_upload(file, large=False, **options):
+    """cloudinary.uploader.upload (or upload_large) with upstream metrics"""
+    if isinstance(file, BytesIO):
+        UPSTREAM_BYTES.observe(file.getbuffer().nbytes, 'cloudinary', 'upload')
+    uploader = get_cloudinary().uploader
+    with track_upstream('cloudinary', 'upload'):
+        if large:
+            return uploader.upload_large(file, **options)
+        return uploader.upload(file, **options)
+
+# Shared pool for running independent upstream calls (InfluxDB, Cloudinary) of one request concurrently
+UPSTREAM_CONCURRENCY = int(os.getenv('UPSTREAM_CONCURRENCY', '16'))
+upstream_executor = ThreadPoolExecutor(max_workers=UPSTREAM_CONCURRENCY, thread_name_prefix='upstream')
 
 # Expected English questions for validation
 EXPECTED_QUESTIONS = {
@@ -106,6 +307,10 @@ EXPECTED_QUESTIONS = {
     ]
 }
 
+# Question lookups per form, optionally overridden and hot-reloaded from QUESTIONS_FILE
+QUESTIONS_FILE = os.getenv('QUESTIONS_FILE')
+question_registry = QuestionRegistry(EXPECTED_QUESTIONS, QUESTIONS_FILE)
+
 IST = ZoneInfo('Asia/Kolkata')
 
 def get_rain_status(value):
@@ -121,26 +326,271 @@ def get_rain_status(value):
     except (ValueError, TypeError):
         return "No Rain"
 
-def fetch_historical_24h_data(date=None):
-    """Fetch raw historical data for the specified day from 12:00 AM to 11:59 PM IST"""
-    logger.info(f"Fetching raw historical data for date: {date}")
-    
+# Sensor fields summarised in the daily weather context
+WEATHER_FIELDS = ['temperature', 'humidity', 'soil_moisture', 'wind_speed', 'rain_intensity']
+WEATHER_FIELD_FILTER = " or ".join(f'r._field == "{field}"' for field in WEATHER_FIELDS)
+
+# 'aggregated' pushes the daily reductions into Flux; 'raw' streams every point and reduces it in Python;
+# 'columnar' loads the raw points into NumPy arrays and reduces them vectorized
+WEATHER_QUERY_MODE = os.getenv('WEATHER_QUERY_MODE', 'aggregated').lower()
+
+def get_day_range_utc(date=None):
+    """Return (start_utc, end_utc) RFC3339 strings for an IST day, or None for an invalid date"""
     if date:
         try:
             # Set start time to 12:00 AM and end time to 11:59 PM of the specified date in IST
             start_local = datetime.strptime(f"{date} 00:00:00", "%Y-%m-%d %H:%M:%S").replace(tzinfo=IST)
             end_local = datetime.strptime(f"{date} 23:59:59", "%Y-%m-%d %H:%M:%S").replace(tzinfo=IST)
-            start_utc = start_local.astimezone(ZoneInfo('UTC')).isoformat()[:-6] + 'Z'
-            end_utc = end_local.astimezone(ZoneInfo('UTC')).isoformat()[:-6] + 'Z'
         except ValueError:
             logger.error(f"Invalid date format: {date}")
-            return []
+            return None
     else:
         # For current day, use from 12:00 AM to current time in IST
         end_local = datetime.now(IST)
         start_local = end_local.replace(hour=0, minute=0, second=0, microsecond=0)
-        start_utc = start_local.astimezone(ZoneInfo('UTC')).isoformat()[:-6] + 'Z'
-        end_utc = end_local.astimezone(ZoneInfo('UTC')).isoformat()[:-6] + 'Z'
+    start_utc = start_local.astimezone(ZoneInfo('UTC')).isoformat()[:-6] + 'Z'
+    end_utc = end_local.astimezone(ZoneInfo('UTC')).isoformat()[:-6] + 'Z'
+    return start_utc, end_utc
+
+def iter_flux_csv_rows(lines):
+    """Yield one dict per data row of an InfluxDB CSV response.
+
+    Each table in the response starts with its own header row (optionally preceded
+    by '#' annotation rows) and tables are separated by a blank line, so the header
+    is re-read at every table boundary.
+    """
+    header = None
+    for row in csv.reader(lines, skipinitialspace=True):
+        if not row or not any(cell.strip() for cell in row):
+            header = None
+            continue
+        if row[0].startswith('#'):
+            continue
+        if header is None:
+            header = [cell.strip() for cell in row]
+            continue
+        yield dict(zip(header, row))
+
+def iter_response_lines(response):
+    """Iterate decoded lines of a streamed requests response"""
+    if response.encoding is None:
+        response.encoding = 'utf-8'
+    return response.iter_lines(decode_unicode=True)
+
+def parse_sensor_value(row, field):
+    """Parse a numeric sensor column from a CSV row, returning None when missing or invalid"""
+    value = row.get(field)
+    if not value:
+        return None
+    value = value.strip()
+    if not value or value == 'null':
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        logger.warning(f"Invalid {field} value: {value} at {row.get('_time')}")
+        return None
+
+class RunningFieldStats:
+    """Running count/mean/min/max/first/last (and time of the max) for one sensor field.
+
+    Updated in place by WeatherDayStats, which inlines the update in its per-point loop.
+    """
+
+    __slots__ = ('count', 'total', 'min', 'max', 'first', 'last', 'max_time')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.first = None
+        self.last = None
+        self.max_time = None
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count,
+            'min': self.min,
+            'max': self.max,
+            'first': self.first,
+            'last': self.last,
+            'max_time': self.max_time
+        }
+
+class WeatherDayStats:
+    """Single-pass accumulator for a day's sensor readings.
+
+    One sweep computes every metric the summary needs: per-field
+    count/mean/min/max/first/last and the time of the max, the first rain
+    crossing, and a heap-based top-k of wind speeds for debug logging.
+    """
+
+    def __init__(self, top_k=5):
+        self.fields = {field: RunningFieldStats() for field in WEATHER_FIELDS}
+        self._field_stats = [self.fields[field] for field in WEATHER_FIELDS]
+        self.first_rain = None
+        self.rows = 0
+        self.top_k = top_k
+        self._top_winds = []  # min-heap of (wind_speed, time) holding the k largest
+
+    def _track_wind(self, value, time_str):
+        if len(self._top_winds) < self.top_k:
+            heapq.heappush(self._top_winds, (value, time_str))
+        elif value > self._top_winds[0][0]:
+            heapq.heapreplace(self._top_winds, (value, time_str))
+
+    def add_row(self, sensor_row):
+        """Add one compact (time, *WEATHER_FIELDS) row as produced by iter_sensor_rows"""
+        self._add(sensor_row[0], sensor_row[1:])
+
+    def add_point(self, data_point):
+        """Add one parsed data point dict as returned by fetch_historical_24h_data"""
+        get = data_point.get
+        self._add(data_point['_time'], (get('temperature'), get('humidity'), get('soil_moisture'),
+                                        get('wind_speed'), get('rain_intensity')))
+
+    def _add(self, time_str, values):
+        self.rows += 1
+        # Runs once per field per point, so the update is inlined rather than a method call
+        for field_stats, value in zip(self._field_stats, values):
+            if value is None:
+                continue
+            if field_stats.count == 0:
+                field_stats.first = field_stats.min = field_stats.max = value
+                field_stats.max_time = time_str
+            elif value > field_stats.max:
+                field_stats.max = value
+                field_stats.max_time = time_str
+            elif value < field_stats.min:
+                field_stats.min = value
+            field_stats.count += 1
+            field_stats.total += value
+            field_stats.last = value
+        wind = values[3]
+        if wind is not None and self.top_k:
+            self._track_wind(wind, time_str)
+        rain = values[4]
+        # Same classification as get_rain_status: any non-zero reading below 3000 is rain
+        if self.first_rain is None and rain is not None and rain != 0.0 and rain < 3000.0:
+            self.first_rain = time_str
+
+    def top_winds(self):
+        """Return the k highest (wind_speed, time) readings, highest first"""
+        return sorted(self._top_winds, reverse=True)
+
+    def as_stats(self):
+        stats = {field: field_stats.as_dict() for field, field_stats in self.fields.items() if field_stats.count}
+        if self.first_rain:
+            stats['first_rain'] = self.first_rain
+        return stats
+
+def classify_rain(values):
+    """Vectorized get_rain_status over a float64 array of rain intensity readings"""
+    truncated = np.trunc(values)
+    raining = (values != 0.0) & (truncated < 3000)  # NaN compares False, i.e. "No Rain"
+    return np.select([raining & (truncated < 1500), raining], ["Heavy Rain", "Light Rain"], default="No Rain")
+
+class SensorDayColumns:
+    """Columnar sensor day: an int64 nanosecond time array plus one float64 array per field.
+
+    Missing readings are NaN. Reductions run vectorized, which keeps multi-day
+    summaries and rolling statistics cheap.
+    """
+
+    def __init__(self, times_ns, columns):
+        self.times_ns = times_ns
+        self.columns = columns
+
+    @classmethod
+    def from_sensor_rows(cls, sensor_rows):
+        """Build from compact (time, *WEATHER_FIELDS) rows as produced by iter_sensor_rows"""
+        times = []
+        values = []
+        for sensor_row in sensor_rows:
+            times.append(sensor_row[0].rstrip('Z'))
+            values.append(sensor_row[1:])
+        times_ns = np.array(times, dtype='datetime64[ns]').astype(np.int64)
+        matrix = np.array(values, dtype=np.float64).reshape(len(values), len(WEATHER_FIELDS))
+        return cls(times_ns, {field: matrix[:, i].copy() for i, field in enumerate(WEATHER_FIELDS)})
+
+    def __len__(self):
+        return len(self.times_ns)
+
+    def time_str(self, index):
+        """RFC3339 UTC timestamp of the point at index, formatted like InfluxDB's _time (RFC3339Nano)"""
+        text = np.datetime_as_string(self.times_ns[index].astype('datetime64[ns]'), unit='ns')
+        # unit='auto' would drop whole seconds (or the time entirely) at round values;
+        # InfluxDB always keeps the seconds and only trims trailing fraction zeros
+        return text.rstrip('0').rstrip('.') + 'Z'
+
+    def weather_stats(self):
+        """Vectorized equivalent of WeatherDayStats.as_stats()"""
+        stats = {}
+        for field in WEATHER_FIELDS:
+            column = self.columns[field]
+            valid_idx = np.flatnonzero(~np.isnan(column))
+            if not len(valid_idx):
+                continue
+            values = column[valid_idx]
+            stats[field] = {
+                'count': int(len(values)),
+                'mean': float(values.mean()),
+                'min': float(values.min()),
+                'max': float(values.max()),
+                'first': float(values[0]),
+                'last': float(values[-1]),
+                'max_time': self.time_str(valid_idx[int(values.argmax())])
+            }
+        rain_idx = np.flatnonzero(classify_rain(self.columns['rain_intensity']) != "No Rain")
+        if len(rain_idx):
+            stats['first_rain'] = self.time_str(rain_idx[0])
+        return stats
+
+    def hourly_slope(self, field='soil_moisture'):
+        """Least-squares slope (units per hour) of a field within each hour of the day.
+
+        Returns [(hour_start_utc, slope)] for hours with at least two readings.
+        """
+        column = self.columns[field]
+        valid = ~np.isnan(column)
+        if valid.sum() < 2:
+            return []
+        times = self.times_ns[valid]
+        y = column[valid]
+        hour_ns = 3_600_000_000_000
+        buckets = (times // hour_ns) - (times[0] // hour_ns)
+        x = (times % hour_ns) / hour_ns  # position within the hour, in hours
+        n = np.bincount(buckets)
+        sx = np.bincount(buckets, x)
+        sy = np.bincount(buckets, y)
+        sxx = np.bincount(buckets, x * x)
+        sxy = np.bincount(buckets, x * y)
+        denominator = n * sxx - sx * sx
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slopes = (n * sxy - sx * sy) / denominator
+        first_hour = times[0] // hour_ns * hour_ns
+        return [
+            (np.datetime_as_string(np.datetime64(int(first_hour + i * hour_ns), 'ns'), unit='s') + 'Z', float(slopes[i]))
+            for i in np.flatnonzero((n >= 2) & (denominator > 0))
+        ]
+
+def fetch_historical_24h_data(date=None, columnar=False):
+    """Fetch raw historical data for the specified day from 12:00 AM to 11:59 PM IST
+
+    With columnar=True (and NumPy installed) the day is returned as SensorDayColumns
+    instead of a list of per-point dicts.
+    """
+    logger.info(f"Fetching raw historical data for date: {date}")
+    
+    day_range = get_day_range_utc(date)
+    if day_range is None:
+        return []
+    if columnar and np is None:
+        logger.warning("NumPy is not installed; returning row-based historical data")
+        columnar = False
+    start_utc, end_utc = day_range
     
     # Query raw sensor data without aggregation
     query = f"""
@@ -151,70 +601,58 @@ def fetch_historical_24h_data(date=None):
           |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
     """
     
-    url = f"{INFLUXDB_URL}/api/v2/query?org={INFLUXDB_ORG}"
-    
     try:
-        response = requests.post(
-            url,
-            headers={
-                "Authorization": f"Token {INFLUXDB_TOKEN}",
-                "Content-Type": "application/vnd.flux",
-                "Accept": "application/csv",
-            },
-            data=query,
-        )
-
-        if not response.ok:
-            logger.error(f"InfluxDB historical request failed: Status {response.status_code} - {response.text}")
-            return []
+        with influx_flux_query(query, stream=True) as response:
+
+            if not response.ok:
+                logger.error(f"InfluxDB historical request failed: Status {response.status_code} - {response.text}")
+                return []
+
+            if columnar:
+                day_columns = SensorDayColumns.from_sensor_rows(iter_sensor_rows(iter_response_lines(response)))
+                RECORDS_PARSED.inc('weather_raw', amount=len(day_columns))
+                logger.info(f"Successfully fetched {len(day_columns)} raw historical data points (columnar)")
+                return day_columns if len(day_columns) else []
+
+            # Parse the CSV stream row by row instead of buffering the whole body
+            historical_data = []
+            day_stats = WeatherDayStats()
+
+            for row in iter_flux_csv_rows(iter_response_lines(response)):
+                data_point = {}
+                try:
+                    # Parse mandatory fields
+                    if '_time' in row and row['_time']:
+                        data_point['_time'] = row['_time'].strip()
+                    
+                    # Parse numeric fields
+                    for field in WEATHER_FIELDS:
+                        value = parse_sensor_value(row, field)
+                        if value is not None:
+                            data_point[field] = value
+                    
+                    # Parse motion_detected if present
+                    if 'motion_detected' in row and row['motion_detected']:
+                        data_point['motion_detected'] = row['motion_detected'].strip()
+                    
+                    if data_point and '_time' in data_point:
+                        historical_data.append(data_point)
+                        day_stats.add_point(data_point)
+                
+                except Exception as e:
+                    logger.warning(f"Error parsing row at {row.get('_time')}: {str(e)}")
+                    continue
 
-        text = response.text
-        if not text.strip():
+        RECORDS_PARSED.inc('weather_raw', amount=len(historical_data))
+        if not historical_data:
             logger.warning("No historical data returned from InfluxDB")
             return []
-
-        # Parse CSV data using DictReader
-        historical_data = []
-        wind_speeds_with_time = []
-        csv_reader = csv.DictReader(StringIO(text), skipinitialspace=True)
-        
-        for row in csv_reader:
-            data_point = {}
-            try:
-                # Parse mandatory fields
-                if '_time' in row and row['_time']:
-                    data_point['_time'] = row['_time'].strip()
-                
-                # Parse numeric fields
-                for field in ['temperature', 'humidity', 'soil_moisture', 'wind_speed', 'rain_intensity']:
-                    if field in row and row[field] and row[field].strip() and row[field] != 'null':
-                        try:
-                            data_point[field] = float(row[field].strip())
-                        except (ValueError, TypeError):
-                            logger.warning(f"Invalid {field} value: {row.get(field)} at {row.get('_time')}")
-                            continue
-                
-                # Parse motion_detected if present
-                if 'motion_detected' in row and row['motion_detected']:
-                    data_point['motion_detected'] = row['motion_detected'].strip()
-                
-                if data_point and '_time' in data_point:
-                    historical_data.append(data_point)
-                    if 'wind_speed' in data_point:
-                        wind_speeds_with_time.append((data_point['wind_speed'], data_point['_time']))
-            
-            except Exception as e:
-                logger.warning(f"Error parsing row at {row.get('_time')}: {str(e)}")
-                continue
         
         # Log top 5 wind speeds for debugging
-        wind_speeds_with_time.sort(reverse=True)
-        top_winds = wind_speeds_with_time[:5]
-        logger.info(f"Top 5 wind speeds: {[(speed, time) for speed, time in top_winds]}")
-        if wind_speeds_with_time:
-            max_wind = max(wind_speeds_with_time, key=lambda x: x[0])[0]
-            max_time = next(t for s, t in wind_speeds_with_time if s == max_wind)
-            logger.info(f"Max wind speed: {max_wind} m/s at {max_time} UTC")
+        logger.info(f"Top 5 wind speeds: {day_stats.top_winds()}")
+        wind = day_stats.fields['wind_speed']
+        if wind.count:
+            logger.info(f"Max wind speed: {wind.max} m/s at {wind.max_time} UTC")
         
         logger.info(f"Successfully fetched {len(historical_data)} raw historical data points")
         return historical_data
@@ -223,85 +661,582 @@ def fetch_historical_24h_data(date=None):
         logger.error(f"Error fetching raw historical data: {str(e)}")
         return []
 
+def iter_sensor_rows(lines):
+    """Yield compact (time, temperature, humidity, soil_moisture, wind_speed, rain_intensity) tuples.
+
+    Missing or unparseable values are None, so a day of points can be reduced
+    without ever materialising per-row dicts.
+    """
+    for row in iter_flux_csv_rows(lines):
+        time_str = row.get('_time', '').strip()
+        if not time_str:
+            continue
+        yield (time_str,) + tuple(parse_sensor_value(row, field) for field in WEATHER_FIELDS)
+
+def fetch_historical_24h_raw_stats(date=None):
+    """Stream raw points for an IST day straight into running per-field statistics"""
+    logger.info(f"Streaming raw historical data for date: {date}")
+
+    day_range = get_day_range_utc(date)
+    if day_range is None:
+        return {}
+    start_utc, end_utc = day_range
+
+    query = f"""
+        from(bucket: "{INFLUXDB_BUCKET}")
+          |> range(start: {start_utc}, stop: {end_utc})
+          |> filter(fn: (r) => r._measurement == "sensor_data" and r.location == "field")
+          |> filter(fn: (r) => {WEATHER_FIELD_FILTER})
+          |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+          |> keep(columns: {json.dumps(['_time'] + WEATHER_FIELDS)})
+    """
+
+    try:
+        with influx_flux_query(query, stream=True) as response:
+            if not response.ok:
+                logger.error(f"InfluxDB historical request failed: Status {response.status_code} - {response.text}")
+                return {}
+
+            day_stats = WeatherDayStats()
+            for sensor_row in iter_sensor_rows(iter_response_lines(response)):
+                day_stats.add_row(sensor_row)
+
+        logger.info(f"Top 5 wind speeds: {day_stats.top_winds()}")
+        RECORDS_PARSED.inc('weather_raw', amount=day_stats.rows)
+        logger.info(f"Streamed {day_stats.rows} raw historical data points")
+        return day_stats.as_stats()
+
+    except Exception as e:
+        logger.error(f"Error streaming raw historical data: {str(e)}")
+        return {}
+
+def fetch_historical_24h_stats(date=None):
+    """Fetch per-field daily statistics for an IST day, reduced server-side by Flux.
+
+    Returns {field: {'count', 'mean', 'min', 'max', 'first', 'last', 'max_time'}}
+    plus 'first_rain' (UTC time of the first rain reading) when rain was detected.
+    """
+    logger.info(f"Fetching aggregated historical data for date: {date}")
+
+    day_range = get_day_range_utc(date)
+    if day_range is None:
+        return {}
+    start_utc, end_utc = day_range
+
+    # The range is exactly one IST day, so each bare reducer is equivalent to
+    # aggregateWindow(every: <day>) without aligning windows to UTC midnight.
+    # Rain matches get_rain_status: any non-zero reading below 3000 is rain.
+    query = f"""
+        data = from(bucket: "{INFLUXDB_BUCKET}")
+          |> range(start: {start_utc}, stop: {end_utc})
+          |> filter(fn: (r) => r._measurement == "sensor_data" and r.location == "field")
+          |> filter(fn: (r) => {WEATHER_FIELD_FILTER})
+          |> keep(columns: ["_time", "_field", "_value"])
+          |> group(columns: ["_field"])
+
+        data |> count() |> yield(name: "count")
+        data |> mean() |> yield(name: "mean")
+        data |> min() |> yield(name: "min")
+        data |> max() |> yield(name: "max")
+        data |> first() |> yield(name: "first")
+        data |> last() |> yield(name: "last")
+        data
+          |> filter(fn: (r) => r._field == "rain_intensity" and r._value != 0.0 and r._value < 3000.0)
+          |> first()
+          |> yield(name: "first_rain")
+    """
+
+    try:
+        with influx_flux_query(query) as response:
+            if not response.ok:
+                logger.error(f"InfluxDB aggregated request failed: Status {response.status_code} - {response.text}")
+                return {}
+            text = response.text
+        UPSTREAM_BYTES.observe(len(text), 'influxdb', 'query')
+
+        stats = {}
+        rows = 0
+        for row in iter_flux_csv_rows(text.splitlines()):
+            rows += 1
+            result = row.get('result', '').strip()
+            field = row.get('_field', '').strip()
+            value = row.get('_value', '').strip()
+            if not field or not value or value == 'null':
+                continue
+            try:
+                if result == 'first_rain':
+                    stats['first_rain'] = row['_time'].strip()
+                    continue
+                field_stats = stats.setdefault(field, {})
+                if result == 'count':
+                    field_stats['count'] = int(value)
+                elif result in ('mean', 'min', 'first', 'last'):
+                    field_stats[result] = float(value)
+                elif result == 'max':
+                    field_stats['max'] = float(value)
+                    field_stats['max_time'] = row.get('_time', '').strip()
+            except (ValueError, TypeError, KeyError):
+                logger.warning(f"Invalid aggregated {result} value for {field}: {value}")
+                continue
+
+        RECORDS_PARSED.inc('weather_aggregated', amount=rows)
+        logger.info(f"Fetched aggregated statistics for {len([f for f in stats if f in WEATHER_FIELDS])} fields")
+        return stats
+
+    except Exception as e:
+        logger.error(f"Error fetching aggregated historical data: {str(e)}")
+        return {}
+
+def compute_weather_stats(historical_data):
+    """Reduce raw historical points to the per-field statistics used by the summary"""
+    day_stats = WeatherDayStats(top_k=0)
+    for data_point in historical_data:
+        day_stats.add_point(data_point)
+    return day_stats.as_stats()
+
+def format_ist_time(time_str):
+    """Convert an InfluxDB UTC timestamp string to a readable IST timestamp"""
+    dt = datetime.fromisoformat(time_str.replace('Z', '+00:00')).astimezone(IST)
+    return dt.strftime('%Y-%m-%d %H:%M:%S %Z')
+
+def summarize_weather_stats(stats):
+    """Render per-field daily statistics as the weather summary string"""
+    trends = []
+
+    def trend_of(field_stats):
+        first, last = field_stats['first'], field_stats['last']
+        return "increasing" if last > first else "decreasing" if last < first else "stable"
+
+    # Temperature trends
+    temp = stats.get('temperature')
+    if temp and temp.get('count', 0) >= 2:
+        trends.append(f"Temperature: {trend_of(temp)} trend, avg {temp['mean']:.1f}°C, range {temp['min']:.1f}-{temp['max']:.1f}°C")
+
+    # Humidity trends (avg, min, max)
+    humidity = stats.get('humidity')
+    if humidity and humidity.get('count', 0) >= 2:
+        trends.append(f"Humidity: avg {humidity['mean']:.1f}%, min {humidity['min']:.1f}%, max {humidity['max']:.1f}%")
+
+    # Soil moisture trends
+    soil = stats.get('soil_moisture')
+    if soil and soil.get('count', 0) >= 2:
+        trends.append(f"Soil moisture: {trend_of(soil)} trend, avg {soil['mean']:.1f}%")
+
+    # Wind patterns (avg and max with timestamp in IST)
+    wind = stats.get('wind_speed')
+    if wind and wind.get('count', 0) >= 2:
+        trends.append(f"Wind: avg {wind['mean']:.1f} m/s, max {wind['max']:.1f} m/s at {format_ist_time(wind['max_time'])}")
+
+    # Rain patterns (Yes/No with time of first rain event in IST)
+    if stats.get('rain_intensity', {}).get('count'):
+        first_rain = stats.get('first_rain')
+        if first_rain:
+            rain_time_ist = format_ist_time(first_rain)
+            trends.append(f"Rainfall: Yes at {rain_time_ist}")
+            logger.info(f"Rain detected at {rain_time_ist}")
+        else:
+            trends.append("Rainfall: No")
+            logger.info("No rain detected")
+    else:
+        trends.append("Rainfall: No")
+        logger.info("No rain intensity data available")
+
+    return " | ".join(trends) if trends else "Limited historical data available for analysis."
+
 def analyze_historical_trends(historical_data):
     """Analyze daily trends and patterns with modified wind and rainfall metrics"""
-    if not historical_data:
+    if historical_data is None or not len(historical_data):
         return "No historical data available for trend analysis."
     
     try:
-        # Extract values for analysis
-        temps = [d["temperature"] for d in historical_data if "temperature" in d and d["temperature"] is not None]
-        humidities = [d["humidity"] for d in historical_data if "humidity" in d and d["humidity"] is not None]
-        soil_moistures = [d["soil_moisture"] for d in historical_data if "soil_moisture" in d and d["soil_moisture"] is not None]
-        wind_speeds = [d["wind_speed"] for d in historical_data if "wind_speed" in d and d["wind_speed"] is not None]
-        rain_intensities = [(d["rain_intensity"], d["_time"]) for d in historical_data if "rain_intensity" in d and d["rain_intensity"] is not None]
-        
-        trends = []
-        
-        # Temperature trends
-        if len(temps) >= 2:
-            temp_trend = "increasing" if temps[-1] > temps[0] else "decreasing" if temps[-1] < temps[0] else "stable"
-            avg_temp = statistics.mean(temps)
-            max_temp = max(temps)
-            min_temp = min(temps)
-            trends.append(f"Temperature: {temp_trend} trend, avg {avg_temp:.1f}°C, range {min_temp:.1f}-{max_temp:.1f}°C")
-        
-        # Humidity trends (avg, min, max)
-        if len(humidities) >= 2:
-            avg_humidity = statistics.mean(humidities)
-            min_humidity = min(humidities)
-            max_humidity = max(humidities)
-            trends.append(f"Humidity: avg {avg_humidity:.1f}%, min {min_humidity:.1f}%, max {max_humidity:.1f}%")
-        
-        # Soil moisture trends
-        if len(soil_moistures) >= 2:
-            soil_trend = "increasing" if soil_moistures[-1] > soil_moistures[0] else "decreasing" if soil_moistures[-1] < soil_moistures[0] else "stable"
-            avg_soil = statistics.mean(soil_moistures)
-            trends.append(f"Soil moisture: {soil_trend} trend, avg {avg_soil:.1f}%")
-        
-        # Wind patterns (avg and max with timestamp in IST)
-        if len(wind_speeds) >= 2:
-            avg_wind = statistics.mean(wind_speeds)
-            max_wind = max(wind_speeds)
-            max_wind_time = next(d['_time'] for d in historical_data if d.get('wind_speed') == max_wind)
-            max_wind_dt = datetime.fromisoformat(max_wind_time.replace('Z', '+00:00')).astimezone(IST)
-            max_wind_time_ist = max_wind_dt.strftime('%Y-%m-%d %H:%M:%S %Z')
-            trends.append(f"Wind: avg {avg_wind:.1f} m/s, max {max_wind:.1f} m/s at {max_wind_time_ist}")
-        
-        # Rain patterns (Yes/No with time of first rain event in IST)
-        if rain_intensities:
-            rain_events = [(get_rain_status(r), t) for r, t in rain_intensities]
-            rain_detected = any(status in ["Heavy Rain", "Light Rain"] for status, _ in rain_events)
-            if rain_detected:
-                # Find the first rain event
-                first_rain = next((t for status, t in rain_events if status in ["Heavy Rain", "Light Rain"]), None)
-                if first_rain:
-                    rain_time_dt = datetime.fromisoformat(first_rain.replace('Z', '+00:00')).astimezone(IST)
-                    rain_time_ist = rain_time_dt.strftime('%Y-%m-%d %H:%M:%S %Z')
-                    trends.append(f"Rainfall: Yes at {rain_time_ist}")
-                    logger.info(f"Rain detected at {rain_time_ist}")
-                else:
-                    trends.append("Rainfall: Yes")
-                    logger.info("Rain detected, but no valid timestamp found")
-            else:
-                trends.append("Rainfall: No")
-                logger.info("No rain detected")
-        else:
-            trends.append("Rainfall: No")
-            logger.info("No rain intensity data available")
-        
-        return " | ".join(trends) if trends else "Limited historical data available for analysis."
-        
+        if isinstance(historical_data, SensorDayColumns):
+            return summarize_weather_stats(historical_data.weather_stats())
+        return summarize_weather_stats(compute_weather_stats(historical_data))
     except Exception as e:
         logger.error(f"Error analyzing historical trends: {str(e)}")
         return "Error analyzing historical trends."
 
-def unescape_influxdb(value):
-    """Unescape InfluxDB-escaped strings by removing backslashes before spaces, commas, and equals signs."""
-    if isinstance(value, str):
-        # Replace escaped characters with their unescaped versions
-        return value.replace('\\ ', ' ').replace('\\,', ',').replace('\\=', '=').replace('\\\\', '\\')
-    return value
+# Weather summary cache configuration
+WEATHER_CACHE_MAX_DAYS = int(os.getenv('WEATHER_CACHE_MAX_DAYS', '256'))
+WEATHER_CACHE_TODAY_TTL = int(os.getenv('WEATHER_CACHE_TODAY_TTL', '300'))  # seconds
+
+class WeatherSummaryCache:
+    """LRU cache of (summary, has_data) weather entries keyed by IST date (YYYY-MM-DD).
+
+    Entries stored with ttl=None never expire (closed past days); entries with a
+    ttl expire after that many seconds (the current day, whose data still grows).
+    """
+
+    def __init__(self, max_entries, default_ttl):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # date -> (entry, expires_at or None)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, date):
+        with self._lock:
+            entry = self._entries.get(date)
+            if entry is not None:
+                summary, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(date)
+                    self.hits += 1
+                    return summary
+                del self._entries[date]
+            self.misses += 1
+            return None
+
+    def put(self, date, summary, ttl=None):
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries[date] = (summary, expires_at)
+            self._entries.move_to_end(date)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+weather_cache = WeatherSummaryCache(WEATHER_CACHE_MAX_DAYS, WEATHER_CACHE_TODAY_TTL)
+
+def get_weather_summary(date, refresh=False):
+    """Return the weather summary for an IST date, served from the cache when possible.
+
+    refresh=True recomputes it and replaces the cached entry.
+    """
+    return get_weather_summary_entry(date, refresh)[0]
+
+def get_weather_summary_entry(date, refresh=False):
+    """(summary, has_data) for an IST date; has_data is False for the placeholder summaries
+    returned when there were no readings or the analysis failed"""
+    entry = None if refresh else weather_cache.get(date)
+    if entry is not None:
+        return entry
+
+    if WEATHER_QUERY_MODE == 'raw':
+        stats = fetch_historical_24h_raw_stats(date)
+    elif WEATHER_QUERY_MODE == 'columnar' and np is not None:
+        day_columns = fetch_historical_24h_data(date, columnar=True)
+        stats = day_columns.weather_stats() if len(day_columns) else {}
+    else:
+        stats = fetch_historical_24h_stats(date)
+    has_data = any(field in stats for field in WEATHER_FIELDS)
+    if has_data:
+        try:
+            summary = summarize_weather_stats(stats)
+        except Exception as e:
+            logger.error(f"Error analyzing historical trends: {str(e)}")
+            summary = "Error analyzing historical trends."
+            has_data = False
+    else:
+        summary = "No historical data available for trend analysis."
+
+    # Past days are closed and their sensor data can no longer change, so they are
+    # cached permanently. Today (or an empty/failed fetch) only gets a short TTL.
+    today = datetime.now(IST).strftime('%Y-%m-%d')
+    ttl = None if date < today and has_data else weather_cache.default_ttl
+    weather_cache.put(date, (summary, has_data), ttl)
+    return summary, has_data
+
+# Date-range weather summaries fan out per day over a bounded worker pool
+WEATHER_RANGE_MAX_DAYS = int(os.getenv('WEATHER_RANGE_MAX_DAYS', '92'))
+WEATHER_RANGE_CONCURRENCY = int(os.getenv('WEATHER_RANGE_CONCURRENCY', '8'))
+weather_executor = ThreadPoolExecutor(max_workers=WEATHER_RANGE_CONCURRENCY, thread_name_prefix='weather')
+
+def get_weather_summaries(dates):
+    """Return [(date, (summary, has_data))] for several IST dates, fetching uncached days concurrently"""
+    return list(zip(dates, weather_executor.map(get_weather_summary_entry, dates)))
+
+# Write durability: 'verify' re-reads every write before responding, 'ack' trusts the
+# write API's response, 'async-verify' re-reads in a background worker and retries failures
+WRITE_DURABILITY_MODE = os.getenv('WRITE_DURABILITY_MODE', 'verify').lower()
+WRITE_VERIFY_DELAY = float(os.getenv('WRITE_VERIFY_DELAY', '2'))  # seconds before an async verification
+WRITE_VERIFY_MAX_RETRIES = int(os.getenv('WRITE_VERIFY_MAX_RETRIES', '3'))
+
+if WRITE_DURABILITY_MODE == 'async-verify' and SERVERLESS:
+    # The verifier's timers and thread freeze with the instance between requests
+    logger.warning("WRITE_DURABILITY_MODE=async-verify is not supported in serverless mode; using verify")
+    WRITE_DURABILITY_MODE = 'verify'
+
+def find_rejected_points():
+    """Return recent rejected-point messages for the bucket from the _monitoring bucket"""
+    rejection_query = f'''
+    from(bucket: "_monitoring")
+        |> range(start: -1h)
+        |> filter(fn: (r) => r["_measurement"] == "rejected_points")
+        |> filter(fn: (r) => r["bucket"] == "{INFLUXDB_BUCKET}")
+        |> limit(n: 10)
+    '''
+    rejections = influx_query(rejection_query)
+    return [record["_value"] for table in rejections for record in table.records]
+
+def verify_write(verify_query, check_rejections=False):
+    """Run a post-write verification query; returns (verified, rejection errors)"""
+    tables = influx_query(verify_query)
+    if tables:
+        return True, []
+    return False, find_rejected_points() if check_rejections else []
+
+class WriteVerifier:
+    """Background worker that verifies writes out-of-band and rewrites points that went missing.
+
+    Writes that still cannot be verified after max_retries rewrites are kept in
+    `failures` together with their line protocol so they can be inspected and replayed.
+    """
+
+    def __init__(self, delay, max_retries):
+        self.delay = delay
+        self.max_retries = max_retries
+        self.failures = deque(maxlen=200)
+        self.verified = 0
+        self.retried = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, description, verify_query, lines, check_rejections=False):
+        self._ensure_started()
+        self._schedule({
+            'description': description,
+            'query': verify_query,
+            'lines': lines,
+            'check_rejections': check_rejections,
+            'attempts': 0
+        }, self.delay)
+
+    def _schedule(self, job, delay):
+        timer = threading.Timer(delay, self._queue.put, args=(job,))
+        timer.daemon = True
+        timer.start()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='write-verifier', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                verified, errors = verify_write(job['query'], job['check_rejections'])
+            except Exception as e:
+                verified, errors = False, []
+                logger.error(f"Async verification query failed: {job['description']}: {str(e)}")
+
+            if verified:
+                with self._lock:
+                    self.verified += 1
+                logger.info(f"Async verification succeeded: {job['description']}")
+                continue
+
+            # Rejected points will be rejected again, so only rewrite points that went missing
+            if not errors and job['attempts'] < self.max_retries:
+                job['attempts'] += 1
+                try:
+                    influx_write(job['lines'])
+                    with self._lock:
+                        self.retried += 1
+                    logger.warning(f"Async verification failed, rewrote points (attempt {job['attempts']}): {job['description']}")
+                except Exception as e:
+                    logger.error(f"Rewrite after failed verification errored: {job['description']}: {str(e)}")
+                self._schedule(job, self.delay * 2 ** job['attempts'])
+                continue
+
+            logger.error(f"Async verification gave up: {job['description']}, errors={errors}")
+            with self._lock:
+                self.failures.append({
+                    'description': job['description'],
+                    'attempts': job['attempts'],
+                    'errors': errors,
+                    'lines': job['lines'],
+                    'failed_at': datetime.now(IST).isoformat()
+                })
+
+    def stats(self):
+        with self._lock:
+            return {
+                'mode': WRITE_DURABILITY_MODE,
+                'queued': self._queue.qsize(),
+                'verified': self.verified,
+                'retried': self.retried,
+                'failed': len(self.failures),
+                'failures': list(self.failures)
+            }
+
+write_verifier = WriteVerifier(WRITE_VERIFY_DELAY, WRITE_VERIFY_MAX_RETRIES)
+
+# Batched write pipeline: points are spooled to local SQLite and drained to InfluxDB in the background
+WRITE_PIPELINE_ENABLED = os.getenv('WRITE_PIPELINE_ENABLED', 'false').lower() == 'true'
+WRITE_PIPELINE_BATCH_SIZE = int(os.getenv('WRITE_PIPELINE_BATCH_SIZE', '500'))
+WRITE_PIPELINE_FLUSH_INTERVAL = float(os.getenv('WRITE_PIPELINE_FLUSH_INTERVAL', '1'))  # seconds
+WRITE_SPOOL_PATH = os.getenv('WRITE_SPOOL_PATH', os.path.join(LOCAL_STATE_DIR, 'write_spool.db'))
+
+write_pipeline = None
+if WRITE_PIPELINE_ENABLED and SERVERLESS:
+    # A frozen or recycled serverless instance would strand spooled points
+    logger.warning("WRITE_PIPELINE_ENABLED is ignored in serverless mode; writes go straight to InfluxDB")
+elif WRITE_PIPELINE_ENABLED:
+    from write_pipeline import WritePipeline
+    write_pipeline = WritePipeline(
+        WRITE_SPOOL_PATH, INFLUXDB_URL, INFLUXDB_TOKEN, INFLUXDB_ORG, INFLUXDB_BUCKET,
+        session=get_influx_session(),
+        batch_size=WRITE_PIPELINE_BATCH_SIZE,
+        flush_interval=WRITE_PIPELINE_FLUSH_INTERVAL,
+        timeout=INFLUXDB_HTTP_READ_TIMEOUT
+    )
+    write_pipeline.start()
+
+def write_task_lines(lines):
+    """Write line protocol records and return the durability mode that applies to them.
+
+    With the write pipeline enabled the lines are only spooled locally ('spooled');
+    otherwise they are written synchronously and WRITE_DURABILITY_MODE applies.
+    """
+    if write_pipeline is not None:
+        write_pipeline.submit(lines)
+        update_read_model(lines)
+        bump_data_versions(lines)
+        return 'spooled'
+    influx_write(lines)
+    update_read_model(lines)
+    bump_data_versions(lines)
+    return WRITE_DURABILITY_MODE
+
+# Local SQLite read model of Vimal_Task rows: fed by every write and periodically
+# reconciled with InfluxDB, so /get_data can answer without an upstream round trip
+# (off by default in serverless mode, where nothing would reconcile it)
+READ_MODEL_ENABLED = os.getenv('READ_MODEL_ENABLED', 'false' if SERVERLESS else 'true').lower() in ('1', 'true', 'yes')
+READ_MODEL_PATH = os.getenv('READ_MODEL_PATH', os.path.join(LOCAL_STATE_DIR, 'task_read_model.db'))
+READ_MODEL_WINDOW_DAYS = int(os.getenv('READ_MODEL_WINDOW_DAYS', '30'))
+READ_MODEL_RECONCILE_MINUTES = int(os.getenv('READ_MODEL_RECONCILE_MINUTES', '10'))
+
+read_model = TaskReadModel(READ_MODEL_PATH) if READ_MODEL_ENABLED else None
+
+def update_read_model(lines):
+    """Apply written lines to the read model; a failure here never fails the write"""
+    if read_model is None:
+        return
+    try:
+        read_model.apply_lines(lines)
+    except Exception as e:
+        logger.error(f"Failed to update read model: {str(e)}")
+
+def reconcile_read_model():
+    """Replace the trailing READ_MODEL_WINDOW_DAYS of the read model with InfluxDB's rows"""
+    if read_model is None:
+        return
+    if write_pipeline is not None and write_pipeline.depth():
+        # Spooled lines are not upstream yet; reconciling now would hide them locally
+        logger.info("Skipping read model reconcile while the write spool is draining")
+        return
+    started = time.time()
+    window_start = datetime.now(timezone.utc) - timedelta(days=READ_MODEL_WINDOW_DAYS)
+    query = build_task_query(INFLUXDB_BUCKET, f"-{READ_MODEL_WINDOW_DAYS}d", 'now()')
+    try:
+        records = list(influx_query_stream(query))
+        changed = read_model.replace_window(records, window_start, started)
+        if changed:
+            data_versions.bump(changed)
+        logger.info(f"Reconciled read model with {len(records)} upstream rows ({len(changed)} changed slices) "
+                    f"in {(time.time() - started) * 1000:.0f} ms")
+    except Exception as e:
+        logger.error(f"Read model reconcile failed: {str(e)}")
+
+# Write counters per (date, type) that back the ETags of the read endpoints
+DATA_VERSIONS_PATH = os.getenv('DATA_VERSIONS_PATH', os.path.join(LOCAL_STATE_DIR, 'data_versions.db'))
+data_versions = DataVersions(DATA_VERSIONS_PATH)
+
+# The versions only move on writes and reconciles seen by this host. They can stand in
+# for the response only when it is served from the read model's reconciled window, where
+# every upstream write (other deployments, direct or backdated writes) is picked up by the
+# next reconcile. Any other read, and every read on serverless instances that each have
+# their own /tmp, gets an ETag derived from the response body instead
+DATA_VERSIONS_ETAGS = read_model is not None and not SERVERLESS
+
+def bump_data_versions(lines):
+    """Invalidate cached reads of every (date, type) the written lines touch"""
+    keys = set()
+    for line in lines:
+        try:
+            measurement, tags, _, _ = parse_line_protocol(line)
+        except ValueError:
+            continue
+        if measurement == 'Vimal_Task':
+            keys.add((tags.get('date', ''), tags.get('type', '')))
+    try:
+        data_versions.bump(keys)
+    except Exception as e:
+        logger.error(f"Failed to bump data versions: {str(e)}")
+
+# HTTP caching and compression of read responses
+GET_DATA_CACHE_CONTROL = os.getenv('GET_DATA_CACHE_CONTROL', 'private, no-cache')
+WEATHER_PAST_MAX_AGE = int(os.getenv('WEATHER_PAST_MAX_AGE', '86400'))
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/html', 'text/css',
+                      'text/plain', 'application/javascript'}
+CONTENT_ENCODING_SUFFIXES = ('-br', '-gzip')
+
+def make_etag(*parts):
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:32]
+
+def etag_matches(etag):
+    """If-None-Match check that also accepts the encoding-suffixed ETags set by compress_response"""
+    return any(candidate in request.if_none_match
+               for candidate in (etag,) + tuple(etag + suffix for suffix in CONTENT_ENCODING_SUFFIXES))
+
+def not_modified(etag, cache_control):
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+def cacheable(response, etag, cache_control):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+@app.after_request
+def compress_response(response):
+    """gzip/br-encode large text responses for clients that accept it"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESS_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        encoding, body = 'br', brotli.compress(body, quality=5)
+    elif accepted['gzip']:
+        encoding, body = 'gzip', gzip.compress(body, compresslevel=6)
+    else:
+        return response
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        # A strong ETag names one exact representation, so each encoding gets its own
+        response.set_etag(f'{etag}-{encoding}', weak=weak)
+    return response
 
 @app.route('/')
 def serve_index():
@@ -322,7 +1257,7 @@ def serve_agronomist():
 
 @app.route('/ping', methods=['GET'])
 def ping():
-    print(f"Ping received at {datetime.now().isoformat()} - Instance is alive!")
+    logger.debug("Ping received - Instance is alive!")
     return jsonify({
         'status': 'alive',
         'timestamp': datetime.now().isoformat(),
@@ -331,9 +1266,209 @@ def ping():
 
 @app.route('/healthz', methods=['GET'])
 def healthz():
-    print(f"Health check received at {datetime.now().isoformat()}")
+    logger.debug("Health check received")
     return jsonify({'status': 'healthy'}), 200
 
+@app.route('/weather_cache_stats', methods=['GET'])
+def weather_cache_stats():
+    """Expose weather summary cache hit/miss counters"""
+    return jsonify(weather_cache.stats()), 200
+
+@app.route('/write_verification_status', methods=['GET'])
+def write_verification_status():
+    """Expose async write verification counters and writes that could not be verified"""
+    return jsonify(write_verifier.stats()), 200
+
+@app.route('/write_pipeline_status', methods=['GET'])
+def write_pipeline_status():
+    """Expose write pipeline queue depth and flush latency"""
+    if write_pipeline is None:
+        return jsonify({'enabled': False}), 200
+    return jsonify(dict(write_pipeline.stats(), enabled=True)), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/read_model_status', methods=['GET'])
+def read_model_status():
+    """Report the local read model's size, coverage and reconcile state"""
+    if read_model is None:
+        return jsonify({'enabled': False}), 200
+    return jsonify({'enabled': True, **read_model.stats()}), 200
+
+def weather_cache_control(dates, has_data):
+    """Closed past days with real data can be cached for long. Anything including today, or a
+    placeholder summary from a failed or empty fetch, only for the cache TTL, like the server does"""
+    today = datetime.now(IST).strftime('%Y-%m-%d')
+    max_age = WEATHER_PAST_MAX_AGE if max(dates) < today and has_data else WEATHER_CACHE_TODAY_TTL
+    return f'public, max-age={max_age}'
+
+@app.route('/weather_summary', methods=['GET'])
+def weather_summary():
+    """Return the weather summary for one IST date (?date=YYYY-MM-DD)"""
+    date = request.args.get('date', '')
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'Invalid date format, expected YYYY-MM-DD'}), 400
+    try:
+        summary, has_data = get_weather_summary_entry(date)
+    except Exception as e:
+        logger.error(f"Error fetching weather summary for {date}: {str(e)}")
+        return jsonify({'error': f'Failed to fetch weather summary: {str(e)}'}), 500
+
+    etag = make_etag(date, summary)
+    cache_control = weather_cache_control([date], has_data)
+    if etag_matches(etag):
+        return not_modified(etag, cache_control)
+    return cacheable(jsonify({'date': date, 'weather_summary': summary}), etag, cache_control), 200
+
+@app.route('/weather_summary_range', methods=['GET', 'POST'])
+def weather_summary_range():
+    """Return per-day weather summaries for an inclusive IST date range"""
+    try:
+        data = request.json if request.method == 'POST' else request.args
+        start_date = data.get('start_date', '')
+        end_date = data.get('end_date', '')
+
+        try:
+            start = datetime.strptime(start_date, '%Y-%m-%d').date()
+            end = datetime.strptime(end_date, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid date format for start_date/end_date, expected YYYY-MM-DD'}), 400
+
+        # Days after today have no sensor data yet
+        end = min(end, datetime.now(IST).date())
+        if start > end:
+            return jsonify({'error': 'start_date must not be after end_date or today'}), 400
+        days = (end - start).days + 1
+        if days > WEATHER_RANGE_MAX_DAYS:
+            return jsonify({'error': f'Date range too large: {days} days (max {WEATHER_RANGE_MAX_DAYS})'}), 400
+
+        dates = [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+        logger.info(f"Fetching weather summaries for {days} days: {dates[0]} to {dates[-1]}")
+        entries = get_weather_summaries(dates)
+        summaries = [{'date': date, 'weather_summary': summary} for date, (summary, _) in entries]
+
+        response = jsonify({
+            'summaries': summaries,
+            'message': f"Retrieved weather summaries for {days} days"
+        })
+        if request.method == 'GET':
+            etag = make_etag(summaries)
+            cache_control = weather_cache_control(dates, all(has_data for _, (_, has_data) in entries))
+            if etag_matches(etag):
+                return not_modified(etag, cache_control)
+            cacheable(response, etag, cache_control)
+        return response, 200
+
+    except Exception as e:
+        logger.error(f"Error fetching weather summary range: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': f'Failed to fetch weather summaries: {str(e)}'}), 500
+
+# Multipart uploads are streamed to Cloudinary in chunks so peak memory stays bounded per request
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', str(25 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', str(6 * 1024 * 1024)))  # Cloudinary minimum is 5 MB
+
+# Uploaded photos are downscaled to a bounded main image plus a thumbnail, and de-duplicated by content hash
+IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', '1600'))
+IMAGE_THUMBNAIL_DIMENSION = int(os.getenv('IMAGE_THUMBNAIL_DIMENSION', '320'))
+IMAGE_JPEG_QUALITY = int(os.getenv('IMAGE_JPEG_QUALITY', '85'))
+IMAGE_HASH_INDEX_PATH = os.getenv('IMAGE_HASH_INDEX_PATH', os.path.join(LOCAL_STATE_DIR, 'image_hashes.db'))
+
+image_index = ImageHashIndex(IMAGE_HASH_INDEX_PATH)
+
+def image_public_id(question_id, timestamp):
+    safe_timestamp = timestamp.replace(':', '-').replace('.', '-')
+    return f"smart_agri/{question_id}_{safe_timestamp}"
+
+def upload_image_variants(stream, public_id, filename=None):
+    """Upload a photo as a bounded-size main image plus a thumbnail.
+
+    Returns (image_url, thumbnail_url, content_hash, deduplicated). Photos whose
+    content hash was seen before are not uploaded again.
+    """
+    content_hash = hash_stream(stream)
+    known = image_index.get(content_hash)
+    if known:
+        image_url, thumbnail_url = known
+        logger.info(f"Skipping upload of duplicate image {content_hash[:12]}: {image_url}")
+        return image_url, thumbnail_url, content_hash, True
+
+    variants = make_image_variants(stream, IMAGE_MAX_DIMENSION, IMAGE_THUMBNAIL_DIMENSION, IMAGE_JPEG_QUALITY)
+    if variants:
+        main, thumbnail = variants
+        # The two uploads are independent, so the thumbnail goes up while the main image does
+        thumbnail_future = upstream_executor.submit(
+            cloudinary_upload,
+            thumbnail, upload_preset=CLOUDINARY_UPLOAD_PRESET, public_id=f"{public_id}_thumb", folder="smart_agri"
+        )
+        result = cloudinary_upload(main, upload_preset=CLOUDINARY_UPLOAD_PRESET, public_id=public_id, folder="smart_agri")
+        image_url = result['secure_url']
+        thumbnail_url = thumbnail_future.result()['secure_url']
+    else:
+        # No Pillow (or undecodable image): stream the original and let Cloudinary bound its size
+        # on ingest; the thumbnail is a derived transformation URL of the same asset
+        result = cloudinary_upload(
+            stream,
+            large=True,
+            filename=filename or 'image.jpg',
+            chunk_size=UPLOAD_CHUNK_SIZE,
+            upload_preset=CLOUDINARY_UPLOAD_PRESET,
+            public_id=public_id,
+            folder="smart_agri",
+            transformation=[{'width': IMAGE_MAX_DIMENSION, 'height': IMAGE_MAX_DIMENSION, 'crop': 'limit'}]
+        )
+        image_url = result['secure_url']
+        thumbnail_url = get_cloudinary().CloudinaryImage(result['public_id']).build_url(
+            width=IMAGE_THUMBNAIL_DIMENSION, height=IMAGE_THUMBNAIL_DIMENSION, crop='limit', secure=True
+        )
+
+    image_index.put(content_hash, image_url, thumbnail_url)
+    return image_url, thumbnail_url, content_hash, False
+
+def write_image_record(question_id, date, timestamp, image_url, thumbnail_url=None, content_hash=None):
+    """Write the Vimal_Task image point linking an uploaded photo to its question"""
+    prefix = tag_prefix("Vimal_Task", (("date", date), ("question_id", question_id), ("type", "image")))
+    fields = (("image_url", image_url), ("thumbnail_url", thumbnail_url or None), ("content_hash", content_hash or None))
+    write_task_lines(BatchEncoder().add(prefix, fields, to_timestamp_ns(timestamp)).lines())
+
+# Background upload jobs: the photo is persisted locally and the request returns a job id at once
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', '4'))
+UPLOAD_MAX_RETRIES = int(os.getenv('UPLOAD_MAX_RETRIES', '3'))
+UPLOAD_RETRY_DELAY = float(os.getenv('UPLOAD_RETRY_DELAY', '2'))  # seconds, doubled per attempt
+UPLOAD_RECOVER_MINUTES = int(os.getenv('UPLOAD_RECOVER_MINUTES', '5'))  # how often expired job leases are reclaimed
+
+def upload_photo(stream, question_id, date, timestamp, filename=None):
+    """Upload a photo with its thumbnail and write its image point"""
+    image_url, thumbnail_url, content_hash, deduplicated = upload_image_variants(
+        stream, image_public_id(question_id, timestamp), filename=filename
+    )
+    write_image_record(question_id, date, timestamp, image_url, thumbnail_url, content_hash)
+    return {'image_url': image_url, 'thumbnail_url': thumbnail_url, 'deduplicated': deduplicated}
+
+def process_upload_job(job):
+    """Upload a spooled photo; run on the upload worker pool"""
+    with open(job['spool_path'], 'rb') as stream:
+        return upload_photo(stream, job['question_id'], job['date'], job['timestamp'], filename=job['filename'])
+
+# Serverless instances freeze between requests and their /tmp goes away with them, so
+# queued jobs would be stranded; /upload_image_async uploads synchronously there instead
+upload_jobs = None
+if not SERVERLESS:
+    upload_jobs = UploadJobQueue(
+        os.path.join(LOCAL_STATE_DIR, 'upload_jobs.db'),
+        os.path.join(LOCAL_STATE_DIR, 'upload_spool'),
+        process_upload_job,
+        max_workers=UPLOAD_WORKERS,
+        max_retries=UPLOAD_MAX_RETRIES,
+        retry_delay=UPLOAD_RETRY_DELAY
+    )
+    upload_jobs.recover()
+
 @app.route('/upload_image', methods=['POST'])
 def upload_image():
     try:
@@ -346,9 +1481,7 @@ def upload_image():
         if not image_data or not question_id or not date:
             return jsonify({'error': 'Missing image, question_id, or date'}), 400
 
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
-        else:
+        if ',' not in image_data:
             return jsonify({'error': 'Invalid base64 image data'}), 400
 
         try:
@@ -356,47 +1489,202 @@ def upload_image():
         except ValueError:
             return jsonify({'error': 'Invalid date format, expected YYYY-MM-DD'}), 400
 
-        safe_timestamp = timestamp.replace(':', '-').replace('.', '-')
-        public_id = f"smart_agri/{question_id}_{safe_timestamp}"
+        try:
+            image_stream = BytesIO(base64.b64decode(image_data.split(',', 1)[1]))
+        except ValueError:
+            return jsonify({'error': 'Invalid base64 image data'}), 400
+
+        public_id = image_public_id(question_id, timestamp)
 
         try:
-            result = cloudinary.uploader.upload(
-                f"data:image/jpeg;base64,{image_data}",
-                upload_preset=CLOUDINARY_UPLOAD_PRESET,
-                public_id=public_id,
-                folder="smart_agri"
-            )
-            image_url = result['secure_url']
-            print(f"Image uploaded successfully: question_id={question_id}, date={date}, url={image_url}")
+            image_url, thumbnail_url, content_hash, deduplicated = upload_image_variants(image_stream, public_id)
+            logger.info(f"Image uploaded successfully: question_id={question_id}, date={date}, url={image_url}")
         except Exception as e:
-            print(f"Cloudinary upload error: {str(e)}")
+            logger.error(f"Cloudinary upload error: {str(e)}")
             return jsonify({'error': f'Failed to upload to Cloudinary: {str(e)}'}), 500
 
-        point = Point("Vimal_Task") \
-            .tag("question_id", question_id) \
-            .tag("type", "image") \
-            .tag("date", date) \
-            .field("image_url", image_url) \
-            .time(timestamp, WritePrecision.NS)
+        try:
+            write_image_record(question_id, date, timestamp, image_url, thumbnail_url, content_hash)
+            logger.info(f"Successfully wrote image record: question_id={question_id}, date={date}, url={image_url}")
+        except Exception as e:
+            logger.error(f"InfluxDB write error: {str(e)}")
+            return jsonify({'error': f'Failed to write to InfluxDB: {str(e)}'}), 500
+
+        return jsonify({'image_url': image_url, 'thumbnail_url': thumbnail_url, 'deduplicated': deduplicated}), 200
+    except Exception as e:
+        logger.error(f"Server error in upload_image: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@app.route('/upload_image_stream', methods=['POST'])
+def upload_image_stream():
+    """Multipart image upload: the file part is streamed without base64 round trips.
+
+    Expects form fields question_id, date and timestamp plus an 'image' file part.
+    """
+    try:
+        if request.content_length is not None and request.content_length > UPLOAD_MAX_BYTES:
+            return jsonify({'error': f'Image too large (max {UPLOAD_MAX_BYTES} bytes)'}), 413
+
+        # Werkzeug spools large file parts to a temporary file rather than holding them in memory
+        image_file = request.files.get('image')
+        question_id = request.form.get('question_id')
+        timestamp = request.form.get('timestamp')
+        date = request.form.get('date')
+
+        if not image_file or not question_id or not date or not timestamp:
+            return jsonify({'error': 'Missing image, question_id, date, or timestamp'}), 400
 
         try:
-            write_api.write(bucket=INFLUXDB_BUCKET, org=INFLUXDB_ORG, record=point)
-            print(f"Successfully wrote image record: question_id={question_id}, date={date}, url={image_url}")
+            datetime.strptime(date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'Invalid date format, expected YYYY-MM-DD'}), 400
+
+        public_id = image_public_id(question_id, timestamp)
+
+        try:
+            image_url, thumbnail_url, content_hash, deduplicated = upload_image_variants(
+                image_file.stream, public_id, filename=image_file.filename
+            )
+            logger.info(f"Image streamed successfully: question_id={question_id}, date={date}, url={image_url}")
+        except Exception as e:
+            logger.error(f"Cloudinary upload error: {str(e)}")
+            return jsonify({'error': f'Failed to upload to Cloudinary: {str(e)}'}), 500
+
+        try:
+            write_image_record(question_id, date, timestamp, image_url, thumbnail_url, content_hash)
+            logger.info(f"Successfully wrote image record: question_id={question_id}, date={date}, url={image_url}")
         except Exception as e:
-            print(f"InfluxDB write error: {str(e)}")
+            logger.error(f"InfluxDB write error: {str(e)}")
             return jsonify({'error': f'Failed to write to InfluxDB: {str(e)}'}), 500
 
-        return jsonify({'image_url': image_url}), 200
+        return jsonify({'image_url': image_url, 'thumbnail_url': thumbnail_url, 'deduplicated': deduplicated}), 200
     except Exception as e:
-        print(f"Server error in upload_image: {str(e)}")
+        logger.error(f"Server error in upload_image_stream: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+@app.route('/upload_image_async', methods=['POST'])
+def upload_image_async():
+    """Accept a photo (multipart 'image' part or JSON base64 'image'), persist it and return a job id.
+
+    The Cloudinary upload and InfluxDB write happen on the upload worker pool;
+    poll /upload_status/<job_id> for the final image_url. In serverless mode there
+    is no worker pool: the photo is uploaded before responding and the response
+    carries the image_url with status 'done'.
+    """
+    try:
+        if request.content_length is not None and request.content_length > UPLOAD_MAX_BYTES:
+            return jsonify({'error': f'Image too large (max {UPLOAD_MAX_BYTES} bytes)'}), 413
+
+        if request.files:
+            image_file = request.files.get('image')
+            fields = request.form
+            filename = image_file.filename if image_file else None
+        else:
+            image_file = None
+            fields = request.json or {}
+            filename = None
+        question_id = fields.get('question_id')
+        timestamp = fields.get('timestamp')
+        date = fields.get('date')
+
+        if not (image_file or fields.get('image')) or not question_id or not date or not timestamp:
+            return jsonify({'error': 'Missing image, question_id, date, or timestamp'}), 400
+
+        try:
+            datetime.strptime(date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'Invalid date format, expected YYYY-MM-DD'}), 400
+
+        image_bytes = None
+        if not image_file:
+            image_data = fields['image']
+            if ',' not in image_data:
+                return jsonify({'error': 'Invalid base64 image data'}), 400
+            try:
+                image_bytes = base64.b64decode(image_data.split(',', 1)[1])
+            except ValueError:
+                return jsonify({'error': 'Invalid base64 image data'}), 400
+
+        if upload_jobs is None:
+            stream = image_file.stream if image_file else BytesIO(image_bytes)
+            try:
+                result = upload_photo(stream, question_id, date, timestamp, filename=filename)
+            except Exception as e:
+                logger.error(f"Synchronous upload failed: question_id={question_id}, date={date}: {str(e)}")
+                return jsonify({'error': f'Failed to upload image: {str(e)}'}), 500
+            return jsonify(dict(result, status='done')), 200
+
+        job_id = upload_jobs.new_job_id()
+        spool_path = upload_jobs.spool_path_for(job_id)
+        if image_file:
+            image_file.save(spool_path)
+        else:
+            with open(spool_path, 'wb') as spool_file:
+                spool_file.write(image_bytes)
+
+        upload_jobs.submit(job_id, question_id, date, timestamp, filename=filename)
+        logger.info(f"Queued upload job {job_id}: question_id={question_id}, date={date}")
+        return jsonify({'job_id': job_id, 'status': 'queued', 'status_url': f'/upload_status/{job_id}'}), 202
+    except Exception as e:
+        logger.error(f"Server error in upload_image_async: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@app.route('/upload_status/<job_id>', methods=['GET'])
+def upload_status(job_id):
+    """Report the state of a background upload job and its image_url once done"""
+    status = upload_jobs.status(job_id) if upload_jobs is not None else None
+    if status is None:
+        return jsonify({'error': f'Unknown upload job: {job_id}'}), 404
+    return jsonify(status), 200
+
+def add_form_responses(encoder, form, date, language, responses, timestamp_ns):
+    """Encode one form's answers as Vimal_Task points.
+
+    Questions are matched against the form's canonical questions and aliases and
+    stored under their canonical text and id. Returns (points added, unknown questions).
+    """
+    prefix = tag_prefix('Vimal_Task', (('date', date), ('type', form.type_tag), ('language', language)))
+    added = 0
+    unknown_questions = []
+
+    for question, response in responses.items():
+        spec = form.resolve(question)
+        if spec is None:
+            unknown_questions.append(question)
+            continue
+
+        answer = str(response.get('answer', ''))
+        followup_text = str(response.get('followup_text', ''))  # Changed to 'followup_text' to match index.html
+        photos_list = response.get('photos', [])
+
+        if not answer and not followup_text and not photos_list:
+            logger.debug("Skipping question %s: No meaningful data", spec.question_id)
+            continue
+
+        added += 1
+
+        photos_urls = [photo.get('url', '') for photo in photos_list if photo.get('url')]
+        # photos is stored as a quoted string field holding the JSON list
+        fields = (
+            ('answer', answer or None),
+            ('followup_text', followup_text or None),
+            ('photos', json.dumps([{'url': url} for url in photos_urls]) if photos_urls else None),
+            ('question', spec.question),
+        )
+        encoder.add(prefix, fields, timestamp_ns, tag_suffix=spec.tag_suffix)
+    if unknown_questions:
+        logger.warning(f"Skipping questions not in form '{form.name}': {unknown_questions}")
+    return added, unknown_questions
+
 @app.route('/save_responses', methods=['POST'])
 def save_responses():
     try:
-        server_date = datetime.now(ZoneInfo('Asia/Kolkata')).strftime('%Y-%m-%d')
-        print(f"Server date (IST): {server_date}")
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("Server date (IST): %s", datetime.now(IST).strftime('%Y-%m-%d'))
 
         data = request.json
         date = data.get('date')
@@ -408,93 +1696,40 @@ def save_responses():
         if not responses:
             return jsonify({'error': 'No responses provided'}), 400
         if not question_type:
-            print(f"Error: question_type is None or missing")
+            logger.warning("question_type is None or missing")
             return jsonify({'error': 'question_type is missing or invalid'}), 400
 
-        received_questions = list(responses.keys())
-        expected_questions = EXPECTED_QUESTIONS.get(question_type, [])
-        if len(received_questions) > len(expected_questions):
-            received_questions = received_questions[:len(expected_questions)]
-        
-        missing_questions = [q for q in received_questions if q not in expected_questions]
-        if missing_questions:
-            print(f"Warning: Some received questions don't match expected: {missing_questions}")
+        form = question_registry.form(question_type)
+        if form is None:
+            logger.warning(f"Unknown question_type: {question_type}")
+            return jsonify({'error': f'Unknown form type: {question_type}'}), 400
 
-        print(f"Received responses: date={date}, type={question_type}, language={language}, timestamp={timestamp}")
-        print(f"Number of responses: {len(responses)}")
+        logger.info(f"Received responses: date={date}, type={question_type}, language={language}, timestamp={timestamp}")
+        logger.debug("Number of responses: %d", len(responses))
 
         try:
-            parsed_time = dateutil.parser.isoparse(timestamp)
-            timestamp_ns = int(parsed_time.timestamp() * 1_000_000_000)
+            timestamp_ns = to_timestamp_ns(dateutil.parser.isoparse(timestamp))
         except ValueError as e:
-            print(f"Invalid timestamp format: {timestamp}, error: {str(e)}")
+            logger.warning(f"Invalid timestamp format: {timestamp}, error: {str(e)}")
             return jsonify({'error': f'Invalid timestamp format: {timestamp}'}), 400
 
-        lines = []
-        valid_responses = 0
-        
-        for index, (question, response) in enumerate(responses.items()):
-            if question not in expected_questions:
-                print(f"Skipping invalid question: {question}")
-                continue
-                
-            answer = str(response.get('answer', ''))
-            followup_text = str(response.get('followup_text', ''))  # Changed to 'followup_text' to match index.html
-            photos_list = response.get('photos', [])
-            
-            if not answer and not followup_text and not photos_list:
-                print(f"Skipping question {index + 1}: No meaningful data")
-                continue
+        encoder = BatchEncoder()
+        _, unknown_questions = add_form_responses(encoder, form, date, language, responses, timestamp_ns)
 
-            valid_responses += 1
-            
-            def escape_field(value):
-                if isinstance(value, str):
-                    # Only escape spaces, commas, and equals signs for InfluxDB line protocol
-                    return value.replace('\\', '\\\\').replace(',', '\\,').replace('=', '\\=').replace(' ', '\\ ')
-                return str(value)
-            
-            def escape_tag(value):
-                if isinstance(value, str):
-                    return value.replace('\\', '\\\\').replace(' ', '\\ ').replace(',', '\\,').replace('=', '\\=')
-                return str(value)
-            
-            escaped_question = escape_field(question)
-            escaped_answer = escape_field(answer)
-            escaped_followup_text = escape_field(followup_text)
-            
-            photos_urls = [photo.get('url', '') for photo in photos_list if photo.get('url')]
-            # Store photos as a JSON string without escaping quotes
-            escaped_photos = json.dumps([{'url': url} for url in photos_urls]) if photos_urls else '[]'
-
-            fields = []
-            if escaped_answer:
-                fields.append(f'answer="{escaped_answer}"')
-            if escaped_followup_text:
-                fields.append(f'followup_text="{escaped_followup_text}"')
-            if photos_urls:
-                fields.append(f'photos={escaped_photos}')  # No additional escaping for JSON string
-            fields.append(f'question="{escaped_question}"')
-
-            tag_parts = []
-            tag_parts.append(f"date={escape_tag(date)}")
-            tag_parts.append(f"type={escape_tag(question_type.replace(' ', '_').replace('&', '_'))}")
-            tag_parts.append(f"language={escape_tag(language)}")
-            tag_parts.append(f"question_id=q{index + 1}")
-
-            line = f'Vimal_Task,{",".join(tag_parts)} {",".join(fields)} {timestamp_ns}'
-            lines.append(line)
-            print(f"Generated line for q{index + 1}: {line}")
+        lines = encoder.lines()
+        if debug:
+            for line in lines:
+                logger.debug("Generated line: %s", line)
 
         if not lines:
-            print("No valid data points to write to InfluxDB")
+            logger.warning("No valid data points to write to InfluxDB")
             return jsonify({'error': 'No valid responses to save'}), 400
 
-        print(f"Prepared {len(lines)} valid data points for InfluxDB")
+        logger.debug("Prepared %d valid data points for InfluxDB", len(lines))
 
         try:
-            write_api.write(bucket=INFLUXDB_BUCKET, org=INFLUXDB_ORG, record=lines)
-            print(f"Successfully wrote {len(lines)} records to InfluxDB bucket '{INFLUXDB_BUCKET}'")
+            durability = write_task_lines(lines)
+            logger.info(f"Successfully wrote {len(lines)} records to InfluxDB bucket '{INFLUXDB_BUCKET}'")
 
             query = f'''
             from(bucket: "{INFLUXDB_BUCKET}")
@@ -503,38 +1738,188 @@ def save_responses():
                 |> filter(fn: (r) => r["date"] == "{date}")
                 |> limit(n: {len(lines)})
             '''
-            tables = query_api.query(query=query, org=INFLUXDB_ORG)
-            if not tables:
-                print("Verification failed: No records found after write")
-                rejection_query = f'''
-                from(bucket: "_monitoring")
-                    |> range(start: -1h)
-                    |> filter(fn: (r) => r["_measurement"] == "rejected_points")
-                    |> filter(fn: (r) => r["bucket"] == "{INFLUXDB_BUCKET}")
-                    |> limit(n: 10)
-                '''
-                rejections = query_api.query(query=rejection_query, org=INFLUXDB_ORG)
-                if rejections:
-                    errors = [record["_value"] for table in rejections for record in table.records]
-                    print(f"Rejections found: {errors}")
-                    return jsonify({'error': f'Write rejected: {errors}'}), 500
-                return jsonify({'error': 'Write succeeded but data not found'}), 500
-
-            print(f"Verified {len(tables)} tables written")
+            if durability == 'async-verify':
+                write_verifier.submit(f"save_responses date={date} type={question_type}", query, lines, check_rejections=True)
+            elif durability not in ('ack', 'spooled'):
+                verified, errors = verify_write(query, check_rejections=True)
+                if not verified:
+                    logger.error("Verification failed: No records found after write")
+                    if errors:
+                        logger.error(f"Rejections found: {errors}")
+                        return jsonify({'error': f'Write rejected: {errors}'}), 500
+                    return jsonify({'error': 'Write succeeded but data not found'}), 500
+                logger.info(f"Verified {len(lines)} records written")
+
             return jsonify({
                 'message': f'Responses saved successfully ({len(lines)} records)',
-                'records_written': len(lines)
+                'records_written': len(lines),
+                'durability': durability,
+                'unknown_questions': unknown_questions
             }), 200
         except Exception as e:
-            print(f"InfluxDB write error: {str(e)}")
+            logger.error(f"InfluxDB write error: {str(e)}")
             traceback.print_exc()
             return jsonify({'error': f'Failed to write to InfluxDB: {str(e)}'}), 500
             
     except Exception as e:
-        print(f"Server error in save_responses: {str(e)}")
+        logger.error(f"Server error in save_responses: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+# Bulk ingest: phones that were offline replay several days of forms in one request
+BULK_MAX_SUBMISSIONS = int(os.getenv('BULK_MAX_SUBMISSIONS', '200'))
+IDEMPOTENCY_PATH = os.getenv('IDEMPOTENCY_PATH', os.path.join(LOCAL_STATE_DIR, 'idempotency_keys.db'))
+IDEMPOTENCY_RETENTION_DAYS = int(os.getenv('IDEMPOTENCY_RETENTION_DAYS', '30'))
+
+idempotency_keys = IdempotencyStore(IDEMPOTENCY_PATH, retention_seconds=IDEMPOTENCY_RETENTION_DAYS * 86400)
+
+def submission_idempotency_key(submission):
+    """Client-supplied idempotency_key, or a digest of the submission's content"""
+    key = submission.get('idempotency_key')
+    if key:
+        return f"client:{key}"
+    content = json.dumps([submission.get('date'), submission.get('type'), submission.get('language', 'hindi'),
+                          submission.get('timestamp'), submission.get('responses')], sort_keys=True)
+    return f"sha256:{hashlib.sha256(content.encode('utf-8')).hexdigest()}"
+
+def validate_submission(submission):
+    """Return an error message for a bulk submission that cannot be written, else None"""
+    if not isinstance(submission, dict):
+        return 'Submission must be an object'
+    date = submission.get('date')
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return 'Invalid date format, expected YYYY-MM-DD'
+    if question_registry.form(submission.get('type')) is None:
+        return f"Unknown form type: {submission.get('type')}"
+    if not isinstance(submission.get('language', 'hindi'), str):
+        return 'language must be a string'
+    responses = submission.get('responses')
+    if not responses or not isinstance(responses, dict):
+        return 'No responses provided'
+    if not all(isinstance(response, dict) for response in responses.values()):
+        return 'Each response must be an object'
+    for response in responses.values():
+        photos = response.get('photos', [])
+        if not isinstance(photos, list) or not all(isinstance(photo, dict) for photo in photos):
+            return 'photos must be a list of objects'
+    try:
+        dateutil.parser.isoparse(submission.get('timestamp'))
+    except (TypeError, ValueError):
+        return f"Invalid timestamp format: {submission.get('timestamp')}"
+    return None
+
+@app.route('/save_responses_bulk', methods=['POST'])
+def save_responses_bulk():
+    """Validate and write many (date, type, language, responses, timestamp) submissions in one batch.
+
+    Each submission is identified by its idempotency_key (or a digest of its
+    content); submissions already written by an earlier request are reported as
+    duplicates instead of being written again. Invalid submissions are reported
+    per index and do not block the valid ones.
+    """
+    data = request.get_json(silent=True)
+    submissions = data.get('submissions') if isinstance(data, dict) else data
+    if not isinstance(submissions, list) or not submissions:
+        return jsonify({'error': 'Expected a non-empty submissions array'}), 400
+    if len(submissions) > BULK_MAX_SUBMISSIONS:
+        return jsonify({'error': f'At most {BULK_MAX_SUBMISSIONS} submissions per request'}), 400
+
+    results = []
+    valid = []
+    for index, submission in enumerate(submissions):
+        error = validate_submission(submission)
+        if error:
+            results.append({'index': index, 'status': 'invalid', 'error': error})
+            continue
+        key = submission_idempotency_key(submission)
+        results.append({'index': index, 'idempotency_key': key.split(':', 1)[1]})
+        valid.append((index, key, submission))
+
+    try:
+        states = idempotency_keys.claim([key for _, key, _ in valid]) if valid else {}
+    except Exception as e:
+        logger.error(f"Idempotency store error in save_responses_bulk: {str(e)}")
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+    # Every key claimed above must end up completed or released, whatever fails below;
+    # a key left pending would report in_progress to retries until its lease expires
+    claimed_keys = [key for key, state in states.items() if state == 'claimed']
+    try:
+        encoder = BatchEncoder()
+        claimed = {}
+        dates = set()
+        timestamps = []
+        for index, key, submission in valid:
+            state = states.get(key)
+            if state != 'claimed' or key in claimed:
+                # Written by an earlier request (done), in flight elsewhere (pending) or repeated in this batch
+                results[index]['status'] = 'duplicate' if state == 'done' or key in claimed else 'in_progress'
+                continue
+            timestamp_ns = to_timestamp_ns(dateutil.parser.isoparse(submission['timestamp']))
+            records, unknown_questions = add_form_responses(encoder, question_registry.form(submission['type']),
+                                                            submission['date'], submission.get('language', 'hindi'),
+                                                            submission['responses'], timestamp_ns)
+            if unknown_questions:
+                results[index]['unknown_questions'] = unknown_questions
+            claimed[key] = records
+            if records:
+                results[index].update({'status': 'written', 'records': records})
+                dates.add(submission['date'])
+                timestamps.append(timestamp_ns)
+            else:
+                results[index].update({'status': 'invalid', 'error': 'No valid responses to save'})
+
+        lines = encoder.lines()
+        logger.info(f"Bulk submission: {len(submissions)} submissions, {len(lines)} records to write, "
+                    f"{sum(1 for r in results if r['status'] == 'duplicate')} duplicates")
+        empty_keys = [key for key, records in claimed.items() if not records]
+        if empty_keys:
+            idempotency_keys.release(empty_keys)
+
+        durability = None
+        if lines:
+            written_keys = [key for key, records in claimed.items() if records]
+            try:
+                durability = write_task_lines(lines)
+                start = (EPOCH + timedelta(microseconds=min(timestamps) // 1000)).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+                stop = (EPOCH + timedelta(microseconds=max(timestamps) // 1000, seconds=1)).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+                query = build_task_query(INFLUXDB_BUCKET, start, stop, date=sorted(dates), fields=['question'],
+                                         limit=len(lines))
+                if durability == 'async-verify':
+                    write_verifier.submit(f"save_responses_bulk dates={','.join(sorted(dates))}", query, lines,
+                                          check_rejections=True)
+                elif durability not in ('ack', 'spooled'):
+                    verified, errors = verify_write(query, check_rejections=True)
+                    if not verified:
+                        logger.error(f"Bulk write verification failed, rejections: {errors}")
+                        idempotency_keys.release(written_keys)
+                        return jsonify({'error': f'Write rejected: {errors}' if errors else 'Write succeeded but data not found',
+                                        'results': results}), 500
+            except Exception as e:
+                logger.error(f"InfluxDB write error in save_responses_bulk: {str(e)}")
+                idempotency_keys.release(written_keys)
+                return jsonify({'error': f'Failed to write to InfluxDB: {str(e)}'}), 500
+            idempotency_keys.complete(written_keys)
+    except Exception as e:
+        logger.error(f"Server error in save_responses_bulk: {str(e)}")
         traceback.print_exc()
+        try:
+            idempotency_keys.release(claimed_keys)
+        except Exception as release_error:
+            logger.error(f"Failed to release idempotency keys: {str(release_error)}")
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+    if not lines and not any(r['status'] in ('duplicate', 'in_progress') for r in results):
+        return jsonify({'error': 'No valid submissions to save', 'results': results}), 400
+    return jsonify({
+        'message': f'Bulk submission processed ({len(lines)} records)',
+        'records_written': len(lines),
+        'durability': durability,
+        'results': results
+    }), 200
+
 @app.route('/save_agronomist_assessment', methods=['POST'])
 def save_agronomist_assessment():
     """Save agronomist assessments to the Vimal_Task measurement with distinct fields"""
@@ -544,7 +1929,7 @@ def save_agronomist_assessment():
         assessment_type = data.get('assessment_type')
         timestamp = data.get('timestamp')
         
-        print(f"Received agronomist assessment: date={date}, assessment_type={assessment_type}")
+        logger.info(f"Received agronomist assessment: date={date}, assessment_type={assessment_type}")
         
         if not date or not assessment_type:
             return jsonify({'error': 'Missing required fields: date and assessment_type'}), 400
@@ -555,60 +1940,45 @@ def save_agronomist_assessment():
             return jsonify({'error': 'Invalid date format, expected YYYY-MM-DD'}), 400
 
         try:
-            parsed_time = dateutil.parser.isoparse(timestamp)
-            timestamp_ns = int(parsed_time.timestamp() * 1_000_000_000)
+            timestamp_ns = to_timestamp_ns(dateutil.parser.isoparse(timestamp))
         except ValueError as e:
-            print(f"Invalid timestamp format: {timestamp}, error: {str(e)}")
+            logger.warning(f"Invalid timestamp format: {timestamp}, error: {str(e)}")
             return jsonify({'error': f'Invalid timestamp format: {timestamp}'}), 400
 
-        # Escape function for InfluxDB line protocol
-        def escape_field(value):
-            if isinstance(value, str):
-                return value.replace('\\', '\\\\').replace(',', '\\,').replace('=', '\\=').replace(' ', '\\ ').replace('"', '\\"')
-            return str(value)
-        
-        def escape_tag(value):
-            if isinstance(value, str):
-                return value.replace('\\', '\\\\').replace(' ', '\\ ').replace(',', '\\,').replace('=', '\\=')
-            return str(value)
-
-        # Build the line protocol entry
-        tag_parts = []
-        tag_parts.append(f"date={escape_tag(date)}")
-        tag_parts.append(f"type=agronomist_assessment")
-        tag_parts.append(f"assessment_type={escape_tag(assessment_type)}")
-        tag_parts.append(f"question_id=agronomist_daily")  # Unique question_id to avoid overlap
+        # Build the line protocol entry (unique question_id to avoid overlap with form answers)
+        prefix = tag_prefix('Vimal_Task', (('date', date), ('type', 'agronomist_assessment'),
+                                           ('assessment_type', assessment_type), ('question_id', 'agronomist_daily')))
 
         fields = []
         if assessment_type == 'average' and data.get('improvement_notes'):
             improvement_notes = data.get('improvement_notes').strip()
             if improvement_notes:
-                fields.append(f'improvement_notes="{escape_field(improvement_notes)}"')
-        
+                fields.append(('improvement_notes', improvement_notes))
+
         elif assessment_type == 'uncertain' and data.get('uncertainty_notes'):
             uncertainty_notes = data.get('uncertainty_notes').strip()
             if uncertainty_notes:
-                fields.append(f'uncertainty_notes="{escape_field(uncertainty_notes)}"')
-        
+                fields.append(('uncertainty_notes', uncertainty_notes))
+
         # Add photo analysis if provided
         if data.get('photo_analysis'):
             photo_analysis = data.get('photo_analysis').strip()
             if photo_analysis:
-                fields.append(f'photo_analysis="{escape_field(photo_analysis)}"')
+                fields.append(('photo_analysis', photo_analysis))
 
         # Add agronomist identifier (replace with actual ID when authentication is implemented)
-        fields.append(f'agronomist="system"')  # Placeholder for agronomist ID
-        
+        fields.append(('agronomist', 'system'))  # Placeholder for agronomist ID
+
         if not fields:
-            print("No valid fields provided for agronomist assessment")
+            logger.warning("No valid fields provided for agronomist assessment")
             return jsonify({'error': 'No valid fields provided for assessment'}), 400
 
-        line = f'Vimal_Task,{",".join(tag_parts)} {",".join(fields)} {timestamp_ns}'
-        print(f"Generated agronomist assessment line: {line}")
+        line = encode_line(prefix, fields, timestamp_ns)
+        logger.debug("Generated agronomist assessment line: %s", line)
 
         try:
-            write_api.write(bucket=INFLUXDB_BUCKET, org=INFLUXDB_ORG, record=line)
-            print(f"Successfully wrote agronomist assessment to InfluxDB")
+            durability = write_task_lines([line])
+            logger.info(f"Successfully wrote agronomist assessment to InfluxDB")
             
             # Verify the write
             query = f'''
@@ -620,32 +1990,240 @@ def save_agronomist_assessment():
                 |> filter(fn: (r) => r["question_id"] == "agronomist_daily")
                 |> limit(n: 1)
             '''
-            tables = query_api.query(query=query, org=INFLUXDB_ORG)
-            if not tables:
-                print("Verification failed: Agronomist assessment not found after write")
-                return jsonify({'error': 'Assessment saved but verification failed'}), 500
-            
-            print(f"Verified agronomist assessment written successfully")
+            if durability == 'async-verify':
+                write_verifier.submit(f"save_agronomist_assessment date={date}", query, [line])
+            elif durability not in ('ack', 'spooled'):
+                verified, _ = verify_write(query)
+                if not verified:
+                    logger.error("Verification failed: Agronomist assessment not found after write")
+                    return jsonify({'error': 'Assessment saved but verification failed'}), 500
+                logger.info(f"Verified agronomist assessment written successfully")
+
             return jsonify({
                 'message': 'Agronomist assessment saved successfully',
                 'assessment_type': assessment_type,
-                'date': date
+                'date': date,
+                'durability': durability
             }), 200
             
         except Exception as e:
-            print(f"InfluxDB write error for agronomist assessment: {str(e)}")
+            logger.error(f"InfluxDB write error for agronomist assessment: {str(e)}")
             traceback.print_exc()
             return jsonify({'error': f'Failed to write agronomist assessment to InfluxDB: {str(e)}'}), 500
             
     except Exception as e:
-        print(f"Server error in save_agronomist_assessment: {str(e)}")
+        logger.error(f"Server error in save_agronomist_assessment: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
-@app.route('/get_data', methods=['POST'])
+# Run an extra sample query on every /get_data call to diagnose missing records
+QUERY_DEBUG = os.getenv('QUERY_DEBUG', 'false').lower() in ('1', 'true', 'yes')
+
+# Cursor pagination for /get_data: used when a request sends `limit` or `cursor`
+GET_DATA_PAGE_SIZE = int(os.getenv('GET_DATA_PAGE_SIZE', '100'))
+GET_DATA_MAX_PAGE_SIZE = int(os.getenv('GET_DATA_MAX_PAGE_SIZE', '1000'))
+
+# Response keys that are always returned, whatever `fields` projection is requested
+GET_DATA_BASE_KEYS = ('date', 'type', 'question_id', 'timestamp')
+
+# Optional response keys that map directly onto Vimal_Task fields
+GET_DATA_FIELD_KEYS = ('question', 'answer', 'followup_text', 'photos', 'improvement_notes',
+                       'uncertainty_notes', 'photo_analysis', 'agronomist')
+
+def encode_data_cursor(timestamp, question_id):
+    """Opaque /get_data cursor for the last returned (_time, question_id)"""
+    raw = json.dumps([timestamp, question_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_data_cursor(cursor):
+    """Inverse of encode_data_cursor; raises ValueError for malformed cursors"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, question_id = json.loads(raw)
+        dateutil.parser.isoparse(timestamp)
+    except Exception:
+        raise ValueError(f'Invalid cursor: {cursor}')
+    if not isinstance(question_id, str):
+        raise ValueError(f'Invalid cursor: {cursor}')
+    return timestamp, question_id
+
+def influx_fields_for(fields):
+    """Vimal_Task fields to read for a `fields` projection, or None to read all of them.
+
+    question and agronomist are always read because every response/assessment row
+    has them, so projecting away the other fields never drops a row in the pivot.
+    """
+    if fields is None or 'all_fields' in fields:
+        return None
+    influx_fields = {f for f in fields if f in GET_DATA_FIELD_KEYS} | {'question', 'agronomist'}
+    if 'photos' in fields:
+        influx_fields |= {'image_url', 'thumbnail_url'}
+    return sorted(influx_fields)
+
+PHOTO_URL_RE = re.compile(r'https?://[^\s"]+')
+
+TASK_MANDATORY_FIELDS = ('date', 'type', 'question_id', '_time')
+TASK_INTERNAL_COLUMNS = frozenset(('_measurement', '_start', '_stop', 'result', 'table'))
+ASSESSMENT_FIELDS = ('assessment_type', 'improvement_notes', 'uncertainty_notes', 'photo_analysis', 'agronomist')
+
+def parse_photos_field(photos_str, question_id):
+    """Decode the JSON `photos` field, recovering bare URLs when the stored JSON is malformed"""
+    if not photos_str or not isinstance(photos_str, str):
+        logger.warning(f"Invalid or missing photos field for question_id {question_id}: {photos_str}")
+        return []
+    photos_str = decode_value(photos_str)
+    if '\\"' in photos_str:
+        # Older rows stored the JSON with escaped quotes
+        photos_str = photos_str.replace('\\"', '"')
+    try:
+        return json.loads(photos_str)
+    except json.JSONDecodeError as e:
+        logger.error(f"Error decoding photos JSON for question_id {question_id}: {photos_str}, error: {str(e)}")
+        return [{'url': url} for url in PHOTO_URL_RE.findall(photos_str)]
+
+def build_task_results(tables, fields=None):
+    """Turn pivoted Vimal_Task tables into /get_data response dicts.
+
+    Works in two phases so the image join does not depend on record order: the
+    first pass indexes image records by (date, question_id) and collects the
+    response rows, the second builds each response and attaches its images.
+    """
+    debug = logger.isEnabledFor(logging.DEBUG)
+    image_urls = {}
+    responses = []
+
+    for table in tables:
+        for record in table.records:
+            values = record.values
+            missing_fields = [field for field in TASK_MANDATORY_FIELDS if values.get(field) is None]
+            if missing_fields:
+                logger.warning(f"Skipping record due to missing mandatory fields: {missing_fields}, record={values}")
+                continue
+
+            if values['type'] == 'image':
+                image_url = values.get('image_url')
+                if image_url:
+                    question_id = values['question_id']
+                    image_urls.setdefault((values['date'], question_id), []).append({
+                        'url': image_url,
+                        'thumbnail_url': values.get('thumbnail_url'),
+                        'name': f"image_{question_id}_{record.get_time().isoformat()}"
+                    })
+                continue
+            responses.append(record)
+    RECORDS_PARSED.inc('task_records', amount=len(responses) + sum(len(v) for v in image_urls.values()))
+
+    include_all_fields = fields is None or 'all_fields' in fields
+    display_types = {}
+    results = []
+    for record in responses:
+        values = record.values
+        date = values['date']
+        question_id = values['question_id']
+        record_type = values['type']
+        timestamp = record.get_time().isoformat()
+        display_type = display_types.get(record_type)
+        if display_type is None:
+            display_type = display_types[record_type] = record_type.replace('_', ' ').replace(' and ', ' & ')
+
+        # Initialize result dictionary with mandatory fields
+        result = {
+            'date': date,
+            'type': display_type,
+            'question_id': question_id,
+            'timestamp': timestamp,
+            'question': decode_value(values.get('question', '')),
+            'answer': decode_value(values.get('answer', '')),
+            'followup_text': decode_value(values.get('followup_text', '')),
+            'photos': [],
+            'all_fields': {}
+        }
+
+        # Handle agronomist assessments
+        if record_type == 'agronomist_assessment':
+            for field in ASSESSMENT_FIELDS:
+                result[field] = decode_value(values.get(field, ''))
+
+        # Attach stored photos plus uploaded images for the same date and question
+        photos = parse_photos_field(values.get('photos', '[]'), question_id)
+        images = image_urls.get((date, question_id))
+        if images:
+            photos.extend(images)
+
+        # Ensure photos is a list of dicts with 'url', 'name' and 'thumbnail_url'
+        result['photos'] = [
+            {
+                'url': photo['url'],
+                'name': photo.get('name', f"image_{question_id}_{i}"),
+                'thumbnail_url': photo.get('thumbnail_url') or photo['url']
+            }
+            for i, photo in enumerate(photos) if isinstance(photo, dict) and 'url' in photo
+        ]
+
+        # Include all fields dynamically, excluding internal InfluxDB fields
+        if include_all_fields:
+            all_fields = result['all_fields']
+            for k, v in values.items():
+                if k in TASK_INTERNAL_COLUMNS:
+                    continue
+                if isinstance(v, str):
+                    v = decode_value(v)
+                elif isinstance(v, datetime):
+                    v = timestamp if k == '_time' else v.isoformat()
+                all_fields[k] = v
+        else:
+            result = {k: v for k, v in result.items() if k in GET_DATA_BASE_KEYS or k in fields}
+
+        results.append(result)
+        if debug:
+            logger.debug("Added record: question_id=%s, photos_count=%d", question_id, len(result.get('photos', [])))
+
+    return results
+
+def flux_time_to_datetime(value, now=None):
+    """Resolve the Flux time expressions get_data uses ('now()', '-Nd', RFC3339) to UTC datetimes"""
+    now = now or datetime.now(timezone.utc)
+    if value == 'now()':
+        return now
+    match = re.fullmatch(r'-(\d+)d', value)
+    if match:
+        return now - timedelta(days=int(match.group(1)))
+    return dateutil.parser.isoparse(value)
+
+def query_task_tables(use_read_model, start_time, stop_time, **query_args):
+    """Run a build_task_query read against InfluxDB or, with use_read_model, the local read model"""
+    if not use_read_model:
+        query = build_task_query(INFLUXDB_BUCKET, start_time, stop_time, **query_args)
+        logger.debug("Executing Flux query: %s", query)
+        return influx_query(query)
+    types = query_args.get('types')
+    if not types and query_args.get('question_type'):
+        types = [task_type_tag(query_args['question_type'])] + TASK_COMPANION_TYPES
+    after = query_args.get('after')
+    if after:
+        after = (dateutil.parser.isoparse(after[0]), after[1])
+    return read_model.query(flux_time_to_datetime(start_time), flux_time_to_datetime(stop_time),
+                            types=types, exclude_types=query_args.get('exclude_types'),
+                            dates=query_args.get('date'), after=after, limit=query_args.get('limit'))
+
+def get_data_query_args():
+    """/get_data parameters from a GET query string (fields is comma-separated)"""
+    data = request.args.to_dict()
+    if 'fields' in data:
+        data['fields'] = [f for f in data['fields'].split(',') if f]
+    data['force_upstream'] = data.get('force_upstream', '').lower() in ('1', 'true', 'yes')
+    return data
+
+def weather_etag_token(date):
+    """Changes whenever a cached weather summary for `date` may have been refreshed"""
+    if date < datetime.now(IST).strftime('%Y-%m-%d'):
+        return 'closed'
+    return int(time.time() // WEATHER_CACHE_TODAY_TTL)
+
+@app.route('/get_data', methods=['GET', 'POST'])
 def get_data():
     try:
-        data = request.json
+        data = request.json if request.method == 'POST' else get_data_query_args()
         question_type = data.get('question_type', '')
         date_filter = data.get('date', '')
 
@@ -664,150 +2242,345 @@ def get_data():
             start_time = '-30d'
             stop_time = 'now()'
 
-        # Construct the Flux query with fallback for missing question_id
-        query = f'''
-            from(bucket: "{INFLUXDB_BUCKET}")
-                |> range(start: {start_time}, stop: {stop_time})
-                |> filter(fn: (r) => r._measurement == "Vimal_Task")
-                |> map(fn: (r) => ({{r with question_id: if exists r.question_id then r.question_id else "unknown"}}))
-                |> pivot(rowKey: ["_time", "question_id"], columnKey: ["_field"], valueColumn: "_value")
-        '''
-        if question_type:
-            escaped_type = question_type.replace('"', '\\"').replace(' ', '_').replace('&', '_')
-            query += f'|> filter(fn: (r) => r.type == "{escaped_type}" or r.type == "image" or r.type == "agronomist_assessment")'
-        if date_filter:
-            query += f'|> filter(fn: (r) => r.date == "{date_filter}")'
+        fields = data.get('fields')
+        if fields is not None and (not isinstance(fields, list) or not all(isinstance(f, str) for f in fields)):
+            return jsonify({'error': 'fields must be a list of response keys'}), 400
+
+        cursor = data.get('cursor')
+        paginate = data.get('limit') is not None or bool(cursor)
+        after = None
+        if paginate:
+            try:
+                limit = int(data['limit']) if data.get('limit') is not None else GET_DATA_PAGE_SIZE
+                if limit < 1:
+                    raise ValueError
+            except (TypeError, ValueError):
+                return jsonify({'error': 'limit must be a positive integer'}), 400
+            limit = min(limit, GET_DATA_MAX_PAGE_SIZE)
+            if cursor:
+                try:
+                    after = decode_data_cursor(cursor)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+
+        # Serve from the local read model when it covers the window, unless the caller forces an upstream read
+        use_read_model = (read_model is not None and not data.get('force_upstream')
+                          and read_model.covers(flux_time_to_datetime(start_time)))
+        source = 'read_model' if use_read_model else 'influxdb'
+
+        # GET reads answered from the reconciled window are revalidated against the write
+        # version of the requested slice before any query runs, so an unchanged poll costs
+        # no query at all; other reads are revalidated against the payload below
+        etag = None
+        revalidate = request.method == 'GET' and not data.get('force_upstream')
+        if revalidate and use_read_model and DATA_VERSIONS_ETAGS:
+            version_types = [task_type_tag(question_type)] + TASK_COMPANION_TYPES if question_type else None
+            etag = make_etag(
+                data_versions.version(date_filter or None, version_types if date_filter else None),
+                question_type, date_filter, fields, cursor, data.get('limit'),
+                weather_etag_token(date_filter) if date_filter else None
+            )
+            if etag_matches(etag):
+                return not_modified(etag, GET_DATA_CACHE_CONTROL)
 
         # Debug: Check for records without date filter to diagnose missing data
-        if date_filter:
-            debug_query = f'''
-                from(bucket: "{INFLUXDB_BUCKET}")
-                    |> range(start: {start_time}, stop: {stop_time})
-                    |> filter(fn: (r) => r._measurement == "Vimal_Task")
-                    |> limit(n: 10)
-            '''
-            debug_tables = query_api.query(query=debug_query, org=INFLUXDB_ORG)
+        if QUERY_DEBUG and date_filter:
+            debug_tables = influx_query(build_debug_query(INFLUXDB_BUCKET, start_time, stop_time))
             logger.info(f"Debug query for {date_filter} returned {len(debug_tables)} tables")
 
-        logger.info(f"Executing Flux query: {query}")
-        tables = query_api.query(query, org=INFLUXDB_ORG)
+        # The weather summary does not depend on the task query, so fetch it concurrently
+        weather_future = upstream_executor.submit(get_weather_summary, date_filter) if date_filter else None
 
-        logger.info(f"Total tables from query: {len(tables)}")
-        results = []
-        image_urls = {}
+        # Tag filters and column projection run before the pivot (see flux_queries)
+        influx_fields = influx_fields_for(fields)
+        next_cursor = None
+        if not paginate:
+            tables = query_task_tables(use_read_model, start_time, stop_time, question_type=question_type,
+                                       date=date_filter, fields=influx_fields)
+        else:
+            # Page over responses/assessments ordered by (_time, question_id), fetching one
+            # extra row to know whether another page exists. Image records are not paged:
+            # the ones for the dates on this page are fetched separately and joined below.
+            page_types = [task_type_tag(question_type), 'agronomist_assessment'] if question_type else None
+            want_images = fields is None or 'photos' in fields
+            image_future = None
+            if want_images and date_filter:
+                # Every row on a single-date page has that date, so its images can be read in parallel
+                image_future = upstream_executor.submit(
+                    query_task_tables, use_read_model, start_time, stop_time, date=date_filter,
+                    types=['image'], fields=['image_url', 'thumbnail_url']
+                )
+            page_tables = query_task_tables(use_read_model, after[0] if after else start_time, stop_time,
+                                            date=date_filter, fields=influx_fields, types=page_types,
+                                            exclude_types=None if page_types else ['image'],
+                                            after=after, limit=limit + 1)
+            page_records = [record for table in page_tables for record in table.records]
+            if len(page_records) > limit:
+                last = page_records[limit - 1]
+                next_cursor = encode_data_cursor(last.get_time().isoformat(), last.values.get('question_id'))
+                extra = page_records[limit]
+                for table in page_tables:
+                    table.records = [r for r in table.records if r is not extra]
+
+            page_dates = sorted({r.values.get('date') for r in page_records[:limit] if r.values.get('date')})
+            tables = []
+            if image_future is not None:
+                tables.extend(image_future.result())
+            elif page_dates and want_images:
+                tables.extend(query_task_tables(use_read_model, start_time, stop_time, date=page_dates,
+                                                types=['image'], fields=['image_url', 'thumbnail_url']))
+            tables.extend(page_tables)
+
+        logger.info(f"Total tables from {source}: {len(tables)}")
+        results = build_task_results(tables, fields)
+
+        # Collect the weather summary fetched alongside the task query
+        weather_summary = weather_future.result() if weather_future else None
+
+        logger.info(f"Retrieved {len(results)} records with {sum(len(r.get('photos', [])) for r in results)} total photos")
+        payload = {
+            'responses': results,
+            'weather_summary': weather_summary,
+            'source': source,
+            'message': f"Retrieved {len(results)} records for date {date_filter}" if date_filter else f"Retrieved {len(results)} records"
+        }
+        if paginate:
+            payload.update({'limit': limit, 'next_cursor': next_cursor, 'has_more': next_cursor is not None})
+        if revalidate and etag is None:
+            # Writes handled elsewhere never bump this host's versions, so compare the content itself
+            etag = make_etag(payload)
+            if etag_matches(etag):
+                return not_modified(etag, GET_DATA_CACHE_CONTROL)
+        response = jsonify(payload)
+        if etag:
+            cacheable(response, etag, GET_DATA_CACHE_CONTROL)
+        return response, 200
 
-        # Define mandatory fields
-        mandatory_fields = ['date', 'type', 'question_id', '_time']
+    except Exception as e:
+        logger.error(f"Error querying InfluxDB: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': f'Failed to query InfluxDB: {str(e)}'}), 500
 
-        for table in tables:
-            for record in table.records:
-                logger.debug(f"Processing record: time={record.get_time().isoformat()}, type={record.values.get('type')}, date={record.values.get('date')}, question_id={record.values.get('question_id')}")
+# Streaming export of Vimal_Task records, one row per pivoted record
+EXPORT_MAX_DAYS = int(os.getenv('EXPORT_MAX_DAYS', '366'))
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', '500'))
+EXPORT_COLUMNS = ['timestamp', 'date', 'type', 'question_id', 'language', 'question', 'answer',
+                  'followup_text', 'photos', 'image_url', 'thumbnail_url', 'assessment_type',
+                  'improvement_notes', 'uncertainty_notes', 'photo_analysis', 'agronomist']
+
+def export_row(record):
+    """Flatten a pivoted FluxRecord into the export column set"""
+    values = record.values
+    row = {'timestamp': record.get_time().isoformat()}
+    for column in EXPORT_COLUMNS[1:]:
+        value = values.get(column)
+        row[column] = decode_value(value) if value is not None else ''
+    return row
+
+def export_error_marker(export_format, message):
+    """Last line of an export that failed after its 200 was sent: an {"error": ...} object in
+    NDJSON, and in CSV a row whose timestamp column is '#error' and date column the message"""
+    if export_format == 'csv':
+        buffer = StringIO()
+        csv.writer(buffer, lineterminator='\n').writerow(['#error', message])
+        return buffer.getvalue()
+    return json.dumps({'error': message}) + '\n'
+
+@app.route('/export_data', methods=['GET'])
+def export_data():
+    """Stream task records between start_date and end_date as NDJSON (default) or CSV.
+
+    A query that fails before the first EXPORT_CHUNK_ROWS records are encoded gets
+    a JSON error with status 500. Once streaming has started the status cannot
+    change, so a failure ends the export with an error marker line (see
+    export_error_marker); a file without one is complete.
+    """
+    start_date = request.args.get('start_date', '')
+    end_date = request.args.get('end_date', '') or start_date
+    question_type = request.args.get('question_type', '')
+    export_format = request.args.get('format', 'ndjson').lower()
 
-                # Check for mandatory fields
-                missing_fields = [field for field in mandatory_fields if field not in record.values or record.values[field] is None]
-                if missing_fields:
-                    logger.warning(f"Skipping record due to missing mandatory fields: {missing_fields}, record={record.values}")
-                    continue
+    try:
+        start = datetime.strptime(start_date, '%Y-%m-%d').date()
+        end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Invalid date format for start_date/end_date, expected YYYY-MM-DD'}), 400
+    if start > end:
+        return jsonify({'error': 'start_date must not be after end_date'}), 400
+    days = (end - start).days + 1
+    if days > EXPORT_MAX_DAYS:
+        return jsonify({'error': f'Date range too large: {days} days (max {EXPORT_MAX_DAYS})'}), 400
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+
+    query = build_task_query(INFLUXDB_BUCKET, f"{start_date}T00:00:00Z", f"{end_date}T23:59:59Z",
+                             question_type=question_type)
+    logger.info(f"Exporting {days} days of task records as {export_format}: {start_date} to {end_date}")
+
+    def chunks():
+        """(records so far, encoded text) every EXPORT_CHUNK_ROWS records; raises if the query fails"""
+        exported = 0
+        buffer = StringIO()
+        writer = None
+        if export_format == 'csv':
+            writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, lineterminator='\n')
+            writer.writeheader()
+        for record in influx_query_stream(query):
+            row = export_row(record)
+            if writer:
+                writer.writerow(row)
+            else:
+                buffer.write(json.dumps(row, ensure_ascii=False))
+                buffer.write('\n')
+            exported += 1
+            if exported % EXPORT_CHUNK_ROWS == 0:
+                yield exported, buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield exported, buffer.getvalue()
+
+    # Pull the first chunk before the 200 goes out, so a query that fails up front gets an error status
+    stream = chunks()
+    try:
+        exported, first_chunk = next(stream)
+    except Exception as e:
+        logger.error(f"Export failed: {str(e)}")
+        return jsonify({'error': f'Failed to export task records: {str(e)}'}), 500
 
-                date = record.values.get('date', '')
-                question_id = record.values.get('question_id', 'unknown')
-                record_type = record.values.get('type', '')
-
-                # Handle image records
-                if record_type == 'image':
-                    image_url = record.values.get('image_url')
-                    if image_url:
-                        key = f"{date}_{question_id}"
-                        if key not in image_urls:
-                            image_urls[key] = []
-                        image_urls[key].append({
-                            'url': image_url,
-                            'name': f"image_{question_id}_{record.get_time().isoformat()}"
-                        })
-                        logger.debug(f"Stored image: key={key}, url={image_url}")
-                    continue
+    def generate():
+        count = exported
+        yield first_chunk
+        try:
+            for count, chunk in stream:
+                yield chunk
+        except Exception as e:
+            # Headers are already sent, so the failure can only be reported in-band
+            logger.error(f"Export failed after {count} records: {str(e)}")
+            yield export_error_marker(export_format, f'Export interrupted: {str(e)}')
+            return
+        logger.info(f"Exported {count} task records")
+
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    filename = f"vimal_task_{start_date}_{end_date}.{export_format}"
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+# Background jobs: every worker keeps its own weather cache and connection pools warm, so the first
+# request after an idle period finds them ready; jobs on shared state (write spool, read model) run
+# only in the worker holding SCHEDULER_LOCK_PATH
+SCHEDULER_LOCK_PATH = os.getenv('SCHEDULER_LOCK_PATH', os.path.join(LOCAL_STATE_DIR, 'scheduler.lock'))
+SCHEDULER_LEADER_RETRY_SECONDS = int(os.getenv('SCHEDULER_LEADER_RETRY_SECONDS', '60'))
+PREWARM_INTERVAL_MINUTES = int(os.getenv('PREWARM_INTERVAL_MINUTES', '4'))
+WEATHER_PRECOMPUTE_MINUTES = int(os.getenv('WEATHER_PRECOMPUTE_MINUTES', str(max(1, WEATHER_CACHE_TODAY_TTL // 60 - 1))))
+WRITE_FLUSH_INTERVAL_SECONDS = int(os.getenv('WRITE_FLUSH_INTERVAL_SECONDS', '60'))
+# Optional external keep-alive for hosts that sleep idle instances; off unless set
+SELF_PING_URL = os.getenv('SELF_PING_URL')
+
+scheduler = None
+scheduler_lock = LeaderLock(SCHEDULER_LOCK_PATH)
+
+def precompute_today_weather():
+    """Refresh today's running weather summary before the cached one expires"""
+    today = datetime.now(IST).strftime('%Y-%m-%d')
+    started = time.perf_counter()
+    try:
+        get_weather_summary(today, refresh=True)
+        logger.info(f"Precomputed weather summary for {today} in {(time.perf_counter() - started) * 1000:.0f} ms")
+    except Exception as e:
+        logger.error(f"Weather summary precompute failed: {str(e)}")
 
-                # Initialize result dictionary with mandatory fields
-                result = {
-                    'date': date,
-                    'type': record_type.replace('_', ' ').replace(' and ', ' & '),
-                    'question_id': question_id,
-                    'timestamp': record.get_time().isoformat(),
-                    'question': unescape_influxdb(record.values.get('question', '')),
-                    'answer': unescape_influxdb(record.values.get('answer', '')),
-                    'followup_text': unescape_influxdb(record.values.get('followup_text', '')),
-                    'photos': [],
-                    'all_fields': {}
-                }
-
-                # Handle agronomist assessments
-                if record_type == 'agronomist_assessment':
-                    result.update({
-                        'assessment_type': unescape_influxdb(record.values.get('assessment_type', '')),
-                        'improvement_notes': unescape_influxdb(record.values.get('improvement_notes', '')),
-                        'uncertainty_notes': unescape_influxdb(record.values.get('uncertainty_notes', '')),
-                        'photo_analysis': unescape_influxdb(record.values.get('photo_analysis', '')),
-                        'agronomist': unescape_influxdb(record.values.get('agronomist', ''))
-                    })
+def warm_upstream_connections():
+    """Keep pooled InfluxDB connections open (TLS already negotiated) and the SDKs imported"""
+    try:
+        with track_upstream('influxdb', 'ping'):
+            get_influx_session().get(f"{INFLUXDB_URL}/ping",
+                                     timeout=(INFLUXDB_HTTP_CONNECT_TIMEOUT, INFLUXDB_HTTP_READ_TIMEOUT)).close()
+            get_influx_client().ping()
+        get_cloudinary()
+    except Exception as e:
+        logger.warning(f"Upstream prewarm failed: {str(e)}")
 
-                # Handle photos
-                photos = []
-                photos_str = record.values.get('photos', '[]')
-                if photos_str and isinstance(photos_str, str):
-                    try:
-                        # Remove extra backslashes and attempt JSON parsing
-                        photos_str = photos_str.replace('\\"', '"').replace('\\ ', ' ')
-                        photos = json.loads(photos_str)
-                        logger.debug(f"Parsed photos for question_id {question_id}: {photos}")
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Error decoding photos JSON for question_id {question_id}: {photos_str}, error: {str(e)}")
-                        # Attempt to recover URLs
-                        urls = re.findall(r'https?://[^\s"]+', photos_str)
-                        photos = [{'url': url} for url in urls]
-                        logger.debug(f"Recovered photos for question_id {question_id}: {photos}")
-                else:
-                    logger.warning(f"Invalid or missing photos field for question_id {question_id}: {photos_str}")
-                    photos = []
-
-                # Append images from image_urls
-                image_key = f"{date}_{question_id}"
-                if image_key in image_urls:
-                    photos.extend(image_urls[image_key])
-                    logger.debug(f"Appended {len(image_urls[image_key])} images to photos for {image_key}")
-
-                # Ensure photos is a list of dicts with 'url' and 'name'
-                result['photos'] = [
-                    {'url': photo['url'], 'name': photo.get('name', f"image_{question_id}_{i}")}
-                    for i, photo in enumerate(photos) if isinstance(photo, dict) and 'url' in photo
-                ]
-
-                # Include all fields dynamically, excluding internal InfluxDB fields
-                result['all_fields'] = {
-                    k: v.isoformat() if isinstance(v, datetime) else unescape_influxdb(v)
-                    for k, v in record.values.items()
-                    if k not in ['_measurement', '_start', '_stop', 'result', 'table']
-                }
-
-                results.append(result)
-                logger.debug(f"Added record: question_id={question_id}, photos_count={len(result['photos'])}")
-
-        # Fetch weather summary for the specified date
-        weather_summary = None
-        if date_filter:
-            historical_data = fetch_historical_24h_data(date_filter)
-            weather_summary = analyze_historical_trends(historical_data)
+def flush_write_pipeline():
+    """Drain spooled write batches, including ones left behind by other or recycled workers"""
+    if write_pipeline is None or not write_pipeline.depth():
+        return
+    try:
+        written = write_pipeline.flush()
+        if written:
+            logger.info(f"Flushed {written} spooled points to InfluxDB")
+    except Exception as e:
+        logger.error(f"Write pipeline flush failed: {str(e)}")
 
-        logger.info(f"Retrieved {len(results)} records with {sum(len(r['photos']) for r in results)} total photos")
-        return jsonify({
-            'responses': results,
-            'weather_summary': weather_summary,
-            'message': f"Retrieved {len(results)} records for date {date_filter}" if date_filter else f"Retrieved {len(results)} records"
-        }), 200
+def recover_upload_jobs():
+    """Retry upload jobs whose lease expired while their worker hung or was lost"""
+    if upload_jobs is None:
+        return
+    try:
+        upload_jobs.recover()
+    except Exception as e:
+        logger.error(f"Upload job recovery failed: {str(e)}")
 
+def ping_keepalive_url():
+    import requests
+    try:
+        response = requests.get(SELF_PING_URL, timeout=5)
+        logger.debug("Keep-alive ping to %s: status %s", SELF_PING_URL, response.status_code)
     except Exception as e:
-        logger.error(f"Error querying InfluxDB: {str(e)}")
-        traceback.print_exc()
-        return jsonify({'error': f'Failed to query InfluxDB: {str(e)}'}), 500
+        logger.warning(f"Keep-alive ping to {SELF_PING_URL} failed: {str(e)}")
+
+def start_scheduler():
+    """Start this process's warm-up jobs.
+
+    Every worker runs them: the weather cache and the connection pools are per
+    process, so warming only one worker would leave the others cold.
+    """
+    global scheduler
+    from apscheduler.schedulers.background import BackgroundScheduler
+    now = datetime.now()
+    scheduler = BackgroundScheduler(job_defaults={'coalesce': True, 'max_instances': 1})
+    scheduler.add_job(warm_upstream_connections, 'interval', minutes=PREWARM_INTERVAL_MINUTES,
+                      next_run_time=now, id='warm_upstream_connections')
+    scheduler.add_job(precompute_today_weather, 'interval', minutes=WEATHER_PRECOMPUTE_MINUTES,
+                      next_run_time=now, id='precompute_today_weather')
+    scheduler.start()
+
+def start_leader_jobs():
+    """Add the jobs that act on shared state and must run in one process only (the lock holder)"""
+    now = datetime.now()
+    if write_pipeline is not None:
+        scheduler.add_job(flush_write_pipeline, 'interval', seconds=WRITE_FLUSH_INTERVAL_SECONDS,
+                          id='flush_write_pipeline')
+    if read_model is not None:
+        scheduler.add_job(reconcile_read_model, 'interval', minutes=READ_MODEL_RECONCILE_MINUTES,
+                          next_run_time=now, id='reconcile_read_model')
+    if upload_jobs is not None:
+        scheduler.add_job(recover_upload_jobs, 'interval', minutes=UPLOAD_RECOVER_MINUTES, id='recover_upload_jobs')
+    if SELF_PING_URL:
+        scheduler.add_job(ping_keepalive_url, 'interval', minutes=5, id='ping_keepalive_url')
+    logger.info(f"Process {os.getpid()} is the scheduler leader ({SCHEDULER_LOCK_PATH})")
+
+def follow_scheduler_leader():
+    """Retry the leader lock so a follower takes over when the leader process exits"""
+    while not scheduler_lock.try_acquire():
+        time.sleep(SCHEDULER_LEADER_RETRY_SECONDS)
+    start_leader_jobs()
+
+# Serverless instances are frozen between requests, so they run no background jobs
+if not SERVERLESS:
+    start_scheduler()
+    if scheduler_lock.try_acquire():
+        start_leader_jobs()
+    else:
+        threading.Thread(target=follow_scheduler_leader, name='scheduler-follower', daemon=True).start()
+
+@app.route('/scheduler_status', methods=['GET'])
+def scheduler_status():
+    """This worker's background jobs and their next run times, and whether it is the leader"""
+    jobs = []
+    if scheduler is not None:
+        jobs = [{'id': job.id, 'next_run_time': job.next_run_time.isoformat() if job.next_run_time else None}
+                for job in scheduler.get_jobs()]
+    return jsonify({'pid': os.getpid(), 'serverless': SERVERLESS, 'leader': scheduler_lock.held, 'jobs': jobs}), 200
 
 if __name__ == '__main__':
     print("Starting Farm Tracker API...")
@@ -820,4 +2593,5 @@ if __name__ == '__main__':
     try:
         app.run(host='0.0.0.0', port=port, debug=False)
     except (KeyboardInterrupt, SystemExit):
-        scheduler.shutdown()
\ No newline at end of file
+        if scheduler is not None:
+            scheduler.shutdown()
\ No newline at end of file
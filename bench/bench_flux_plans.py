@@ -0,0 +1,182 @@
+"""Compare the original /get_data Flux plan with the flux_queries builder.
+
+The original plan mapped and pivoted every Vimal_Task row in the window and only
+then filtered on type/date; the builder filters tags and projects columns before
+the pivot. Record both plans' CSV responses once against a real InfluxDB, then
+replay the fixtures offline to compare payload size, rows parsed and parse time:
+
+    python bench/bench_flux_plans.py record --date 2024-07-01 --type "Day 1 - Watering & Health"
+    python bench/bench_flux_plans.py replay [--repeat 5]
+
+`synthetic` writes fixtures shaped like both plans' responses from a generated
+store, for running the replay without InfluxDB access (clearly not a recording).
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Serverless mode imports the app without a scheduler, so no prewarm job hits InfluxDB mid-run
+os.environ.setdefault('SERVERLESS', 'true')
+
+import app  # noqa: E402
+from flux_queries import build_task_query, task_type_tag  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'flux_plans')
+PLANS = ('legacy', 'builder')
+
+
+def legacy_task_query(bucket, start, stop, question_type=None, date=None):
+    """The original get_data query: map + pivot over the whole measurement, filters afterwards"""
+    query = f'''
+            from(bucket: "{bucket}")
+                |> range(start: {start}, stop: {stop})
+                |> filter(fn: (r) => r._measurement == "Vimal_Task")
+                |> map(fn: (r) => ({{r with question_id: if exists r.question_id then r.question_id else "unknown"}}))
+                |> pivot(rowKey: ["_time", "question_id"], columnKey: ["_field"], valueColumn: "_value")
+        '''
+    if question_type:
+        escaped_type = question_type.replace('"', '\\"').replace(' ', '_').replace('&', '_')
+        query += f'|> filter(fn: (r) => r.type == "{escaped_type}" or r.type == "image" or r.type == "agronomist_assessment")'
+    if date:
+        query += f'|> filter(fn: (r) => r.date == "{date}")'
+    return query
+
+
+def plan_queries(date, question_type):
+    if date:
+        start, stop = f"{date}T00:00:00Z", f"{date}T23:59:59Z"
+    else:
+        start, stop = '-30d', 'now()'
+    return {
+        'legacy': legacy_task_query(app.INFLUXDB_BUCKET, start, stop, question_type, date),
+        'builder': build_task_query(app.INFLUXDB_BUCKET, start, stop, question_type=question_type, date=date),
+    }
+
+
+def record(args):
+    os.makedirs(args.fixtures, exist_ok=True)
+    for plan, query in plan_queries(args.date, args.type).items():
+        started = timeit.default_timer()
+        with app.influx_flux_query(query, stream=True) as response:
+            response.raise_for_status()
+            ttfb_ms = response.elapsed.total_seconds() * 1000
+            body = response.content
+        total_ms = (timeit.default_timer() - started) * 1000
+        with open(os.path.join(args.fixtures, f'{plan}.csv'), 'wb') as f:
+            f.write(body)
+        with open(os.path.join(args.fixtures, f'{plan}.json'), 'w') as f:
+            json.dump({'source': 'recorded', 'query': query, 'date': args.date, 'type': args.type,
+                       'ttfb_ms': round(ttfb_ms, 1), 'total_ms': round(total_ms, 1)}, f, indent=2)
+        print(f"{plan:8s} recorded {len(body):>10,d} bytes in {total_ms:.0f} ms (ttfb {ttfb_ms:.0f} ms)")
+
+
+def synthetic(args):
+    """Generate fixtures shaped like each plan's pivoted CSV over a generated store"""
+    rng = random.Random(42)
+    types = [task_type_tag(t) for t in app.EXPECTED_QUESTIONS] + ['image', 'agronomist_assessment']
+    wanted = {task_type_tag(args.type), 'image', 'agronomist_assessment'} if args.type else None
+    day = datetime.strptime(args.date, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    start, stop = f"{args.date}T00:00:00Z", f"{args.date}T23:59:59Z"
+
+    rows = []
+    for i in range(args.records):
+        record_type = rng.choice(types)
+        rows.append({
+            '_time': (day + timedelta(seconds=rng.randrange(86400), microseconds=i)).isoformat().replace('+00:00', 'Z'),
+            'question_id': f'q{rng.randrange(1, 12)}',
+            'date': args.date,
+            'type': record_type,
+            'language': 'english',
+            'question': 'How\\ is\\ the\\ crop\\ today?',
+            'answer': rng.choice(['Yes', 'No', 'Partially\\ watered']),
+            'followup_text': '',
+            'photos': '[]',
+            'image_url': f'https://res.cloudinary.com/demo/image/upload/{i}.jpg' if record_type == 'image' else '',
+        })
+
+    legacy_columns = ['', 'result', 'table', '_start', '_stop', '_time', '_measurement',
+                      'question_id', 'date', 'type', 'language', 'question', 'answer',
+                      'followup_text', 'photos', 'image_url']
+    builder_columns = ['', 'result', 'table', '_time', 'question_id', 'date', 'type', 'language',
+                       'question', 'answer', 'followup_text', 'photos', 'image_url']
+
+    def write_plan(plan, columns, plan_rows):
+        buffer = StringIO()
+        writer = csv.writer(buffer, lineterminator='\r\n')
+        writer.writerow(columns)
+        for row in plan_rows:
+            full = dict(row, _start=start, _stop=stop, _measurement='Vimal_Task', result='_result', table=0)
+            writer.writerow([full.get(c, '') for c in columns])
+        body = buffer.getvalue().encode('utf-8')
+        with open(os.path.join(args.fixtures, f'{plan}.csv'), 'wb') as f:
+            f.write(body)
+        with open(os.path.join(args.fixtures, f'{plan}.json'), 'w') as f:
+            json.dump({'source': 'synthetic', 'date': args.date, 'type': args.type,
+                       'query': plan_queries(args.date, args.type)[plan]}, f, indent=2)
+        print(f"{plan:8s} synthetic {len(body):>10,d} bytes, {len(plan_rows):,d} rows")
+
+    os.makedirs(args.fixtures, exist_ok=True)
+    # Both plans return the same rows; the legacy one still carries _start/_stop/
+    # _measurement, and its server-side cost of pivoting every type before the
+    # filter only shows up in a recorded fixture's upstream timings
+    matching = [r for r in rows if wanted is None or r['type'] in wanted]
+    write_plan('legacy', legacy_columns, matching)
+    write_plan('builder', builder_columns, matching)
+
+
+def replay(args):
+    results = {}
+    for plan in PLANS:
+        csv_path = os.path.join(args.fixtures, f'{plan}.csv')
+        if not os.path.exists(csv_path):
+            sys.exit(f"Missing fixture {csv_path}; run `record` (or `synthetic`) first")
+        with open(csv_path, encoding='utf-8') as f:
+            text = f.read()
+        with open(os.path.join(args.fixtures, f'{plan}.json')) as f:
+            meta = json.load(f)
+        lines = text.splitlines()
+        rows = sum(1 for _ in app.iter_flux_csv_rows(lines))
+        parse_s = min(timeit.repeat(lambda: sum(1 for _ in app.iter_flux_csv_rows(lines)), number=1, repeat=args.repeat))
+        results[plan] = (len(text.encode('utf-8')), rows, parse_s, meta)
+
+    print(f"fixtures: {args.fixtures} ({results['legacy'][3]['source']})")
+    for plan, (size, rows, parse_s, meta) in results.items():
+        upstream = f", upstream {meta['total_ms']:.0f} ms (ttfb {meta['ttfb_ms']:.0f} ms)" if 'total_ms' in meta else ''
+        print(f"{plan:8s} {size:>10,d} bytes  {rows:>8,d} rows  parse {parse_s * 1000:8.1f} ms{upstream}")
+    legacy, builder = results['legacy'], results['builder']
+    print(f"payload {legacy[0] / max(builder[0], 1):.1f}x smaller, parse {legacy[2] / max(builder[2], 1e-9):.1f}x faster")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', default=FIXTURE_DIR)
+    sub = parser.add_subparsers(dest='command', required=True)
+    rec = sub.add_parser('record', help='run both plans against InfluxDB and save the responses')
+    rec.add_argument('--date', required=True)
+    rec.add_argument('--type', default='')
+    syn = sub.add_parser('synthetic', help='write generated fixtures instead of recording')
+    syn.add_argument('--date', default='2024-07-01')
+    syn.add_argument('--type', default='Day 1 - Watering & Health')
+    syn.add_argument('--records', type=int, default=20000)
+    rep = sub.add_parser('replay', help='parse saved fixtures and compare the plans')
+    rep.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    try:
+        {'record': record, 'synthetic': synthetic, 'replay': replay}[args.command](args)
+    finally:
+        if app.scheduler:
+            app.scheduler.shutdown(wait=False)
+
+
+if __name__ == '__main__':
+    main()
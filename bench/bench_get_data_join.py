@@ -0,0 +1,182 @@
+"""Micro-benchmark: two-phase image/response join vs. the original single-loop get_data body.
+
+Builds a synthetic set of pivoted Vimal_Task records (responses, assessments and
+image records) in both table orders and reports per-record CPU time for both
+versions and how many uploaded images each one attached; the original only
+attaches images whose table happens to come before the responses.
+
+    python bench/bench_get_data_join.py [--records 50000] [--repeat 5]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Serverless mode imports the app without a scheduler, so no prewarm job hits InfluxDB mid-run
+os.environ.setdefault('SERVERLESS', 'true')
+
+from influxdb_client.client.flux_table import FluxRecord, FluxTable  # noqa: E402
+
+import app  # noqa: E402
+
+
+def legacy_build_results(tables):
+    """The original get_data loop: images are only joined if they were seen first"""
+    results = []
+    image_urls = {}
+    mandatory_fields = ['date', 'type', 'question_id', '_time']
+    for table in tables:
+        for record in table.records:
+            app.logger.debug(f"Processing record: time={record.get_time().isoformat()}, type={record.values.get('type')}, date={record.values.get('date')}, question_id={record.values.get('question_id')}")
+            missing_fields = [field for field in mandatory_fields if field not in record.values or record.values[field] is None]
+            if missing_fields:
+                continue
+            date = record.values.get('date', '')
+            question_id = record.values.get('question_id', 'unknown')
+            record_type = record.values.get('type', '')
+            if record_type == 'image':
+                image_url = record.values.get('image_url')
+                if image_url:
+                    key = f"{date}_{question_id}"
+                    if key not in image_urls:
+                        image_urls[key] = []
+                    image_urls[key].append({
+                        'url': image_url,
+                        'thumbnail_url': record.values.get('thumbnail_url'),
+                        'name': f"image_{question_id}_{record.get_time().isoformat()}"
+                    })
+                    app.logger.debug(f"Stored image: key={key}, url={image_url}")
+                continue
+            result = {
+                'date': date,
+                'type': record_type.replace('_', ' ').replace(' and ', ' & '),
+                'question_id': question_id,
+                'timestamp': record.get_time().isoformat(),
+                'question': legacy_unescape(record.values.get('question', '')),
+                'answer': legacy_unescape(record.values.get('answer', '')),
+                'followup_text': legacy_unescape(record.values.get('followup_text', '')),
+                'photos': [],
+                'all_fields': {}
+            }
+            if record_type == 'agronomist_assessment':
+                result.update({
+                    'assessment_type': legacy_unescape(record.values.get('assessment_type', '')),
+                    'improvement_notes': legacy_unescape(record.values.get('improvement_notes', '')),
+                    'uncertainty_notes': legacy_unescape(record.values.get('uncertainty_notes', '')),
+                    'photo_analysis': legacy_unescape(record.values.get('photo_analysis', '')),
+                    'agronomist': legacy_unescape(record.values.get('agronomist', ''))
+                })
+            photos = []
+            photos_str = record.values.get('photos', '[]')
+            if photos_str and isinstance(photos_str, str):
+                try:
+                    photos_str = photos_str.replace('\\"', '"').replace('\\ ', ' ')
+                    photos = json.loads(photos_str)
+                    app.logger.debug(f"Parsed photos for question_id {question_id}: {photos}")
+                except json.JSONDecodeError as e:
+                    app.logger.error(f"Error decoding photos JSON for question_id {question_id}: {photos_str}, error: {str(e)}")
+                    urls = re.findall(r'https?://[^\s"]+', photos_str)
+                    photos = [{'url': url} for url in urls]
+            image_key = f"{date}_{question_id}"
+            if image_key in image_urls:
+                photos.extend(image_urls[image_key])
+            result['photos'] = [
+                {
+                    'url': photo['url'],
+                    'name': photo.get('name', f"image_{question_id}_{i}"),
+                    'thumbnail_url': photo.get('thumbnail_url') or photo['url']
+                }
+                for i, photo in enumerate(photos) if isinstance(photo, dict) and 'url' in photo
+            ]
+            result['all_fields'] = {
+                k: v.isoformat() if isinstance(v, datetime) else legacy_unescape(v)
+                for k, v in record.values.items()
+                if k not in ['_measurement', '_start', '_stop', 'result', 'table']
+            }
+            results.append(result)
+            app.logger.debug(f"Added record: question_id={question_id}, photos_count={len(result['photos'])}")
+    return results
+
+
+def legacy_unescape(value):
+    if isinstance(value, str):
+        return value.replace('\\ ', ' ').replace('\\,', ',').replace('\\=', '=').replace('\\\\', '\\')
+    return value
+
+
+def synthetic_tables(records, images_first=False, seed=7):
+    """One table per type like a pivot result; image tables come last unless images_first"""
+    rng = random.Random(seed)
+    start = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    types = ['Day_1_-_Watering___Health', 'Day_2_-_Pest_Check', 'agronomist_assessment', 'image']
+    by_type = {t: [] for t in types}
+    for i in range(records):
+        record_type = rng.choices(types, weights=[55, 35, 5, 5])[0]
+        date = (start + timedelta(days=rng.randrange(180))).strftime('%Y-%m-%d')
+        question_id = 'agronomist_daily' if record_type == 'agronomist_assessment' else f'q{rng.randrange(1, 12)}'
+        values = {
+            'result': '_result', 'table': types.index(record_type),
+            '_time': start + timedelta(seconds=i), 'date': date, 'type': record_type,
+            'question_id': question_id, 'language': 'english',
+        }
+        if record_type == 'image':
+            values['image_url'] = f'https://res.cloudinary.com/demo/image/upload/{i}.jpg'
+            values['thumbnail_url'] = f'https://res.cloudinary.com/demo/image/upload/{i}_thumb.jpg'
+        elif record_type == 'agronomist_assessment':
+            values.update({'assessment_type': 'average', 'improvement_notes': 'More\\ mulch\\, less\\ water',
+                           'agronomist': 'system'})
+        else:
+            values.update({
+                'question': 'Did\\ you\\ water\\ the\\ plants\\ today?',
+                'answer': rng.choice(['Yes', 'No', 'Only\\ half\\, pump\\ failed']),
+                'followup_text': '',
+                'photos': rng.choice(['[]', '[{\\"url\\":\\ \\"https://res.cloudinary.com/demo/p.jpg\\"}]', '[broken https://x.y/z.jpg']),
+            })
+        by_type[record_type].append(FluxRecord(values['table'], values))
+    if images_first:
+        types = types[-1:] + types[:-1]
+    tables = []
+    for record_type in types:
+        table = FluxTable()
+        table.records = by_type[record_type]
+        tables.append(table)
+    return tables
+
+
+def attached_images(results):
+    return sum(1 for r in results for p in r['photos'] if '/upload/' in p['url'] and '_thumb' in p['thumbnail_url'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # Both versions log malformed photos JSON; keep the timing run quiet
+    logging.getLogger().setLevel(logging.CRITICAL)
+    if app.scheduler:
+        if app.scheduler:
+            app.scheduler.shutdown(wait=False)
+    for order, images_first in (('images first', True), ('images last', False)):
+        tables = synthetic_tables(args.records, images_first=images_first)
+        print(f"{args.records:,d} records, {order}:")
+        for name, fn in (('legacy', legacy_build_results), ('two-phase', app.build_task_results)):
+            timings = []
+            for _ in range(args.repeat):
+                started = time.process_time()
+                results = fn(tables)
+                timings.append(time.process_time() - started)
+            best = min(timings)
+            print(f"  {name:10s} {best * 1000:8.1f} ms CPU  {best / args.records * 1e6:6.2f} us/record  "
+                  f"{len(results):,d} responses  {attached_images(results):,d} images attached")
+
+
+if __name__ == '__main__':
+    main()
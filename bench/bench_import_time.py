@@ -0,0 +1,95 @@
+"""Cold-start guard: time `import app` with `python -X importtime` against a budget.
+
+Runs the import in fresh interpreters (serverless mode by default, as on Vercel),
+reports the median cumulative import time of the app module and its heaviest
+direct imports, and exits non-zero when the median exceeds the budget or when a
+module that should be deferred to first use (InfluxDB client, Cloudinary,
+APScheduler, NumPy, Pillow) was imported at startup.
+
+    python bench/bench_import_time.py [--budget-ms 400] [--runs 5] [--no-serverless]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported when a request needs them
+DEFERRED_MODULES = ('influxdb_client', 'cloudinary', 'apscheduler', 'numpy', 'PIL')
+
+LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)$')
+
+
+def run_once(serverless, state_dir):
+    env = dict(os.environ, LOCAL_STATE_DIR=state_dir, SERVERLESS='true' if serverless else 'false')
+    env.pop('VERCEL', None)
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    entries = []
+    for line in completed.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((len(indent), name, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def summarize(entries):
+    """(app cumulative µs, direct children of app as (cumulative µs, name), all imported names)"""
+    app_index = next(i for i, entry in enumerate(entries) if entry[1] == 'app')
+    app_depth = entries[app_index][0]
+    # importtime prints children before their parent; walk back until we leave app's subtree
+    children = []
+    for depth, name, _, cumulative in reversed(entries[:app_index]):
+        if depth <= app_depth:
+            break
+        if depth == app_depth + 2:
+            children.append((cumulative, name))
+    return entries[app_index][3], sorted(children, reverse=True), {entry[1] for entry in entries}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=400.0)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--no-serverless', dest='serverless', action='store_false')
+    args = parser.parse_args()
+
+    totals = []
+    with tempfile.TemporaryDirectory() as state_dir:
+        for _ in range(args.runs):
+            total_us, children, imported = summarize(run_once(args.serverless, state_dir))
+            totals.append(total_us)
+
+    median_ms = statistics.median(totals) / 1000
+    print(f"import app ({'serverless' if args.serverless else 'server'} mode): median {median_ms:.1f} ms "
+          f"over {args.runs} runs (min {min(totals) / 1000:.1f}, max {max(totals) / 1000:.1f}), budget {args.budget_ms:.0f} ms")
+    if children:
+        print('heaviest direct imports (last run):')
+        for cumulative, name in children[:args.top]:
+            print(f'  {cumulative / 1000:8.1f} ms  {name}')
+    else:
+        # The scheduler thread starts during import and its imports interleave with the main thread's
+        print('no per-module breakdown: background threads imported modules during startup')
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f'median import time {median_ms:.1f} ms exceeds the {args.budget_ms:.0f} ms budget')
+    if args.serverless:
+        eager = sorted(name for name in imported if name.split('.')[0] in DEFERRED_MODULES)
+        if eager:
+            failures.append(f"deferred modules imported at startup: {', '.join(eager[:10])}")
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
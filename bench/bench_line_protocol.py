@@ -0,0 +1,116 @@
+"""Throughput benchmark for line_protocol against the code it replaced.
+
+Compares the shared encoder with the per-request str.replace chains that
+save_responses used to build its lines, and decode_value() with the former
+unescape_influxdb() that build_task_results ran on every string field. The
+round-trip correctness checks live in tests/test_line_protocol.py.
+
+    python bench/bench_line_protocol.py [--points 20000] [--repeat 5] [--seed 1]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from line_protocol import BatchEncoder, decode_value, parse_line_protocol, tag_prefix  # noqa: E402
+
+ALPHABET = 'abcXYZ019 ,="\\\'{}[]:/.-_&' + 'हिंदी' + 'ಕನ್ನಡ'
+
+
+def random_text(rng, max_length=24):
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_length)))
+
+
+def legacy_encode(responses, date, question_type, language, timestamp_ns):
+    """The former save_responses loop body: helpers redefined and str.replace chains per value"""
+    lines = []
+    for index, (question, response) in enumerate(responses.items()):
+        def escape_field(value):
+            if isinstance(value, str):
+                return value.replace('\\', '\\\\').replace(',', '\\,').replace('=', '\\=').replace(' ', '\\ ')
+            return str(value)
+
+        def escape_tag(value):
+            if isinstance(value, str):
+                return value.replace('\\', '\\\\').replace(' ', '\\ ').replace(',', '\\,').replace('=', '\\=')
+            return str(value)
+
+        fields = [f'answer="{escape_field(response["answer"])}"',
+                  f'followup_text="{escape_field(response["followup_text"])}"',
+                  f'question="{escape_field(question)}"']
+        tag_parts = [f"date={escape_tag(date)}",
+                     f"type={escape_tag(question_type.replace(' ', '_').replace('&', '_'))}",
+                     f"language={escape_tag(language)}",
+                     f"question_id=q{index + 1}"]
+        lines.append(f'Vimal_Task,{",".join(tag_parts)} {",".join(fields)} {timestamp_ns}')
+    return lines
+
+
+def shared_encode(responses, date, question_type, language, timestamp_ns):
+    encoder = BatchEncoder()
+    prefix = tag_prefix('Vimal_Task', (('date', date), ('type', question_type.replace(' ', '_').replace('&', '_')),
+                                       ('language', language)))
+    for index, (question, response) in enumerate(responses.items()):
+        encoder.add(prefix, (('answer', response['answer']), ('followup_text', response['followup_text']),
+                             ('question', question)),
+                    timestamp_ns, extra_tags=(('question_id', f'q{index + 1}'),))
+    return encoder.lines()
+
+
+def legacy_unescape(value):
+    """The former unescape_influxdb()"""
+    if isinstance(value, str):
+        return value.replace('\\ ', ' ').replace('\\,', ',').replace('\\=', '=').replace('\\\\', '\\')
+    return value
+
+
+def best_time(function, arguments, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for argument in arguments:
+            function(*argument)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def report(name, seconds, count, unit):
+    print(f'{name:>14}: {seconds / count * 1e6:6.2f} us/{unit} ({count / seconds:,.0f} {unit}s/s)')
+
+
+def bench(points, repeat, seed):
+    rng = random.Random(seed)
+    forms = []
+    for _ in range(max(1, points // 10)):
+        responses = {f'Question {i}: did the plant, on day {i}, need water = yes/no?':
+                     {'answer': rng.choice(['Yes', 'No', 'Partly, leaves yellow']), 'followup_text': random_text(rng, 60)}
+                     for i in range(10)}
+        forms.append((responses, f'2025-06-{rng.randint(1, 30):02d}', 'Day 1 - Watering & Health', 'hindi',
+                      rng.randint(0, 2 ** 62)))
+    total = sum(len(form[0]) for form in forms)
+    print(f'encode ({total} points, best of {repeat}):')
+    for name, encode in (('legacy', legacy_encode), ('shared', shared_encode)):
+        report(name, best_time(encode, forms, repeat), total, 'point')
+
+    # Stored string fields as build_task_results sees them: escaped questions, answers and free text
+    stored = [(value,) for form in forms[:max(1, len(forms) // 10)] for line in shared_encode(*form)
+              for value in parse_line_protocol(line)[2].values()]
+    print(f'decode ({len(stored)} string fields, best of {repeat}):')
+    for name, decode in (('legacy', legacy_unescape), ('decode_value', decode_value)):
+        report(name, best_time(decode, stored, repeat), len(stored), 'field')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--points', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    bench(args.points, args.repeat, args.seed)
+
+
+if __name__ == '__main__':
+    main()
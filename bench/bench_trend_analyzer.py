@@ -0,0 +1,98 @@
+"""Micro-benchmark: single-pass trend analyzer vs. the original list-scan version.
+
+Builds a synthetic 100k-point sensor day and times analyze_historical_trends
+against the previous implementation, checking that both return the same summary.
+
+    python bench/bench_trend_analyzer.py [--points 100000] [--repeat 5]
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Serverless mode imports the app without a scheduler, so no prewarm job hits InfluxDB mid-run
+os.environ.setdefault('SERVERLESS', 'true')
+
+import app  # noqa: E402
+
+
+def legacy_analyze_historical_trends(historical_data):
+    """The original analyze_historical_trends: five filtered lists plus extra scans"""
+    temps = [d["temperature"] for d in historical_data if "temperature" in d and d["temperature"] is not None]
+    humidities = [d["humidity"] for d in historical_data if "humidity" in d and d["humidity"] is not None]
+    soil_moistures = [d["soil_moisture"] for d in historical_data if "soil_moisture" in d and d["soil_moisture"] is not None]
+    wind_speeds = [d["wind_speed"] for d in historical_data if "wind_speed" in d and d["wind_speed"] is not None]
+    rain_intensities = [(d["rain_intensity"], d["_time"]) for d in historical_data if "rain_intensity" in d and d["rain_intensity"] is not None]
+
+    trends = []
+    if len(temps) >= 2:
+        temp_trend = "increasing" if temps[-1] > temps[0] else "decreasing" if temps[-1] < temps[0] else "stable"
+        trends.append(f"Temperature: {temp_trend} trend, avg {statistics.mean(temps):.1f}°C, range {min(temps):.1f}-{max(temps):.1f}°C")
+    if len(humidities) >= 2:
+        trends.append(f"Humidity: avg {statistics.mean(humidities):.1f}%, min {min(humidities):.1f}%, max {max(humidities):.1f}%")
+    if len(soil_moistures) >= 2:
+        soil_trend = "increasing" if soil_moistures[-1] > soil_moistures[0] else "decreasing" if soil_moistures[-1] < soil_moistures[0] else "stable"
+        trends.append(f"Soil moisture: {soil_trend} trend, avg {statistics.mean(soil_moistures):.1f}%")
+    if len(wind_speeds) >= 2:
+        max_wind = max(wind_speeds)
+        max_wind_time = next(d['_time'] for d in historical_data if d.get('wind_speed') == max_wind)
+        trends.append(f"Wind: avg {statistics.mean(wind_speeds):.1f} m/s, max {max_wind:.1f} m/s at {app.format_ist_time(max_wind_time)}")
+    if rain_intensities:
+        rain_events = [(app.get_rain_status(r), t) for r, t in rain_intensities]
+        first_rain = next((t for status, t in rain_events if status in ["Heavy Rain", "Light Rain"]), None)
+        trends.append(f"Rainfall: Yes at {app.format_ist_time(first_rain)}" if first_rain else "Rainfall: No")
+    else:
+        trends.append("Rainfall: No")
+
+    # The original also sorted every wind speed just to log the top 5
+    sorted(((d["wind_speed"], d["_time"]) for d in historical_data if "wind_speed" in d), reverse=True)[:5]
+    return " | ".join(trends)
+
+
+def synthetic_day(points, seed=42):
+    """Generate one IST day of sensor points as fetch_historical_24h_data returns them"""
+    rng = random.Random(seed)
+    start = datetime(2024, 6, 30, 18, 30, tzinfo=timezone.utc)
+    step = timedelta(seconds=86400 / points)
+    day = []
+    for i in range(points):
+        point = {'_time': (start + step * i).strftime('%Y-%m-%dT%H:%M:%S.%fZ')}
+        point['temperature'] = round(24 + 8 * rng.random(), 2)
+        point['humidity'] = round(40 + 50 * rng.random(), 2)
+        point['soil_moisture'] = round(20 + 15 * rng.random(), 2)
+        if rng.random() < 0.9:
+            point['wind_speed'] = round(12 * rng.random(), 2)
+        point['rain_intensity'] = float(rng.randint(2500, 4095)) if i > points // 2 else 4095.0
+        day.append(point)
+    return day
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--points', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    day = synthetic_day(args.points)
+
+    legacy = legacy_analyze_historical_trends(day)
+    current = app.analyze_historical_trends(day)
+    print(f"summary: {current}")
+    print(f"identical output: {legacy == current}")
+
+    legacy_s = min(timeit.repeat(lambda: legacy_analyze_historical_trends(day), number=1, repeat=args.repeat))
+    current_s = min(timeit.repeat(lambda: app.analyze_historical_trends(day), number=1, repeat=args.repeat))
+    print(f"legacy list scans : {legacy_s * 1000:8.1f} ms")
+    print(f"single-pass       : {current_s * 1000:8.1f} ms")
+    print(f"speedup           : {legacy_s / current_s:8.2f}x on {args.points} points")
+    return 0 if legacy == current else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Per-(date, type) data versions for HTTP conditional caching.
+
+Every write bumps a counter for the (date, type) it touched, plus roll-up
+counters for the whole date and for all data, so a read can derive a validator
+for exactly the slice it returns without querying InfluxDB. Counters live in
+SQLite so all worker processes agree on them; the epoch is regenerated whenever
+the file is recreated, so validators issued before a reset can never match.
+"""
+import sqlite3
+import threading
+import time
+import uuid
+
+ALL = '*'
+
+
+class DataVersions:
+    """Monotonic write counters keyed by (date, type), shared through SQLite"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS data_versions (
+                date TEXT NOT NULL,
+                type TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (date, type)
+            )
+        ''')
+        conn.execute('CREATE TABLE IF NOT EXISTS data_versions_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        conn.execute("INSERT OR IGNORE INTO data_versions_meta (key, value) VALUES ('epoch', ?)", (uuid.uuid4().hex[:12],))
+        self.epoch = conn.execute("SELECT value FROM data_versions_meta WHERE key = 'epoch'").fetchone()[0]
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def bump(self, keys):
+        """Increment the versions of the given (date, type) pairs and their roll-ups"""
+        touched = set()
+        for date, record_type in keys:
+            touched.update({(date, record_type), (date, ALL), (ALL, ALL)})
+        if not touched:
+            return
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany('''
+                INSERT INTO data_versions (date, type, version, updated_at) VALUES (?, ?, 1, ?)
+                ON CONFLICT (date, type) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at
+            ''', [(date, record_type, now) for date, record_type in sorted(touched)])
+
+    def version(self, date=None, types=None):
+        """Version token for one date (optionally limited to some types), or for all data"""
+        if date is None:
+            keys = [(ALL, ALL)]
+        elif types:
+            keys = [(date, record_type) for record_type in sorted(set(types))]
+        else:
+            keys = [(date, ALL)]
+        placeholders = ' OR '.join('(date = ? AND type = ?)' for _ in keys)
+        rows = dict(((d, t), v) for d, t, v in self._connect().execute(
+            f'SELECT date, type, version FROM data_versions WHERE {placeholders}',
+            [part for key in keys for part in key]
+        ))
+        return f"{self.epoch}:" + '.'.join(str(rows.get(key, 0)) for key in keys)
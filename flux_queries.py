@@ -0,0 +1,90 @@
+"""Flux query builder for Vimal_Task reads.
+
+Tag predicates (measurement, type, date) are emitted directly after range() so
+InfluxDB can push them down to storage, and keep() drops the _start/_stop/
+_measurement columns and unknown tags before the pivot. The question_id fallback
+map() then only touches rows that survived the filters.
+"""
+
+TASK_MEASUREMENT = 'Vimal_Task'
+
+# Tags written by the task endpoints; everything else in a record is a field
+TASK_TAG_COLUMNS = ['question_id', 'date', 'type', 'language', 'assessment_type']
+
+# Record types that are always returned alongside a requested form type
+TASK_COMPANION_TYPES = ['image', 'agronomist_assessment']
+
+
+def flux_string(value):
+    """Quote a Python string as a Flux string literal"""
+    escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('${', '\\${')
+    return f'"{escaped}"'
+
+
+def task_type_tag(question_type):
+    """Form type as stored in the `type` tag, e.g. 'Day 1 - Watering & Health' -> 'Day_1_-_Watering___Health'"""
+    return question_type.replace(' ', '_').replace('&', '_')
+
+
+def _any_of(column, values):
+    return '(' + ' or '.join(f'r.{column} == {flux_string(v)}' for v in values) + ')'
+
+
+def build_task_query(bucket, start, stop, question_type=None, date=None, fields=None,
+                     types=None, exclude_types=None, after=None, limit=None):
+    """Build the pivoted Vimal_Task query used by /get_data.
+
+    start/stop are Flux time expressions (RFC3339 literals, durations or now()).
+    `date` may be one date or a list of dates, `types` replaces the type filter
+    derived from question_type, and `fields` optionally limits which fields are
+    read before the pivot. With `after` (a (time, question_id) cursor) or `limit`
+    the rows are returned as one table ordered by (_time, question_id), with _time
+    truncated to microseconds.
+    """
+    predicates = [f'r._measurement == {flux_string(TASK_MEASUREMENT)}']
+    if types:
+        predicates.append(_any_of('type', types))
+    elif question_type:
+        predicates.append(_any_of('type', [task_type_tag(question_type)] + TASK_COMPANION_TYPES))
+    for excluded in exclude_types or []:
+        predicates.append(f'r.type != {flux_string(excluded)}')
+    if date:
+        predicates.append(_any_of('date', [date] if isinstance(date, str) else date))
+    if fields:
+        predicates.append(_any_of('_field', fields))
+
+    keep_columns = ', '.join(flux_string(c) for c in ['_time', '_field', '_value'] + TASK_TAG_COLUMNS)
+    query = f'''
+        from(bucket: {flux_string(bucket)})
+            |> range(start: {start}, stop: {stop})
+            |> filter(fn: (r) => {' and '.join(predicates)})
+            |> keep(columns: [{keep_columns}])
+            |> map(fn: (r) => ({{r with question_id: if exists r.question_id then r.question_id else "unknown"}}))
+            |> pivot(rowKey: ["_time", "question_id"], columnKey: ["_field"], valueColumn: "_value")
+    '''
+    if after or limit:
+        # Pages are ordered and compared on _time truncated to microseconds: the client (and
+        # the read model) only see microsecond times, so a cursor built from a row whose
+        # stored time has sub-microsecond digits must still sort at or after that row
+        query = 'import "date"\n' + query
+        query += ('        |> group()\n'
+                  '            |> map(fn: (r) => ({r with _time: date.truncate(t: r._time, unit: 1us)}))\n'
+                  '            |> sort(columns: ["_time", "question_id"])\n')
+    if after:
+        after_time, after_question_id = after
+        cursor_time = f'time(v: {flux_string(after_time)})'
+        query += (f'            |> filter(fn: (r) => r._time > {cursor_time} or '
+                  f'(r._time == {cursor_time} and r.question_id > {flux_string(after_question_id)}))\n')
+    if limit:
+        query += f'            |> limit(n: {int(limit)})\n'
+    return query
+
+
+def build_debug_query(bucket, start, stop, limit=10):
+    """Sample raw Vimal_Task rows in a window, used to diagnose missing data"""
+    return f'''
+        from(bucket: {flux_string(bucket)})
+            |> range(start: {start}, stop: {stop})
+            |> filter(fn: (r) => r._measurement == {flux_string(TASK_MEASUREMENT)})
+            |> limit(n: {int(limit)})
+    '''
@@ -0,0 +1,11 @@
+# Gunicorn settings, loaded automatically when gunicorn is started from this directory.
+# Threaded workers let one process hold many slow field-device connections (uploads over
+# weak mobile links) while waiting on InfluxDB and Cloudinary, instead of one per process.
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '16'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
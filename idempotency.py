@@ -0,0 +1,78 @@
+"""Idempotency keys for bulk submissions.
+
+A key is claimed before its points are written and completed once the write
+succeeds, so a batch retried after a lost response (or replayed again by an
+offline phone) skips the submissions that already landed. Keys live in SQLite so
+all worker processes see the same claims; a claim whose write never completed
+(crashed worker) can be taken over once its lease expires, and completed keys
+are forgotten after the retention period.
+"""
+import sqlite3
+import threading
+import time
+
+PENDING = 'pending'
+DONE = 'done'
+
+
+class IdempotencyStore:
+    """Claim/complete/release bookkeeping for idempotency keys, shared through SQLite"""
+
+    def __init__(self, path, retention_seconds=30 * 86400, lease_seconds=300):
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        self._connect().execute('''
+            CREATE TABLE IF NOT EXISTS idempotency_keys (
+                key TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def claim(self, keys):
+        """Claim unseen keys; returns {key: 'claimed' | 'done' | 'pending'} for every key given"""
+        now = time.time()
+        states = {}
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM idempotency_keys WHERE status = ? AND updated_at < ?',
+                         (DONE, now - self.retention_seconds))
+            for key in keys:
+                if key in states:
+                    continue
+                row = conn.execute('SELECT status, updated_at FROM idempotency_keys WHERE key = ?', (key,)).fetchone()
+                if row is None or (row[0] == PENDING and row[1] < now - self.lease_seconds):
+                    conn.execute('INSERT OR REPLACE INTO idempotency_keys (key, status, updated_at) VALUES (?, ?, ?)',
+                                 (key, PENDING, now))
+                    states[key] = 'claimed'
+                else:
+                    states[key] = row[0]
+        return states
+
+    def complete(self, keys):
+        """Mark claimed keys as written"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany('UPDATE idempotency_keys SET status = ?, updated_at = ? WHERE key = ?',
+                             [(DONE, now, key) for key in keys])
+
+    def release(self, keys):
+        """Drop claims whose write failed so a retry can claim them again"""
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany('DELETE FROM idempotency_keys WHERE key = ? AND status = ?',
+                             [(key, PENDING) for key in keys])
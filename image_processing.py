@@ -0,0 +1,116 @@
+"""Image preparation for field photo uploads.
+
+Photos are hashed for de-duplication and, when Pillow is installed, downscaled
+into a bounded-size main JPEG plus a small thumbnail before upload. Without
+Pillow the original is uploaded with a Cloudinary incoming transformation and
+the thumbnail is a derived Cloudinary URL, so callers always get both URLs.
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from io import BytesIO
+
+logger = logging.getLogger(__name__)
+
+_pillow = None
+
+
+def _load_pillow():
+    """(Image, ImageOps) from Pillow, imported on first use to keep it out of cold starts.
+
+    Returns None when Pillow is not installed (resizing then falls back to
+    Cloudinary transformations).
+    """
+    global _pillow
+    if _pillow is None:
+        try:
+            from PIL import Image, ImageOps
+            _pillow = (Image, ImageOps)
+        except ImportError:
+            _pillow = False
+    return _pillow or None
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_stream(stream):
+    """SHA-256 hex digest of a seekable binary stream, read in chunks and rewound afterwards"""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def _encode_jpeg(image, max_dimension, quality):
+    resized = image.copy()
+    resized.thumbnail((max_dimension, max_dimension), _load_pillow()[0].LANCZOS)
+    buffer = BytesIO()
+    resized.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    buffer.seek(0)
+    return buffer
+
+
+def make_image_variants(stream, max_dimension, thumbnail_dimension, quality=85):
+    """Return (main, thumbnail) JPEG BytesIO buffers, or None when Pillow is unavailable
+    or the stream is not a decodable image.
+    """
+    pillow = _load_pillow()
+    if pillow is None:
+        return None
+    Image, ImageOps = pillow
+    try:
+        stream.seek(0)
+        image = Image.open(stream)
+        # Let the JPEG decoder downscale by a power of two while decoding large photos
+        image.draft('RGB', (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        main = _encode_jpeg(image, max_dimension, quality)
+        thumbnail = _encode_jpeg(image, thumbnail_dimension, quality)
+        return main, thumbnail
+    except Exception as e:
+        logger.warning(f"Could not process image with Pillow, uploading original: {str(e)}")
+        return None
+    finally:
+        stream.seek(0)
+
+
+class ImageHashIndex:
+    """Content hash -> uploaded URLs, persisted in SQLite so identical photos are uploaded once"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute('''
+            CREATE TABLE IF NOT EXISTS image_hashes (
+                content_hash TEXT PRIMARY KEY,
+                image_url TEXT NOT NULL,
+                thumbnail_url TEXT,
+                uploaded_at REAL NOT NULL
+            )
+        ''')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, content_hash):
+        """Return (image_url, thumbnail_url) for a previously uploaded photo, or None"""
+        return self._connect().execute(
+            'SELECT image_url, thumbnail_url FROM image_hashes WHERE content_hash = ?', (content_hash,)
+        ).fetchone()
+
+    def put(self, content_hash, image_url, thumbnail_url):
+        self._connect().execute(
+            'INSERT OR REPLACE INTO image_hashes (content_hash, image_url, thumbnail_url, uploaded_at) VALUES (?, ?, ?, ?)',
+            (content_hash, image_url, thumbnail_url, time.time())
+        )
@@ -0,0 +1,55 @@
+"""Single-leader election between worker processes through an exclusive file lock.
+
+The first process to flock() the lock file becomes the leader and holds the lock
+for as long as it lives; the kernel releases it when the process exits, so a
+follower that retries try_acquire() takes over after a leader dies or is
+recycled. On platforms without fcntl every process is its own leader.
+"""
+import logging
+import os
+
+try:
+    import fcntl
+except ImportError:  # Not POSIX: no cross-process locking, assume a single process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    """Non-blocking exclusive lock on a file, held until release() or process exit"""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def try_acquire(self):
+        """Take the lock if no other process holds it; returns whether this process is the leader"""
+        if self._fd is not None:
+            return True
+        if fcntl is None:
+            self._fd = -1
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        # Record the leader's pid for operators; followers never read it
+        os.ftruncate(fd, 0)
+        os.write(fd, f'{os.getpid()}\n'.encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        if self._fd >= 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        self._fd = None
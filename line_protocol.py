@@ -0,0 +1,253 @@
+"""InfluxDB line protocol encoding and decoding for the Vimal_Task write endpoints.
+
+String fields are stored in the app's escaped form: a backslash before space,
+comma, equals sign and backslash itself (e.g. 'Yes, twice' is stored as
+'Yes\\, twice'), which decode_value() reverses in a single regex pass. Tag-set
+prefixes are cached per (date, type, language) and BatchEncoder builds a whole
+write into one buffer.
+"""
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+import dateutil.parser
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_STORED_ESCAPE_RE = re.compile(r'\\([\\ ,=])')
+
+
+def escape_tag(value):
+    """Escape a tag key/value or field key: backslash, space, comma and equals sign"""
+    return str(value).replace('\\', '\\\\').replace(' ', '\\ ').replace(',', '\\,').replace('=', '\\=')
+
+
+def escape_string_field(value):
+    """Quote a string field value.
+
+    The stored form escapes backslash, space, comma and equals sign; inside the
+    quoted string InfluxDB then unescapes only \\\\ and \\", so a literal backslash
+    is written as four and a quote as \\". Chained str.replace calls are used
+    because each is a single C-level scan that returns the string untouched when
+    there is nothing to escape, which measures several times faster than
+    str.translate with multi-character replacements.
+    """
+    return '"' + value.replace('\\', '\\\\\\\\').replace(' ', '\\ ').replace(',', '\\,') \
+        .replace('=', '\\=').replace('"', '\\"') + '"'
+
+
+# Encoded forms of field keys ('answer' -> 'answer=') and of short string values:
+# question texts and common answers repeat on every submission of a form. Plain
+# dicts keep the hit path to a single lookup; a full cache is cleared rather than
+# evicted per entry, so one-off free text cannot crowd out the repeated values.
+_FIELD_KEY_CACHE = {}
+_STRING_CACHE = {}
+_STRING_CACHE_MAX_ENTRIES = 4096
+_STRING_CACHE_MAX_LENGTH = 512
+
+
+# ',key=value' for extra tag pairs such as ('question_id', 'q3')
+_TAG_PAIR_CACHE = {}
+
+
+def _field_key(key):
+    encoded = escape_tag(key) + '='
+    if len(_FIELD_KEY_CACHE) < 256:
+        _FIELD_KEY_CACHE[key] = encoded
+    return encoded
+
+
+def _tag_pair(pair):
+    encoded = f',{escape_tag(pair[0])}={escape_tag(pair[1])}'
+    if len(_TAG_PAIR_CACHE) >= 4096:
+        _TAG_PAIR_CACHE.clear()
+    _TAG_PAIR_CACHE[pair] = encoded
+    return encoded
+
+
+def format_field_value(value):
+    value_type = type(value)
+    if value_type is str:
+        return escape_string_field(value)
+    if value_type is bool:
+        return 'true' if value else 'false'
+    if value_type is int:
+        return f'{value}i'
+    if value_type is float:
+        return repr(value)
+    return escape_string_field(str(value))
+
+
+def decode_value(value):
+    """Turn a stored string field back into the original text (inverse of the stored escaping).
+
+    Non-strings are returned unchanged. Escaped backslashes are swapped for a
+    placeholder first so the replace chain reads each backslash pair once, left
+    to right, as the regex fallback (used when the text contains the placeholder)
+    does. Values written before the shared encoder (which stored a lone backslash
+    for a literal one) decode the same way unless that backslash preceded a
+    space, comma or equals sign.
+    """
+    if type(value) is not str or '\\' not in value:
+        return value
+    if '\0' in value:
+        return _STORED_ESCAPE_RE.sub(r'\1', value)
+    return value.replace('\\\\', '\0').replace('\\ ', ' ').replace('\\,', ',') \
+        .replace('\\=', '=').replace('\0', '\\')
+
+
+def to_timestamp_ns(value):
+    """Nanoseconds since the epoch from an int, datetime or date string, None if value is None.
+
+    Naive datetimes are taken as UTC, as the InfluxDB client's Point does.
+    """
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = dateutil.parser.parse(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // timedelta(microseconds=1) * 1000
+
+
+@lru_cache(maxsize=1024)
+def tag_prefix(measurement, tags):
+    """'measurement,k=v,...' for a tuple of (key, value) tag pairs, cached per tag set"""
+    parts = [measurement.replace(' ', '\\ ').replace(',', '\\,')]
+    for key, value in tags:
+        if value is not None and value != '':
+            parts.append(f'{escape_tag(key)}={escape_tag(value)}')
+    return ','.join(parts)
+
+
+def encode_line(prefix, fields, timestamp_ns=None, extra_tags=None):
+    """One line of line protocol from a cached prefix, (key, value) field pairs and extra tags"""
+    return BatchEncoder().add(prefix, fields, timestamp_ns, extra_tags).payload()
+
+
+class BatchEncoder:
+    """Accumulate points for one write; payload() joins them into a single body"""
+
+    def __init__(self):
+        self._lines = []
+
+    def __len__(self):
+        return len(self._lines)
+
+    def add(self, prefix, fields, timestamp_ns=None, extra_tags=None, tag_suffix=''):
+        """Append one point. Fields with None values are skipped; at least one must remain.
+
+        tag_suffix is appended to the prefix as-is (already escaped, e.g. ',question_id=q3').
+        """
+        parts = []
+        for key, value in fields:
+            if value is None:
+                continue
+            if type(value) is str:
+                encoded = _STRING_CACHE.get(value)
+                if encoded is None:
+                    encoded = escape_string_field(value)
+                    if len(value) <= _STRING_CACHE_MAX_LENGTH:
+                        if len(_STRING_CACHE) >= _STRING_CACHE_MAX_ENTRIES:
+                            _STRING_CACHE.clear()
+                        _STRING_CACHE[value] = encoded
+            else:
+                encoded = format_field_value(value)
+            parts.append((_FIELD_KEY_CACHE.get(key) or _field_key(key)) + encoded)
+        if not parts:
+            raise ValueError('A point needs at least one field')
+        if extra_tags:
+            tag_suffix += ''.join(_TAG_PAIR_CACHE.get(pair) or _tag_pair(pair) for pair in extra_tags)
+        if timestamp_ns is None:
+            self._lines.append(f"{prefix}{tag_suffix} {','.join(parts)}")
+        else:
+            self._lines.append(f"{prefix}{tag_suffix} {','.join(parts)} {timestamp_ns}")
+        return self
+
+    def payload(self):
+        return '\n'.join(self._lines)
+
+    def lines(self):
+        return list(self._lines)
+
+
+def _split_unescaped(text, separator, quoted=False):
+    """Split on separator, ignoring backslash-escaped characters (and quoted spans when quoted=True)"""
+    parts = []
+    current = []
+    in_quotes = False
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == '\\' and i + 1 < len(text):
+            current.append(text[i:i + 2])
+            i += 2
+            continue
+        if quoted and char == '"':
+            in_quotes = not in_quotes
+        elif char == separator and not in_quotes:
+            parts.append(''.join(current))
+            current = []
+            i += 1
+            continue
+        current.append(char)
+        i += 1
+    parts.append(''.join(current))
+    return parts
+
+
+def _unescape_key(text):
+    """Measurement/tag/field-key unescaping: a backslash escapes ',', '=', ' ' and itself"""
+    if '\\' not in text:
+        return text
+    return _STORED_ESCAPE_RE.sub(r'\1', text)
+
+
+def _parse_field_value(raw):
+    if raw.startswith('"') and raw.endswith('"') and len(raw) >= 2:
+        # InfluxDB only unescapes \" and \\ inside string fields; other backslashes are stored as-is
+        return re.sub(r'\\(["\\])', r'\1', raw[1:-1])
+    if raw in ('t', 'T', 'true', 'True', 'TRUE'):
+        return True
+    if raw in ('f', 'F', 'false', 'False', 'FALSE'):
+        return False
+    if raw[-1:] in ('i', 'u'):
+        return int(raw[:-1])
+    return float(raw)
+
+
+def parse_line_protocol(line):
+    """Parse one line into (measurement, tags, fields, timestamp_ns) as InfluxDB would store it.
+
+    String fields come back in their stored form (pass them to decode_value for
+    the original text); timestamp_ns is None when the line has no timestamp.
+    Raises ValueError for lines InfluxDB would reject.
+    """
+    # Quotes are literal in the series key; they only delimit string field values
+    line = line.strip()
+    series_key = _split_unescaped(line, ' ')[0]
+    sections = [series_key] + [s for s in _split_unescaped(line[len(series_key):], ' ', quoted=True) if s]
+    if len(sections) not in (2, 3):
+        raise ValueError(f'Malformed line protocol: {line[:200]}')
+    series = _split_unescaped(sections[0], ',')
+    measurement = _unescape_key(series[0])
+    tags = {}
+    for pair in series[1:]:
+        key, sep, value = pair.partition('=')
+        if not sep:
+            raise ValueError(f'Malformed tag {pair!r} in: {line[:200]}')
+        tags[_unescape_key(key)] = _unescape_key(value)
+    fields = {}
+    for pair in _split_unescaped(sections[1], ',', quoted=True):
+        key, sep, value = pair.partition('=')
+        if not sep or not value:
+            raise ValueError(f'Malformed field {pair!r} in: {line[:200]}')
+        try:
+            fields[_unescape_key(key)] = _parse_field_value(value)
+        except ValueError:
+            raise ValueError(f'Malformed field value {value!r} in: {line[:200]}')
+    try:
+        timestamp_ns = int(sections[2]) if len(sections) == 3 else None
+    except ValueError:
+        raise ValueError(f'Malformed timestamp in: {line[:200]}')
+    return measurement, tags, fields, timestamp_ns
@@ -0,0 +1,125 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Counters and histograms are kept per process; with several gunicorn workers each
+worker reports its own series and the scraper aggregates them.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket (non-cumulative) counts plus +Inf, then sum and count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += bucket_count
+                    le = f'le="{bound}"'
+                    lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}')
+                lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', ('route', 'method', 'status'))
+HTTP_REQUEST_BYTES = Histogram(
+    'http_request_size_bytes', 'HTTP request body size by route', ('route',), SIZE_BUCKETS)
+HTTP_RESPONSE_BYTES = Histogram(
+    'http_response_size_bytes', 'HTTP response body size by route (after compression)', ('route',), SIZE_BUCKETS)
+UPSTREAM_SECONDS = Histogram(
+    'upstream_request_duration_seconds', 'Latency of calls to InfluxDB and Cloudinary', ('upstream', 'operation'))
+UPSTREAM_ERRORS = Counter(
+    'upstream_errors_total', 'Failed calls to InfluxDB and Cloudinary', ('upstream', 'operation'))
+UPSTREAM_BYTES = Histogram(
+    'upstream_payload_size_bytes', 'Payload sizes sent to or received from upstreams',
+    ('upstream', 'operation'), SIZE_BUCKETS)
+RECORDS_PARSED = Counter(
+    'records_parsed_total', 'Rows parsed from InfluxDB responses', ('source',))
+
+REGISTRY = (HTTP_REQUEST_SECONDS, HTTP_REQUEST_BYTES, HTTP_RESPONSE_BYTES,
+            UPSTREAM_SECONDS, UPSTREAM_ERRORS, UPSTREAM_BYTES, RECORDS_PARSED)
+
+
+@contextmanager
+def track_upstream(upstream, operation):
+    """Time an upstream call, counting it as an error if the block raises"""
+    started = time.perf_counter()
+    try:
+        yield
+    except GeneratorExit:
+        # A streaming consumer stopped early; that is not an upstream failure
+        raise
+    except BaseException:
+        UPSTREAM_ERRORS.inc(upstream, operation)
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - started, upstream, operation)
+
+
+def render_metrics():
+    """All metrics in Prometheus text format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,137 @@
+"""Registry of the questions each form type accepts.
+
+Built once from the form definitions (the built-in EXPECTED_QUESTIONS, or a JSON
+file that can be edited while the app runs) into per-form lookup tables, so
+validating and encoding a submitted answer is a dict lookup instead of a list
+scan. Question ids come from each question's canonical position in its form
+(q1, q2, ...) or an explicit id, never from the order a client sent them in.
+
+The questions file looks like:
+
+    {
+      "forms": {
+        "Day 1 - Watering & Health": [
+          "Did you water the plants today?",
+          {"question": "Did it rain today on your field?", "id": "q2"}
+        ]
+      },
+      "aliases": {
+        "Did you water the plants today?": ["क्या आपने आज पौधों को पानी दिया?"]
+      }
+    }
+
+Forms in the file replace the built-in form of the same name; aliases map
+localized (or reworded) question texts onto the canonical question.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from flux_queries import task_type_tag
+from line_protocol import escape_tag
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionSpec:
+    """One canonical question: its id and the pre-escaped question_id tag"""
+
+    __slots__ = ('question', 'question_id', 'tag_suffix')
+
+    def __init__(self, question, question_id):
+        self.question = question
+        self.question_id = question_id
+        self.tag_suffix = f',question_id={escape_tag(question_id)}'
+
+
+class FormSpec:
+    """Lookup tables for one form type"""
+
+    def __init__(self, name, questions, aliases=None):
+        self.name = name
+        self.type_tag = task_type_tag(name)
+        specs = []
+        for position, entry in enumerate(questions):
+            if isinstance(entry, dict):
+                specs.append(QuestionSpec(entry['question'], entry.get('id') or f'q{position + 1}'))
+            else:
+                specs.append(QuestionSpec(entry, f'q{position + 1}'))
+        ids = [spec.question_id for spec in specs]
+        if len(set(ids)) != len(ids):
+            raise ValueError(f'Duplicate question ids in form {name!r}: {ids}')
+        self.questions = tuple(spec.question for spec in specs)
+        self.question_set = frozenset(self.questions)
+        self.question_ids = {spec.question: spec.question_id for spec in specs}
+        self._lookup = {spec.question: spec for spec in specs}
+        for canonical, localized in (aliases or {}).items():
+            spec = self._lookup.get(canonical)
+            if spec is None:
+                continue
+            for alias in localized:
+                self._lookup.setdefault(alias, spec)
+
+    def resolve(self, question):
+        """QuestionSpec for a canonical question or one of its aliases, None if unknown"""
+        return self._lookup.get(question)
+
+
+class QuestionRegistry:
+    """Per-form question lookups, optionally hot-reloaded from a JSON file.
+
+    forms() re-reads the file when its mtime changes (checked at most every
+    check_interval seconds). A file that fails to load is logged and the
+    previous registry stays in use.
+    """
+
+    def __init__(self, builtin_forms, path=None, check_interval=5.0):
+        self.builtin_forms = builtin_forms
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._forms = self._build(builtin_forms, {})
+        self._mtime = None
+        self._checked_at = 0.0
+        if path:
+            self._reload_if_changed(force=True)
+
+    @staticmethod
+    def _build(forms, aliases):
+        return {name: FormSpec(name, questions, aliases) for name, questions in forms.items()}
+
+    def _reload_if_changed(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                if self._mtime is not None:
+                    logger.warning(f"Questions file {self.path} disappeared; keeping the loaded questions")
+                    self._mtime = None
+                return
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    config = json.load(f)
+                forms = dict(self.builtin_forms)
+                forms.update(config.get('forms', {}))
+                self._forms = self._build(forms, config.get('aliases', {}))
+                self._mtime = mtime
+                logger.info(f"Loaded {len(self._forms)} forms from questions file {self.path}")
+            except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+                self._mtime = mtime
+                logger.error(f"Failed to load questions file {self.path}, keeping previous questions: {str(e)}")
+
+    def forms(self):
+        if self.path:
+            self._reload_if_changed()
+        return self._forms
+
+    def form(self, question_type):
+        """FormSpec for a form type, None if the type is unknown"""
+        return self.forms().get(question_type)
@@ -0,0 +1,240 @@
+"""Local SQLite read model for Vimal_Task records.
+
+Rows mirror what the pivoted /get_data Flux query returns: one row per
+(date, type, question_id, _time) with the field values stored as InfluxDB
+returns them (string fields still carry the app's backslash escaping). The model
+is fed the same line protocol the write endpoints send upstream, and a periodic
+reconcile replaces a trailing window with the pivoted upstream rows, so reads
+inside that window can be served locally and keep working during InfluxDB
+outages.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from line_protocol import parse_line_protocol
+
+logger = logging.getLogger(__name__)
+
+TAG_COLUMNS = ('date', 'type', 'question_id', 'language', 'assessment_type')
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _to_us(value):
+    """Microseconds since the epoch for an aware datetime (or an int already in microseconds)"""
+    if isinstance(value, datetime):
+        return (value - EPOCH) // timedelta(microseconds=1)
+    return int(value)
+
+
+class LocalRecord:
+    """Minimal stand-in for a pivoted FluxRecord (values dict plus get_time())"""
+
+    __slots__ = ('values',)
+
+    def __init__(self, values):
+        self.values = values
+
+    def get_time(self):
+        return self.values['_time']
+
+
+class LocalTable:
+    __slots__ = ('records',)
+
+    def __init__(self, records):
+        self.records = records
+
+
+class TaskReadModel:
+    """Pivoted Vimal_Task rows in SQLite, indexed on (date, type, question_id)"""
+
+    def __init__(self, path, measurement='Vimal_Task', local_grace_seconds=900):
+        self.path = path
+        self.measurement = measurement
+        self.local_grace_seconds = local_grace_seconds
+        self.local_writes = 0
+        self.local_hits = 0
+        self.last_reconcile = None
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS task_records (
+                date TEXT NOT NULL,
+                type TEXT NOT NULL,
+                question_id TEXT NOT NULL,
+                time_us INTEGER NOT NULL,
+                language TEXT,
+                assessment_type TEXT,
+                fields TEXT NOT NULL,
+                source TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (date, type, question_id, time_us)
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS task_records_time ON task_records (time_us, question_id)')
+        conn.execute('CREATE TABLE IF NOT EXISTS read_model_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _meta(self, key):
+        row = self._connect().execute('SELECT value FROM read_model_meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def apply_lines(self, lines):
+        """Upsert the points in freshly written line protocol, merging fields into existing rows"""
+        now = time.time()
+        rows = []
+        for line in lines:
+            try:
+                measurement, tags, fields, timestamp_ns = parse_line_protocol(line)
+            except ValueError as e:
+                logger.warning(f"Read model skipped unparseable line: {str(e)}")
+                continue
+            if measurement != self.measurement:
+                continue
+            time_us = (timestamp_ns if timestamp_ns is not None else time.time_ns()) // 1000
+            rows.append((tags.get('date', ''), tags.get('type', ''), tags.get('question_id', 'unknown'), time_us,
+                         tags.get('language'), tags.get('assessment_type'), json.dumps(fields), now))
+        if not rows:
+            return 0
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany('''
+                INSERT INTO task_records (date, type, question_id, time_us, language, assessment_type, fields, source, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'local', ?)
+                ON CONFLICT (date, type, question_id, time_us) DO UPDATE SET
+                    fields = json_patch(task_records.fields, excluded.fields),
+                    language = COALESCE(excluded.language, task_records.language),
+                    assessment_type = COALESCE(excluded.assessment_type, task_records.assessment_type),
+                    updated_at = excluded.updated_at
+            ''', rows)
+        self.local_writes += len(rows)
+        return len(rows)
+
+    def _window_rows(self, conn, start_us):
+        return {
+            (date, record_type, question_id, time_us): json.loads(fields)
+            for date, record_type, question_id, time_us, fields in conn.execute(
+                'SELECT date, type, question_id, time_us, fields FROM task_records WHERE time_us >= ?', (start_us,)
+            )
+        }
+
+    def replace_window(self, records, window_start, started_at):
+        """Replace every row at or after window_start with pivoted upstream records.
+
+        Local rows written after the reconcile started (or within the grace period
+        before it) are kept, since the upstream read may not include them yet.
+        Rows before window_start are evicted and covers() only reports this window
+        from now on. Returns the set of (date, type) pairs whose rows changed
+        inside the window.
+        """
+        start_us = _to_us(window_start)
+        now = time.time()
+        rows = []
+        for record in records:
+            values = record.values
+            fields = {k: v for k, v in values.items() if not k.startswith('_') and k not in TAG_COLUMNS
+                      and k not in ('result', 'table')}
+            rows.append((values.get('date') or '', values.get('type') or '', values.get('question_id') or 'unknown',
+                         _to_us(record.get_time()), values.get('language'), values.get('assessment_type'),
+                         json.dumps(fields), now))
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            before = self._window_rows(conn, start_us)
+            deleted = conn.execute('''
+                DELETE FROM task_records
+                WHERE time_us >= ? AND (source = 'upstream' OR updated_at < ?)
+            ''', (start_us, started_at - self.local_grace_seconds)).rowcount
+            conn.executemany('''
+                INSERT INTO task_records (date, type, question_id, time_us, language, assessment_type, fields, source, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'upstream', ?)
+                ON CONFLICT (date, type, question_id, time_us) DO UPDATE SET
+                    fields = excluded.fields, language = excluded.language,
+                    assessment_type = excluded.assessment_type, source = 'upstream', updated_at = excluded.updated_at
+            ''', rows)
+            # Rows that slid out of the window are never reconciled again; drop them, and cover
+            # only this window, so older reads go upstream instead of to frozen local rows
+            evicted = conn.execute('DELETE FROM task_records WHERE time_us < ?', (start_us,)).rowcount
+            conn.execute("INSERT OR REPLACE INTO read_model_meta (key, value) VALUES ('covered_since_us', ?)",
+                         (str(start_us),))
+            conn.execute("INSERT OR REPLACE INTO read_model_meta (key, value) VALUES ('reconciled_at', ?)", (str(now),))
+            after = self._window_rows(conn, start_us)
+        changed = {key[:2] for key in before.keys() | after.keys() if before.get(key) != after.get(key)}
+        self.last_reconcile = {'rows': len(rows), 'deleted': deleted, 'evicted': evicted,
+                               'changed_slices': len(changed), 'at': now,
+                               'duration_ms': round((now - started_at) * 1000)}
+        return changed
+
+    def covers(self, start):
+        """Whether a read starting at `start` (datetime) lies inside the latest reconciled window"""
+        covered_since = self._meta('covered_since_us')
+        return covered_since is not None and _to_us(start) >= int(covered_since)
+
+    def query(self, start, stop, types=None, exclude_types=None, dates=None, after=None, limit=None):
+        """Return [LocalTable] of rows in [start, stop], mirroring flux_queries.build_task_query filters"""
+        clauses = ['time_us >= ?', 'time_us <= ?']
+        params = [_to_us(start), _to_us(stop)]
+        if types:
+            clauses.append(f"type IN ({','.join('?' * len(types))})")
+            params.extend(types)
+        for excluded in exclude_types or []:
+            clauses.append('type != ?')
+            params.append(excluded)
+        if dates:
+            dates = [dates] if isinstance(dates, str) else list(dates)
+            clauses.append(f"date IN ({','.join('?' * len(dates))})")
+            params.extend(dates)
+        if after:
+            clauses.append('(time_us, question_id) > (?, ?)')
+            params.extend([_to_us(after[0]), after[1]])
+        sql = f'''
+            SELECT date, type, question_id, time_us, language, assessment_type, fields FROM task_records
+            WHERE {' AND '.join(clauses)} ORDER BY time_us, question_id
+        '''
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+
+        records = []
+        for date, record_type, question_id, time_us, language, assessment_type, fields in \
+                self._connect().execute(sql, params):
+            values = json.loads(fields)
+            values.update({
+                '_time': EPOCH + timedelta(microseconds=time_us),
+                'date': date, 'type': record_type, 'question_id': question_id,
+            })
+            if language is not None:
+                values['language'] = language
+            if assessment_type is not None:
+                values['assessment_type'] = assessment_type
+            records.append(LocalRecord(values))
+        self.local_hits += 1
+        return [LocalTable(records)]
+
+    def stats(self):
+        conn = self._connect()
+        covered_since = self._meta('covered_since_us')
+        reconciled_at = self._meta('reconciled_at')
+        return {
+            'rows': conn.execute('SELECT COUNT(*) FROM task_records').fetchone()[0],
+            'local_rows': conn.execute("SELECT COUNT(*) FROM task_records WHERE source = 'local'").fetchone()[0],
+            'covered_since': datetime.fromtimestamp(int(covered_since) / 1_000_000, tz=timezone.utc).isoformat()
+            if covered_since else None,
+            'reconciled_age_s': round(time.time() - float(reconciled_at), 1) if reconciled_at else None,
+            'local_writes': self.local_writes,
+            'local_reads': self.local_hits,
+            'last_reconcile': self.last_reconcile,
+        }
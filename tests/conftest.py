@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# Import the app the way a serverless instance would: no scheduler, no background
+# jobs and no upstream clients until a test asks for them
+os.environ.setdefault('SERVERLESS', 'true')
+os.environ.setdefault('LOCAL_STATE_DIR', tempfile.mkdtemp(prefix='agronomist-tests-'))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
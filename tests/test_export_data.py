@@ -0,0 +1,66 @@
+"""/export_data failure reporting: error status before streaming, error marker after."""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+import app as app_module
+
+
+class FakeRecord:
+    def __init__(self, index):
+        self.values = {'date': '2025-06-01', 'type': 'Day_1_-_Watering___Health', 'question_id': f'q{index}',
+                       'question': 'Did\\ you\\ water?', 'answer': 'Yes'}
+
+    def get_time(self):
+        return datetime(2025, 6, 1, 10, 0, tzinfo=timezone.utc)
+
+
+def records_then_failure(count):
+    def influx_query_stream(query):
+        for index in range(count):
+            yield FakeRecord(index + 1)
+        raise ConnectionError('connection reset')
+    return influx_query_stream
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, 'EXPORT_CHUNK_ROWS', 2)
+    return app_module.app.test_client()
+
+
+@pytest.mark.parametrize('export_format', ['csv', 'ndjson'])
+def test_failure_before_first_chunk_is_an_error_status(client, monkeypatch, export_format):
+    monkeypatch.setattr(app_module, 'influx_query_stream', records_then_failure(1))
+    response = client.get(f'/export_data?start_date=2025-06-01&format={export_format}')
+    assert response.status_code == 500
+    assert 'connection reset' in response.get_json()['error']
+
+
+def test_csv_failure_mid_stream_ends_with_error_row(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'influx_query_stream', records_then_failure(3))
+    response = client.get('/export_data?start_date=2025-06-01&format=csv')
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == app_module.EXPORT_COLUMNS
+    assert [row[3] for row in rows[1:-1]] == ['q1', 'q2']
+    assert rows[-1] == ['#error', 'Export interrupted: connection reset']
+
+
+def test_ndjson_failure_mid_stream_ends_with_error_object(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'influx_query_stream', records_then_failure(3))
+    response = client.get('/export_data?start_date=2025-06-01')
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['question_id'] for line in lines[:-1]] == ['q1', 'q2']
+    assert lines[0]['question'] == 'Did you water?'
+    assert lines[-1] == {'error': 'Export interrupted: connection reset'}
+
+
+def test_complete_csv_has_no_marker(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'influx_query_stream', lambda query: iter([FakeRecord(1), FakeRecord(2)]))
+    response = client.get('/export_data?start_date=2025-06-01&format=csv')
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 3 and rows[-1][0] != '#error'
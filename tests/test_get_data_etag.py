@@ -0,0 +1,50 @@
+"""/get_data ETags: write versions only for reads served from the reconciled window."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import app as app_module
+from read_model import TaskReadModel
+from test_get_data_pagination import fake_query_task_tables
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    model = TaskReadModel(str(tmp_path / 'read_model.db'))
+    model.replace_window([], datetime.now(timezone.utc) - timedelta(days=30), 0)
+    monkeypatch.setattr(app_module, 'read_model', model)
+    monkeypatch.setattr(app_module, 'DATA_VERSIONS_ETAGS', True)
+    monkeypatch.setattr(app_module, 'get_weather_summary', lambda date: 'summary')
+    return app_module.app.test_client()
+
+
+def test_read_outside_window_revalidates_against_payload(client, monkeypatch):
+    rows = [(1748772930122999808, 'q1')]
+    queries = []
+    fake = fake_query_task_tables(rows)
+
+    def query_task_tables(use_read_model, *args, **kwargs):
+        queries.append(use_read_model)
+        return fake(use_read_model, *args, **kwargs)
+
+    monkeypatch.setattr(app_module, 'query_task_tables', query_task_tables)
+    url = '/get_data?date=2025-06-01'
+    etag = client.get(url).headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    # Written by another deployment: this host's data versions never move
+    rows.append((1748772931000000000, 'q2'))
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert len(response.get_json()['responses']) == 2
+    assert queries == [False, False, False]
+
+
+def test_read_inside_window_uses_write_versions(client, monkeypatch):
+    queries = []
+    monkeypatch.setattr(app_module, 'query_task_tables',
+                        lambda *args, **kwargs: queries.append(args[0]) or [])
+    url = f"/get_data?date={datetime.now(timezone.utc).strftime('%Y-%m-%d')}"
+    etag = client.get(url).headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    assert queries == [True]
@@ -0,0 +1,87 @@
+"""Cursor pagination of /get_data over rows whose stored _time has sub-microsecond digits."""
+from datetime import timedelta
+
+import pytest
+
+import app as app_module
+from flux_queries import build_task_query
+from line_protocol import EPOCH, to_timestamp_ns
+
+# Two submissions; every question of a submission shares one float-derived timestamp
+# such as int(ts.timestamp() * 1e9), which InfluxDB stores with nanosecond digits
+SUBMISSION_TIMES_NS = (1748772930122999808, 1748772931000000512)
+QUESTION_IDS = ('q1', 'q2', 'q3', 'q4', 'q5')
+
+
+class FakeRecord:
+    """A pivoted FluxRecord as the InfluxDB client returns it: _time parsed to microseconds"""
+
+    def __init__(self, time_ns, question_id):
+        self.values = {
+            '_time': EPOCH + timedelta(microseconds=time_ns // 1000),
+            'date': '2025-06-01',
+            'type': 'Day_1_-_Watering___Health',
+            'question_id': question_id,
+            'question': f'Question {question_id}',
+            'answer': 'Yes',
+        }
+
+    def get_time(self):
+        return self.values['_time']
+
+
+class FakeTable:
+    def __init__(self, records):
+        self.records = records
+
+
+def fake_query_task_tables(rows):
+    """Evaluate the paging part of build_task_query over (time_ns, question_id) response rows"""
+
+    def query_task_tables(use_read_model, start_time, stop_time, **query_args):
+        if query_args.get('types') == ['image']:
+            return []
+        query = build_task_query('bucket', start_time, stop_time, **query_args)
+        truncated = 'date.truncate(t: r._time, unit: 1us)' in query
+
+        def order_key(row):
+            time_ns, question_id = row
+            return (time_ns // 1000 * 1000 if truncated else time_ns), question_id
+
+        selected = sorted(rows, key=order_key)
+        if start_time != '-30d':
+            start_ns = to_timestamp_ns(start_time)
+            selected = [row for row in selected if row[0] >= start_ns]
+        after = query_args.get('after')
+        if after:
+            cursor = (to_timestamp_ns(after[0]), after[1])
+            selected = [row for row in selected if order_key(row) > cursor]
+        if query_args.get('limit'):
+            selected = selected[:query_args['limit']]
+        return [FakeTable([FakeRecord(time_ns, question_id) for time_ns, question_id in selected])]
+
+    return query_task_tables
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 5, 7])
+def test_pages_advance_past_sub_microsecond_timestamps(monkeypatch, limit):
+    rows = [(time_ns, question_id) for time_ns in SUBMISSION_TIMES_NS for question_id in QUESTION_IDS]
+    monkeypatch.setattr(app_module, 'query_task_tables', fake_query_task_tables(rows))
+    client = app_module.app.test_client()
+
+    seen = []
+    body = {'limit': limit}
+    for _ in range(len(rows) + 1):
+        response = client.post('/get_data', json=body)
+        assert response.status_code == 200
+        page = response.get_json()
+        seen.extend((r['timestamp'], r['question_id']) for r in page['responses'])
+        if not page['has_more']:
+            break
+        body = {'limit': limit, 'cursor': page['next_cursor']}
+    else:
+        pytest.fail('pagination did not terminate')
+
+    assert len(seen) == len(rows)
+    assert len(set(seen)) == len(rows)
+    assert [question_id for _, question_id in seen] == list(QUESTION_IDS) * len(SUBMISSION_TIMES_NS)
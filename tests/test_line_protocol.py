@@ -0,0 +1,72 @@
+"""Round trips through the shared line protocol encoder and decoder."""
+import json
+import random
+
+import pytest
+
+from line_protocol import BatchEncoder, decode_value, parse_line_protocol, tag_prefix
+
+ALPHABET = 'abcXYZ019 ,="\\\'\t{}[]:/.-_&\0' + 'हिंदी' + 'ಕನ್ನಡ'
+
+
+def random_text(rng, max_length=24, allow_empty=True):
+    length = rng.randint(0 if allow_empty else 1, max_length)
+    return ''.join(rng.choice(ALPHABET) for _ in range(length))
+
+
+def random_tag(rng):
+    # Tag values cannot be empty or end in a backslash, and InfluxDB rejects tabs and NULs in keys
+    while True:
+        value = random_text(rng, 16, allow_empty=False).replace('\t', ' ').replace('\0', ' ')
+        if not value.endswith('\\'):
+            return value
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_random_points_round_trip(seed):
+    rng = random.Random(seed)
+    for case in range(5000):
+        tags = (('date', random_tag(rng)), ('type', random_tag(rng)), ('language', random_tag(rng)))
+        fields = [('answer', random_text(rng)), ('question', random_text(rng, 80, allow_empty=False)),
+                  ('count', rng.randint(-10 ** 12, 10 ** 12)), ('ok', rng.random() < 0.5),
+                  ('score', rng.uniform(-1e6, 1e6))]
+        if rng.random() < 0.5:
+            fields.append(('photos', json.dumps([{'url': random_text(rng, 40)} for _ in range(rng.randint(0, 3))])))
+        timestamp_ns = rng.randint(0, 2 ** 62)
+        question_id = f'q{case % 40 + 1}'
+        line = BatchEncoder().add(tag_prefix('Vimal_Task', tags), fields, timestamp_ns,
+                                  extra_tags=(('question_id', question_id),)).payload()
+
+        measurement, parsed_tags, parsed_fields, parsed_ts = parse_line_protocol(line)
+        decoded = {key: decode_value(value) for key, value in parsed_fields.items()}
+        assert (measurement, parsed_tags, parsed_ts) == ('Vimal_Task', dict(tags, question_id=question_id), timestamp_ns), line
+        assert decoded == dict(fields), line
+
+
+@pytest.mark.parametrize('stored, expected', [
+    ('Yes\\,\\ twice', 'Yes, twice'),
+    ('a\\=b', 'a=b'),
+    ('C:\\\\temp', 'C:\\temp'),
+    ('\\\\\\ ', '\\ '),
+    ('\\\\,', '\\,'),
+    # Written before the shared encoder: a lone backslash for a literal one
+    ('C:\\temp', 'C:\\temp'),
+    ('trailing\\', 'trailing\\'),
+    ('nul\0\\ kept', 'nul\0 kept'),
+])
+def test_decode_value(stored, expected):
+    assert decode_value(stored) == expected
+
+
+def test_decode_value_passes_non_strings_through():
+    assert decode_value(3) == 3
+    assert decode_value(None) is None
+
+
+def test_string_cache_does_not_change_output():
+    prefix = tag_prefix('Vimal_Task', (('date', '2025-06-01'),))
+    first = BatchEncoder().add(prefix, (('answer', 'Yes, twice'),), 1).payload()
+    for i in range(10000):
+        BatchEncoder().add(prefix, (('answer', f'one-off answer {i}'),), 1)
+    assert BatchEncoder().add(prefix, (('answer', 'Yes, twice'),), 1).payload() == first
+    assert first == 'Vimal_Task,date=2025-06-01 answer="Yes\\,\\ twice" 1'
@@ -0,0 +1,28 @@
+"""TaskReadModel reconcile window coverage."""
+from datetime import datetime, timedelta, timezone
+
+from read_model import LocalRecord, TaskReadModel
+
+
+def upstream_record(when, question_id='q1'):
+    return LocalRecord({'_time': when, 'date': when.strftime('%Y-%m-%d'), 'type': 'Day_1_-_Watering___Health',
+                        'question_id': question_id, 'question': 'Q', 'answer': 'Yes'})
+
+
+def test_days_that_leave_the_window_are_no_longer_covered(tmp_path):
+    model = TaskReadModel(str(tmp_path / 'read_model.db'))
+    january = datetime(2025, 1, 31, tzinfo=timezone.utc)
+    march = datetime(2025, 3, 1, 12, tzinfo=timezone.utc)
+    july = datetime(2025, 7, 31, tzinfo=timezone.utc)
+
+    model.replace_window([upstream_record(january - timedelta(days=1))], january - timedelta(days=30), 0)
+    assert model.covers(january - timedelta(days=10))
+
+    model.replace_window([upstream_record(july - timedelta(days=1))], july - timedelta(days=30), 0)
+    assert not model.covers(march)
+    assert not model.covers(january - timedelta(days=10))
+    assert model.covers(july - timedelta(days=10))
+    # Rows that slid out of the window are evicted rather than served frozen
+    old_rows = model.query(january - timedelta(days=30), july - timedelta(days=31))[0].records
+    assert old_rows == []
+    assert len(model.query(july - timedelta(days=30), july)[0].records) == 1
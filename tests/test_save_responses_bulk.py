@@ -0,0 +1,65 @@
+"""/save_responses_bulk: per-submission validation and idempotency key bookkeeping."""
+import pytest
+
+import app as app_module
+
+FORM = 'Day 1 - Watering & Health'
+
+
+def submission(photos=None, **overrides):
+    response = {'answer': 'Yes', 'followup_text': ''}
+    if photos is not None:
+        response['photos'] = photos
+    body = {'date': '2025-06-01', 'type': FORM, 'language': 'hindi', 'timestamp': '2025-06-01T10:15:30Z',
+            'responses': {'Did you water the plants today?': response}}
+    body.update(overrides)
+    return body
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    written = []
+
+    def write_task_lines(lines):
+        written.extend(lines)
+        return 'ack'
+
+    monkeypatch.setattr(app_module, 'write_task_lines', write_task_lines)
+    monkeypatch.setattr(app_module, 'idempotency_keys',
+                        app_module.IdempotencyStore(str(tmp_path / 'keys.db')))
+    test_client = app_module.app.test_client()
+    test_client.written = written
+    return test_client
+
+
+def test_photos_must_be_a_list_of_objects(client):
+    response = client.post('/save_responses_bulk', json=[submission(photos='x'), submission(photos=['x'])])
+    assert response.status_code == 400
+    assert [r['status'] for r in response.get_json()['results']] == ['invalid', 'invalid']
+    assert not client.written
+
+
+def test_retry_after_duplicate_is_reported(client):
+    body = [submission(photos=[{'url': 'https://example.com/a.jpg'}])]
+    first = client.post('/save_responses_bulk', json=body).get_json()
+    second = client.post('/save_responses_bulk', json=body).get_json()
+    assert first['results'][0]['status'] == 'written'
+    assert second['results'][0]['status'] == 'duplicate'
+    assert len(client.written) == 1
+
+
+def test_encode_failure_releases_claims(client, monkeypatch):
+    add_form_responses = app_module.add_form_responses
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('encoder exploded')
+
+    body = [submission(), submission(date='2025-06-02')]
+    monkeypatch.setattr(app_module, 'add_form_responses', fail)
+    response = client.post('/save_responses_bulk', json=body)
+    assert response.status_code == 500
+    assert 'encoder exploded' in response.get_json()['error']
+
+    monkeypatch.setattr(app_module, 'add_form_responses', add_form_responses)
+    retry = client.post('/save_responses_bulk', json=body).get_json()
+    assert [r['status'] for r in retry['results']] == ['written', 'written']
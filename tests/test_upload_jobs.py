@@ -0,0 +1,62 @@
+"""UploadJobQueue lease recovery and spool cleanup."""
+import os
+import time
+
+from upload_jobs import UploadJobQueue
+
+
+def make_queue(tmp_path, process_fn, **kwargs):
+    return UploadJobQueue(str(tmp_path / 'jobs.db'), str(tmp_path / 'spool'), process_fn, **kwargs)
+
+
+def submit(jobs, job_id):
+    with open(jobs.spool_path_for(job_id), 'wb') as spool_file:
+        spool_file.write(b'photo')
+    jobs.submit(job_id, 'q1', '2025-06-01', '2025-06-01T00:00:00Z')
+
+
+def wait_for(jobs, job_id, status, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if jobs.status(job_id)['status'] == status:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f'{job_id} is {jobs.status(job_id)["status"]}, expected {status}')
+
+
+def test_expired_lease_is_recovered_in_a_live_process(tmp_path):
+    calls = []
+    jobs = make_queue(tmp_path, lambda job: calls.append(job['job_id']) or {'image_url': 'u'}, lease_seconds=0.2)
+    # A job whose worker was lost: recorded as running, never processed
+    spool_path = jobs.spool_path_for('lost')
+    open(spool_path, 'wb').close()
+    jobs._connect().execute('''
+        INSERT INTO upload_jobs (job_id, status, question_id, date, timestamp, spool_path, owner,
+                                 lease_until, created_at, updated_at)
+        VALUES ('lost', 'running', 'q1', '2025-06-01', 't', ?, ?, ?, 0, 0)
+    ''', (spool_path, jobs.owner, time.time() + 0.2))
+
+    assert jobs.recover() == 0
+    time.sleep(0.3)
+    assert jobs.recover() == 1
+    wait_for(jobs, 'lost', 'done')
+    assert calls == ['lost']
+    assert not os.path.exists(spool_path)
+
+
+def test_valid_leases_are_not_recovered(tmp_path):
+    jobs = make_queue(tmp_path, lambda job: {'image_url': 'u'})
+    submit(jobs, 'a')
+    wait_for(jobs, 'a', 'done')
+    assert jobs.recover() == 0
+
+
+def test_permanent_failure_removes_spool_file(tmp_path):
+    def fail(job):
+        raise RuntimeError('cloudinary down')
+
+    jobs = make_queue(tmp_path, fail, max_retries=1, retry_delay=0.01)
+    submit(jobs, 'b')
+    wait_for(jobs, 'b', 'failed')
+    assert jobs.status('b')['attempts'] == 2
+    assert not os.path.exists(jobs.spool_path_for('b'))
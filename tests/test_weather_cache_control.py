@@ -0,0 +1,44 @@
+"""Cache-Control of the weather summary endpoints for past days with and without data."""
+import pytest
+
+import app as app_module
+
+STATS = {field: {'count': 2, 'mean': 1.0, 'min': 0.5, 'max': 1.5, 'first': 0.5, 'last': 1.5,
+                 'max_time': '2025-06-01T06:00:00Z'} for field in app_module.WEATHER_FIELDS}
+LONG = f'public, max-age={app_module.WEATHER_PAST_MAX_AGE}'
+SHORT = f'public, max-age={app_module.WEATHER_CACHE_TODAY_TTL}'
+
+
+@pytest.fixture
+def client(monkeypatch):
+    app_module.weather_cache.clear()
+    monkeypatch.setattr(app_module, 'WEATHER_QUERY_MODE', 'aggregated')
+    yield app_module.app.test_client()
+    app_module.weather_cache.clear()
+
+
+def serve_stats(monkeypatch, stats_by_date):
+    monkeypatch.setattr(app_module, 'fetch_historical_24h_stats', lambda date: stats_by_date.get(date, {}))
+
+
+def test_past_day_with_data_is_cached_long(client, monkeypatch):
+    serve_stats(monkeypatch, {'2025-06-01': STATS})
+    for _ in range(2):  # computed, then from the server cache
+        response = client.get('/weather_summary?date=2025-06-01')
+        assert response.headers['Cache-Control'] == LONG
+
+
+def test_past_day_without_data_is_cached_short(client, monkeypatch):
+    serve_stats(monkeypatch, {})
+    for _ in range(2):
+        response = client.get('/weather_summary?date=2025-06-01')
+        assert 'No historical data' in response.get_json()['weather_summary']
+        assert response.headers['Cache-Control'] == SHORT
+
+
+def test_range_is_cached_long_only_when_every_day_has_data(client, monkeypatch):
+    serve_stats(monkeypatch, {'2025-06-01': STATS, '2025-06-02': STATS})
+    response = client.get('/weather_summary_range?start_date=2025-06-01&end_date=2025-06-02')
+    assert response.headers['Cache-Control'] == LONG
+    response = client.get('/weather_summary_range?start_date=2025-06-01&end_date=2025-06-03')
+    assert response.headers['Cache-Control'] == SHORT
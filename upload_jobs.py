@@ -0,0 +1,161 @@
+"""Background upload job queue.
+
+An accepted photo is written to a local spool directory and recorded in SQLite
+before the request returns, then processed by a bounded thread pool with retry.
+Job state lives in SQLite so any worker process can answer status requests, and
+jobs whose lease expires (their process crashed, or their worker hung) are
+picked up again by recover(). Spool files are removed once a job is done or has
+failed permanently.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class UploadJobQueue:
+    """Persist uploads locally and process them on a bounded worker pool"""
+
+    def __init__(self, db_path, spool_dir, process_fn, max_workers=4, max_retries=3,
+                 retry_delay=2.0, lease_seconds=900):
+        self.db_path = db_path
+        self.spool_dir = spool_dir
+        self.process_fn = process_fn
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.lease_seconds = lease_seconds
+        self.owner = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='upload')
+        os.makedirs(spool_dir, exist_ok=True)
+        self._connect().execute('''
+            CREATE TABLE IF NOT EXISTS upload_jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                question_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                filename TEXT,
+                spool_path TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                image_url TEXT,
+                thumbnail_url TEXT,
+                error TEXT,
+                owner TEXT,
+                lease_until REAL NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def spool_path_for(self, job_id):
+        return os.path.join(self.spool_dir, f'{job_id}.upload')
+
+    def submit(self, job_id, question_id, date, timestamp, filename=None):
+        """Queue a job whose file has already been written to spool_path_for(job_id)"""
+        now = time.time()
+        self._connect().execute('''
+            INSERT INTO upload_jobs (job_id, status, question_id, date, timestamp, filename, spool_path,
+                                     owner, lease_until, created_at, updated_at)
+            VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (job_id, question_id, date, timestamp, filename, self.spool_path_for(job_id),
+              self.owner, now + self.lease_seconds, now, now))
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def new_job_id(self):
+        return uuid.uuid4().hex
+
+    def status(self, job_id):
+        row = self._connect().execute('SELECT * FROM upload_jobs WHERE job_id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'job_id': row['job_id'],
+            'status': row['status'],
+            'question_id': row['question_id'],
+            'date': row['date'],
+            'attempts': row['attempts'],
+            'image_url': row['image_url'],
+            'thumbnail_url': row['thumbnail_url'],
+            'error': row['error']
+        }
+
+    def stats(self):
+        rows = self._connect().execute('SELECT status, COUNT(*) FROM upload_jobs GROUP BY status').fetchall()
+        return {status: count for status, count in rows}
+
+    def _update(self, job_id, **fields):
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        self._connect().execute(f'UPDATE upload_jobs SET {assignments} WHERE job_id = ?', (*fields.values(), job_id))
+
+    def _run(self, job_id):
+        row = self._connect().execute('SELECT * FROM upload_jobs WHERE job_id = ?', (job_id,)).fetchone()
+        if row is None or row['status'] in ('done', 'failed'):
+            return
+        attempts = row['attempts'] + 1
+        self._update(job_id, status='running', attempts=attempts, lease_until=time.time() + self.lease_seconds)
+        try:
+            result = self.process_fn(dict(row))
+        except Exception as e:
+            if attempts <= self.max_retries:
+                delay = self.retry_delay * 2 ** (attempts - 1)
+                logger.warning(f"Upload job {job_id} failed (attempt {attempts}), retrying in {delay:.1f}s: {str(e)}")
+                self._update(job_id, status='queued', error=str(e))
+                timer = threading.Timer(delay, self._executor.submit, args=(self._run, job_id))
+                timer.daemon = True
+                timer.start()
+            else:
+                logger.error(f"Upload job {job_id} failed permanently after {attempts} attempts: {str(e)}")
+                self._update(job_id, status='failed', error=str(e))
+                self._remove_spool_file(row['spool_path'])
+            return
+
+        self._update(job_id, status='done', error=None,
+                     image_url=result.get('image_url'), thumbnail_url=result.get('thumbnail_url'))
+        self._remove_spool_file(row['spool_path'])
+        logger.info(f"Upload job {job_id} completed: {result.get('image_url')}")
+
+    @staticmethod
+    def _remove_spool_file(spool_path):
+        try:
+            os.remove(spool_path)
+        except OSError:
+            pass
+
+    def recover(self):
+        """Re-queue unfinished jobs whose lease expired.
+
+        That covers jobs of a process that died as well as jobs whose worker in a
+        live process hung or was lost, so this is run at startup and periodically.
+        Jobs with a valid lease are left to their owner.
+        """
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute(
+                "SELECT job_id FROM upload_jobs WHERE status IN ('queued', 'running') AND lease_until < ?", (now,)
+            ).fetchall()
+            conn.executemany('UPDATE upload_jobs SET owner = ?, lease_until = ? WHERE job_id = ?',
+                             [(self.owner, now + self.lease_seconds, job_id) for (job_id,) in rows])
+        for (job_id,) in rows:
+            self._executor.submit(self._run, job_id)
+        if rows:
+            logger.info(f"Recovered {len(rows)} unfinished upload jobs")
+        return len(rows)
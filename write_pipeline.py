@@ -0,0 +1,243 @@
+"""Batched, spooled write pipeline for InfluxDB line protocol.
+
+Accepted lines are appended to a local SQLite spool before the request returns,
+so they survive an InfluxDB outage or a process restart. A background drainer
+flushes the spool to the InfluxDB /api/v2/write endpoint in batches, either when
+enough lines are waiting (flush-by-size) or every flush_interval seconds
+(flush-by-interval).
+
+Several worker processes can share one spool file: each drainer claims a batch
+with a short lease before sending it, so rows are never sent by two drainers at
+once, and a batch claimed by a crashed process becomes available again when its
+lease expires.
+"""
+import gzip
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+import requests
+
+from metrics import UPSTREAM_BYTES, UPSTREAM_ERRORS, track_upstream
+
+logger = logging.getLogger(__name__)
+
+
+class WritePipeline:
+    """Spool line protocol to SQLite and drain it to InfluxDB in batches"""
+
+    def __init__(self, spool_path, influx_url, token, org, bucket, session=None,
+                 batch_size=500, flush_interval=1.0, lease_seconds=60, timeout=10, max_backoff=60):
+        self.spool_path = spool_path
+        self.write_url = f"{influx_url.rstrip('/')}/api/v2/write"
+        self.org = org
+        self.bucket = bucket
+        self.token = token
+        self.session = session or requests.Session()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lease_seconds = lease_seconds
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+
+        self.flushes = 0
+        self.flushed_points = 0
+        self.flush_errors = 0
+        self.last_flush_ms = None
+        self.last_error = None
+        self._backoff = 0.0
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._init_spool()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.spool_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _init_spool(self):
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS spool (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                line TEXT NOT NULL,
+                enqueued_at REAL NOT NULL,
+                claim TEXT,
+                claimed_until REAL NOT NULL DEFAULT 0
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS spool_claimed_until ON spool (claimed_until, id)')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS dead_letter (
+                id INTEGER PRIMARY KEY,
+                line TEXT NOT NULL,
+                enqueued_at REAL NOT NULL,
+                failed_at REAL NOT NULL,
+                error TEXT
+            )
+        ''')
+
+    def submit(self, lines):
+        """Durably append line protocol to the spool; returns the number of lines accepted"""
+        if isinstance(lines, str):
+            lines = [lines]
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany('INSERT INTO spool (line, enqueued_at) VALUES (?, ?)', [(line, now) for line in lines])
+        if self.depth() >= self.batch_size:
+            self._wakeup.set()
+        return len(lines)
+
+    def depth(self):
+        """Number of lines waiting in the spool (including batches currently being sent)"""
+        return self._connect().execute('SELECT COUNT(*) FROM spool').fetchone()[0]
+
+    def _claim_batch(self):
+        claim = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('''
+                UPDATE spool SET claim = ?, claimed_until = ?
+                WHERE id IN (SELECT id FROM spool WHERE claimed_until < ? ORDER BY id LIMIT ?)
+            ''', (claim, now + self.lease_seconds, now, self.batch_size))
+        rows = conn.execute('SELECT id, line FROM spool WHERE claim = ? ORDER BY id', (claim,)).fetchall()
+        return claim, rows
+
+    def drain_once(self):
+        """Send one batch from the spool; returns the number of points written"""
+        claim, rows = self._claim_batch()
+        if not rows:
+            return 0
+
+        conn = self._connect()
+        body = gzip.compress('\n'.join(line for _, line in rows).encode('utf-8'))
+        started = time.perf_counter()
+        UPSTREAM_BYTES.observe(len(body), 'influxdb', 'write_batch')
+        try:
+            with track_upstream('influxdb', 'write_batch'):
+                response = self.session.post(
+                    self.write_url,
+                    params={'org': self.org, 'bucket': self.bucket, 'precision': 'ns'},
+                    headers={
+                        'Authorization': f'Token {self.token}',
+                        'Content-Type': 'text/plain; charset=utf-8',
+                        'Content-Encoding': 'gzip',
+                    },
+                    data=body,
+                    timeout=self.timeout,
+                )
+        except requests.RequestException as e:
+            self._release(claim, f'Write request failed: {str(e)}')
+            return 0
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if response.status_code == 204:
+            with conn:
+                conn.execute('DELETE FROM spool WHERE claim = ?', (claim,))
+            with self._stats_lock:
+                self.flushes += 1
+                self.flushed_points += len(rows)
+                self.last_flush_ms = round(elapsed_ms, 1)
+                self._backoff = 0.0
+            logger.info(f"Flushed {len(rows)} points to InfluxDB in {elapsed_ms:.0f} ms")
+            return len(rows)
+
+        UPSTREAM_ERRORS.inc('influxdb', 'write_batch')
+        error = f'Status {response.status_code} - {response.text[:500]}'
+        if response.status_code in (400, 413, 422):
+            # The payload itself was rejected; retrying the same lines can never succeed
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute('''
+                    INSERT INTO dead_letter (id, line, enqueued_at, failed_at, error)
+                    SELECT id, line, enqueued_at, ?, ? FROM spool WHERE claim = ?
+                ''', (time.time(), error, claim))
+                conn.execute('DELETE FROM spool WHERE claim = ?', (claim,))
+            with self._stats_lock:
+                self.last_error = error
+            logger.error(f"InfluxDB rejected a batch of {len(rows)} points, moved to dead letters: {error}")
+            return 0
+
+        self._release(claim, error)
+        return 0
+
+    def _release(self, claim, error):
+        """Return a claimed batch to the spool after a transient failure and back off"""
+        conn = self._connect()
+        with conn:
+            conn.execute('UPDATE spool SET claim = NULL, claimed_until = 0 WHERE claim = ?', (claim,))
+        with self._stats_lock:
+            self.flush_errors += 1
+            self.last_error = error
+            self._backoff = min(self.max_backoff, max(self.flush_interval, self._backoff * 2))
+        logger.warning(f"InfluxDB batch write failed, retrying in {self._backoff:.1f}s: {error}")
+
+    def flush(self):
+        """Synchronously drain the spool until it is empty or a batch fails"""
+        total = 0
+        while True:
+            written = self.drain_once()
+            if not written:
+                return total
+            total += written
+
+    def start(self):
+        """Start the background drainer thread (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='write-pipeline', daemon=True)
+        self._thread.start()
+
+    def stop(self, flush=True):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + 1)
+        if flush:
+            self.flush()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self._backoff or self.flush_interval)
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                break
+            try:
+                # Keep sending full batches while the spool is backed up
+                while self.drain_once() >= self.batch_size:
+                    pass
+            except Exception as e:
+                logger.error(f"Write pipeline drainer error: {str(e)}")
+
+    def stats(self):
+        conn = self._connect()
+        dead_letters = conn.execute('SELECT COUNT(*) FROM dead_letter').fetchone()[0]
+        oldest = conn.execute('SELECT MIN(enqueued_at) FROM spool').fetchone()[0]
+        with self._stats_lock:
+            return {
+                'queue_depth': self.depth(),
+                'oldest_pending_age_s': round(time.time() - oldest, 1) if oldest else 0,
+                'batch_size': self.batch_size,
+                'flush_interval_s': self.flush_interval,
+                'flushes': self.flushes,
+                'flushed_points': self.flushed_points,
+                'last_flush_ms': self.last_flush_ms,
+                'flush_errors': self.flush_errors,
+                'dead_letters': dead_letters,
+                'last_error': self.last_error,
+                'drainer_running': self._thread is not None and self._thread.is_alive()
+            }